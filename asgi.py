@@ -0,0 +1,100 @@
+import json
+import logging
+
+from asgiref.wsgi import WsgiToAsgi
+
+from src import create_app
+from config import Config
+from src.routes.query_route import wants_timings
+from src.startup import StartupError
+from agents import async_stages
+from agents.async_stages import StageTimeoutError
+from monitoring import tracing
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+flask_app = create_app()
+wsgi_app = WsgiToAsgi(flask_app)
+services = flask_app.extensions["rag_services"]
+
+
+async def _read_body(receive) -> bytes:
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            return body
+
+
+async def _send_json(send, status: int, payload: dict):
+    body = json.dumps(payload).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode()),
+                    (b"access-control-allow-origin", b"*")],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def process_query(scope, receive, send):
+    try:
+        data = json.loads(await _read_body(receive) or b"null")
+    except ValueError:
+        data = None
+    if not isinstance(data, dict) or 'query' not in data:
+        return await _send_json(send, 400, {'error': 'No query provided'})
+
+    try:
+        # Waits for warm-up off the event loop
+        orchestrator = await async_stages.in_thread("startup", None, services.orchestrator)
+    except StartupError as e:
+        return await _send_json(send, 503, {'error': str(e)})
+
+    with tracing.trace() as request_trace:
+        try:
+            result, query_type, sources = await orchestrator.orchestrate_query_async(data['query'])
+            status, body = 200, {'result': result, 'query_type': query_type, 'sources': sources}
+        except StageTimeoutError as e:
+            status, body = 504, {'error': str(e), 'stage': e.stage}
+        except Exception as e:
+            status, body = 500, {'error': str(e)}
+    tracing.count('rag_requests_total', route='/query', status=status)
+    if wants_timings(_header(scope, Config.TIMING_HEADER)):
+        body['timings'] = request_trace.breakdown()
+    await _send_json(send, status, body)
+
+
+def _header(scope, name):
+    if not name:
+        return None
+    name = name.lower().encode()
+    for key, value in scope.get("headers", []):
+        if key.lower() == name:
+            return value.decode("latin-1")
+    return None
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            async_stages.shutdown()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    """
+    POST /query runs on the async pipeline; every other route is served by the
+    Flask app through asgiref's WSGI adapter.
+    """
+    if scope["type"] == "lifespan":
+        return await _lifespan(receive, send)
+    if scope["type"] == "http" and scope["path"] == "/query" and scope["method"] == "POST":
+        return await process_query(scope, receive, send)
+    return await wsgi_app(scope, receive, send)
@@ -0,0 +1,92 @@
+"""
+Recall@k, search latency and memory of the FAISS index types used by
+FAISSConnector, measured against the exact flat index on synthetic
+clustered, L2-normalised vectors.
+
+    python -m benchmarks.bench_ann_index --vectors 200000 --dim 384 --nprobe 8 16 32 --ef-search 32 64 128
+"""
+import argparse
+import json
+import time
+
+import faiss
+import numpy as np
+
+from src.data_sources import faiss_index_factory
+
+
+def synthetic_vectors(count: int, dim: int, clusters: int = 256, seed: int = 7) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype("float32")
+    vectors = centers[rng.integers(0, clusters, count)] + 0.35 * rng.standard_normal((count, dim)).astype("float32")
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def measure(index, queries: np.ndarray, truth: np.ndarray, k: int) -> dict:
+    latencies = []
+    found = []
+    for query in queries:
+        start = time.perf_counter()
+        _, ids = index.search(query[None, :], k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        found.append(ids[0])
+    recall = np.mean([len(set(f) & set(t)) / k for f, t in zip(found, truth)])
+    return {
+        "recall_at_k": round(float(recall), 4),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 4),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 4),
+    }
+
+
+def run(count: int, dim: int, queries: int, k: int, nprobes, ef_searches, index_types) -> dict:
+    vectors = synthetic_vectors(count + queries, dim)
+    base, query_vectors = vectors[:count], vectors[count:]
+    ids = np.arange(count, dtype="int64")
+
+    results = {"vectors": count, "dim": dim, "queries": queries, "k": k,
+               "auto_choice": faiss_index_factory.choose_index_type(count), "indexes": []}
+    truth = None
+    for index_type in index_types:
+        start = time.perf_counter()
+        index = faiss_index_factory.build_index(base, ids, index_type)
+        build_seconds = time.perf_counter() - start
+        memory_mb = faiss.serialize_index(index).nbytes / 2 ** 20
+
+        if index_type == "flat":
+            _, truth = index.search(query_vectors, k)
+
+        if index_type == "hnsw":
+            settings = [{"ef_search": ef} for ef in ef_searches]
+        elif index_type.startswith("ivf"):
+            settings = [{"nprobe": nprobe} for nprobe in nprobes]
+        else:
+            settings = [{}]
+
+        for params in settings:
+            faiss_index_factory.set_search_params(index, **params)
+            entry = {"index_type": index_type, **params,
+                     "build_seconds": round(build_seconds, 3), "memory_mb": round(memory_mb, 2)}
+            entry.update(measure(index, query_vectors, truth, k))
+            results["indexes"].append(entry)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("-k", type=int, default=5)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[8, 16, 32])
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[32, 64, 128])
+    parser.add_argument("--index-types", nargs="+", default=list(faiss_index_factory.INDEX_TYPES))
+    args = parser.parse_args()
+
+    index_types = ["flat"] + [t for t in args.index_types if t != "flat"]
+    print(json.dumps(run(args.vectors, args.dim, args.queries, args.k, args.nprobe, args.ef_search, index_types),
+                     indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,336 @@
+"""
+End-to-end benchmark of the query pipeline, fully offline.
+
+A synthetic catalog (N databases x M tables x K columns behind the MySQL
+stand-in, plus CSV files of a configurable size) is indexed from scratch,
+then a stream of questions is run through OrchestratorAgent at the given
+concurrency. Gemini is replaced by a deterministic stub with a fixed latency
+and the embedding model by a hashing encoder.
+
+Reports per-stage time (extract, encode, index, search, cache, llm,
+post_process; self time, so nested stages are not counted twice), request
+latency percentiles and throughput as JSON:
+
+    python -m benchmarks.bench_pipeline --databases 10 --tables 50 --queries 500 --concurrency 16
+    python -m benchmarks.bench_pipeline --output current.json --compare baseline.json
+"""
+import argparse
+import asyncio
+import contextlib
+import csv
+import inspect
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from benchmarks.fake_mysql import FakeMySQLServer
+from benchmarks.stubs import HashingEmbeddingModel, StubGenerativeModel
+from config import Config
+from src.data_sources import faiss_connector
+from src.data_sources.mysql_pool import MySQLConnectionPool
+
+STAGES = ("extract", "encode", "index", "search", "cache", "llm", "post_process")
+MODEL_NAME = "benchmark-hashing-model"
+
+
+class StageTimer:
+    """
+    Wraps methods so their calls are timed under a stage name. Time spent in a
+    nested timed call is charged to the inner stage only.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+
+    def wrap(self, obj: Any, attr: str, stage: str):
+        original = getattr(obj, attr)
+
+        async def timed_async(*args, **kwargs):
+            # Coroutines interleave on one thread, so they are timed without nesting
+            start = time.perf_counter()
+            try:
+                return await original(*args, **kwargs)
+            finally:
+                self._record(stage, time.perf_counter() - start)
+
+        def timed(*args, **kwargs):
+            stack = self._local.__dict__.setdefault("stack", [])
+            stack.append(0.0)
+            start = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                nested = stack.pop()
+                if stack:
+                    stack[-1] += elapsed
+                self._record(stage, elapsed - nested)
+
+        setattr(obj, attr, timed_async if inspect.iscoroutinefunction(original) else timed)
+
+    def _record(self, stage: str, seconds: float):
+        with self._lock:
+            self.samples[stage].append(seconds)
+
+    def reset(self):
+        with self._lock:
+            self.samples = defaultdict(list)
+
+    def report(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            samples = dict(self.samples)
+        return {stage: _summary(samples[stage]) for stage in STAGES if samples.get(stage)}
+
+
+def _summary(seconds: List[float]) -> Dict[str, float]:
+    ms = np.asarray(seconds) * 1000
+    return {
+        "calls": len(ms),
+        "total_ms": round(float(ms.sum()), 2),
+        "mean_ms": round(float(ms.mean()), 3),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p90_ms": round(float(np.percentile(ms, 90)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+    }
+
+
+def write_csv_files(directory: str, files: int, rows: int, columns: int, seed: int = 11):
+    rng = random.Random(seed)
+    for f in range(files):
+        with open(os.path.join(directory, f"dataset_{f:03d}.csv"), "w", newline="") as out:
+            writer = csv.writer(out)
+            writer.writerow(["id"] + [f"metric_{c:02d}" for c in range(1, columns)])
+            for i in range(rows):
+                writer.writerow([i] + [round(rng.random() * 1000, 2) for _ in range(1, columns)])
+
+
+def configure(workdir: str, csv_directory: str):
+    """Point every file the pipeline writes into `workdir` and the models at the stand-ins."""
+    Config.FAISS_MODEL_NAME = MODEL_NAME
+    Config.FAISS_INDEX_FILE = os.path.join(workdir, "faiss.index")
+    Config.FAISS_DATA_FILE = os.path.join(workdir, "faiss.json")
+    Config.FAISS_COLUMN_INDEX_FILE = os.path.join(workdir, "faiss_columns.index")
+    Config.FAISS_COLUMN_DATA_FILE = os.path.join(workdir, "faiss_columns.json")
+    Config.EMBEDDING_CACHE_FILE = os.path.join(workdir, "embedding_cache.db")
+    Config.CATALOG_STATE_FILE = os.path.join(workdir, "catalog_state.json")
+    Config.SQLITE_CACHE_FILE = os.path.join(workdir, "cache.db")
+    Config.CSV_PROFILE_CACHE_FILE = os.path.join(workdir, "csv_profiles.json")
+    Config.CSV_DIRECTORY = Config.CSV_DATA_DIRECTORY = csv_directory
+    Config.MODEL_NAME = Config.MODEL_NAME or "benchmark-stub"
+
+
+def build_orchestrator(server: FakeMySQLServer, llm: StubGenerativeModel, timer: StageTimer):
+    from src.agents.orchestrator_agent import OrchestratorAgent
+
+    orchestrator = OrchestratorAgent()
+    orchestrator.mysql_connector.pool = MySQLConnectionPool(server.connect, max_size=Config.MYSQL_POOL_SIZE or 8)
+    orchestrator.rag_agent.model = llm
+
+    timer.wrap(orchestrator.catalog, "_extract_all", "extract")
+    for connector in filter(None, (orchestrator.faiss_connector, orchestrator.column_connector)):
+        timer.wrap(connector, "_encode", "encode")
+        timer.wrap(connector, "upsert", "index")
+        timer.wrap(connector, "store_in_faiss", "index")
+        timer.wrap(connector, "search_vectors", "search")
+    timer.wrap(orchestrator.rag_agent, "cached_answer", "cache")
+    timer.wrap(llm, "generate_content", "llm")
+    timer.wrap(llm, "generate_content_async", "llm")
+    timer.wrap(orchestrator, "post_process", "post_process")
+    return orchestrator
+
+
+def make_questions(server: FakeMySQLServer, csv_files: int, count: int, repeat: float, seed: int = 5) -> List[str]:
+    """Questions naming a random table; a `repeat` fraction re-asks an earlier question verbatim."""
+    rng = random.Random(seed)
+    tables = [(db, table) for db, db_tables in server.catalog.items() for table in db_tables]
+    tables += [("csv", f"dataset_{f:03d}") for f in range(csv_files)]
+    questions: List[str] = []
+    for _ in range(count):
+        if questions and rng.random() < repeat:
+            questions.append(rng.choice(questions))
+            continue
+        db, table = rng.choice(tables)
+        questions.append(f"show the row of {table} in {db} with id {rng.randint(1, 100000)}")
+    return questions
+
+
+def _latency_summary(latencies: List[float], wall: float, errors: int) -> Dict[str, Any]:
+    ms = np.asarray(latencies) * 1000 if latencies else np.zeros(1)
+    return {
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "wall_seconds": round(wall, 3),
+        "throughput_qps": round(len(latencies) / wall, 2) if wall else 0.0,
+        "p50_ms": round(float(np.percentile(ms, 50)), 2),
+        "p90_ms": round(float(np.percentile(ms, 90)), 2),
+        "p99_ms": round(float(np.percentile(ms, 99)), 2),
+        "max_ms": round(float(ms.max()), 2),
+    }
+
+
+def run_sync(orchestrator, questions: List[str], concurrency: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+    errors = 0
+    lock = threading.Lock()
+
+    def one(question: str):
+        nonlocal errors
+        start = time.perf_counter()
+        try:
+            orchestrator.orchestrate_query(question)
+        except Exception:
+            with lock:
+                errors += 1
+            return
+        with lock:
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, questions))
+    return _latency_summary(latencies, time.perf_counter() - start, errors)
+
+
+def run_async(orchestrator, questions: List[str], concurrency: int) -> Dict[str, Any]:
+    async def main():
+        slots = asyncio.Semaphore(concurrency)
+        latencies: List[float] = []
+        errors = 0
+
+        async def one(question: str):
+            nonlocal errors
+            async with slots:
+                start = time.perf_counter()
+                try:
+                    await orchestrator.orchestrate_query_async(question)
+                    latencies.append(time.perf_counter() - start)
+                except Exception:
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(q) for q in questions))
+        return _latency_summary(latencies, time.perf_counter() - start, errors)
+
+    return asyncio.run(main())
+
+
+def run(databases: int, tables: int, columns: int, csv_files: int, csv_rows: int, queries: int,
+        concurrency: int, repeat: float, llm_latency_ms: float, mysql_latency_ms: float,
+        embedding_dim: int, mode: str = "sync") -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory() as workdir:
+        csv_directory = os.path.join(workdir, "csv")
+        os.makedirs(csv_directory)
+        write_csv_files(csv_directory, csv_files, csv_rows, columns)
+        configure(workdir, csv_directory)
+
+        server = FakeMySQLServer(databases, tables, columns, latency=mysql_latency_ms / 1000)
+        embedder = HashingEmbeddingModel(embedding_dim)
+        faiss_connector.embedding_models.register_model(MODEL_NAME, embedder)
+        llm = StubGenerativeModel(llm_latency_ms / 1000)
+        timer = StageTimer()
+        try:
+            orchestrator = build_orchestrator(server, llm, timer)
+
+            start = time.perf_counter()
+            sync_report = orchestrator.refresh_catalog(force=True)
+            build_seconds = time.perf_counter() - start
+            build_stages = timer.report()
+            timer.reset()
+
+            questions = make_questions(server, csv_files, queries, repeat)
+            runner = run_async if mode == "async" else run_sync
+            load = runner(orchestrator, questions, concurrency)
+            query_stages = timer.report()
+            cache_stats = orchestrator.rag_agent.cache_stats()
+            orchestrator.rag_agent.sqlite_connector.close()
+        finally:
+            faiss_connector.embedding_models.unload_model(MODEL_NAME)
+
+    return {
+        "params": {
+            "databases": databases, "tables_per_database": tables, "columns": columns,
+            "csv_files": csv_files, "csv_rows": csv_rows, "queries": queries, "concurrency": concurrency,
+            "repeat": repeat, "llm_latency_ms": llm_latency_ms, "mysql_latency_ms": mysql_latency_ms,
+            "embedding_dim": embedding_dim, "mode": mode,
+        },
+        "catalog_build": {"seconds": round(build_seconds, 3), "entries": sync_report, "stages": build_stages},
+        "queries": dict(load, stages=query_stages, llm_calls=llm.calls),
+        "caches": {"answers": cache_stats.get("answers"), "templates": cache_stats.get("templates"),
+                   "semantic": cache_stats.get("semantic"), "single_flight": cache_stats.get("single_flight")},
+    }
+
+
+def _metrics(results: Dict[str, Any]) -> Dict[str, float]:
+    """Flat {name: value} of the comparable numbers (lower is better except throughput)."""
+    metrics = {"catalog_build.seconds": results["catalog_build"]["seconds"]}
+    for key in ("p50_ms", "p90_ms", "p99_ms", "throughput_qps"):
+        metrics[f"queries.{key}"] = results["queries"][key]
+    for phase, stages in (("catalog_build", results["catalog_build"]["stages"]),
+                          ("queries", results["queries"]["stages"])):
+        for stage, summary in stages.items():
+            metrics[f"{phase}.{stage}.total_ms"] = summary["total_ms"]
+    return metrics
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], tolerance: float = 0.1) -> Dict[str, Any]:
+    """Relative change of each metric against a baseline run; flags changes worse than `tolerance`."""
+    before, after = _metrics(baseline), _metrics(current)
+    changes, regressions = {}, []
+    for name in sorted(before.keys() & after.keys()):
+        if not before[name]:
+            continue
+        change = (after[name] - before[name]) / before[name]
+        changes[name] = round(change, 4)
+        worse = -change if name.endswith("throughput_qps") else change
+        if worse > tolerance:
+            regressions.append(name)
+    return {"changes": changes, "regressions": regressions, "tolerance": tolerance}
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--databases", type=int, default=5)
+    parser.add_argument("--tables", type=int, default=40, help="tables per database")
+    parser.add_argument("--columns", type=int, default=12, help="columns per table and CSV file")
+    parser.add_argument("--csv-files", type=int, default=4)
+    parser.add_argument("--csv-rows", type=int, default=10000, help="rows per CSV file")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--repeat", type=float, default=0.3, help="fraction of questions asked again verbatim")
+    parser.add_argument("--llm-latency-ms", type=float, default=200.0)
+    parser.add_argument("--mysql-latency-ms", type=float, default=0.5)
+    parser.add_argument("--embedding-dim", type=int, default=384)
+    parser.add_argument("--mode", choices=("sync", "async"), default="sync",
+                        help="orchestrate_query on a thread pool, or orchestrate_query_async on one event loop")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON file from an earlier run")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="relative change reported as a regression")
+    args = parser.parse_args(argv)
+
+    # The agents print their prompts and answers; keep stdout for the results
+    with contextlib.redirect_stdout(sys.stderr):
+        results = run(args.databases, args.tables, args.columns, args.csv_files, args.csv_rows, args.queries,
+                      args.concurrency, args.repeat, args.llm_latency_ms, args.mysql_latency_ms,
+                      args.embedding_dim, args.mode)
+    if args.compare:
+        with open(args.compare) as f:
+            results["comparison"] = compare(json.load(f), results, args.tolerance)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+In-process stand-in for a MySQL server, used by the benchmarks.
+
+It answers the statements MySQLConnector issues (SHOW DATABASES, SHOW TABLES,
+DESCRIBE, information_schema lookups and sample SELECTs) from a synthetic
+catalog and sleeps `latency` seconds per statement to model a network
+round-trip.
+"""
+import re
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+COLUMN_TYPES = ["int", "varchar(255)", "decimal(10,2)", "datetime", "json", "text"]
+
+
+class FakeMySQLServer:
+    def __init__(self, databases: int = 10, tables: int = 100, columns: int = 12,
+                 sample_rows: int = 10, latency: float = 0.0005):
+        self.latency = latency
+        self.sample_rows = sample_rows
+        self.round_trips = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+
+        self.catalog: Dict[str, Dict[str, List[Dict[str, Any]]]] = {}
+        for d in range(databases):
+            db = f"db_{d:03d}"
+            self.catalog[db] = {}
+            for t in range(tables):
+                self.catalog[db][f"table_{t:04d}"] = [
+                    {"name": "id" if c == 0 else f"col_{c:02d}",
+                     "type": "int" if c == 0 else COLUMN_TYPES[c % len(COLUMN_TYPES)],
+                     "key": "PRI" if c == 0 else ""}
+                    for c in range(columns)
+                ]
+
+    def connect(self, database: Optional[str] = None) -> "FakeConnection":
+        with self._lock:
+            self.connections += 1
+        time.sleep(self.latency * 3)  # TCP + auth handshake
+        return FakeConnection(self, database)
+
+    def _round_trip(self):
+        with self._lock:
+            self.round_trips += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def reset_counters(self):
+        with self._lock:
+            self.round_trips = 0
+            self.connections = 0
+
+    # information_schema views
+
+    def _schemas(self, query: str, params) -> List[str]:
+        if "NOT IN" in query:
+            return [db for db in self.catalog if db not in (params or ())]
+        return [db for db in self.catalog if db in (params or ())]
+
+    def information_schema(self, view: str, schemas: List[str]) -> List[Dict[str, Any]]:
+        rows = []
+        now = datetime(2024, 1, 1)
+        for db in schemas:
+            for table, columns in self.catalog[db].items():
+                if view == "TABLES":
+                    rows.append({"TABLE_SCHEMA": db, "TABLE_NAME": table, "TABLE_ROWS": 1000,
+                                 "DATA_LENGTH": 16384, "CREATE_TIME": now, "UPDATE_TIME": None})
+                    continue
+                for position, column in enumerate(columns, start=1):
+                    row = {"TABLE_SCHEMA": db, "TABLE_NAME": table, "COLUMN_NAME": column["name"],
+                           "COLUMN_TYPE": column["type"], "IS_NULLABLE": "NO" if column["key"] else "YES",
+                           "COLUMN_KEY": column["key"], "ORDINAL_POSITION": position,
+                           "CONSTRAINT_NAME": "PRIMARY", "REFERENCED_TABLE_SCHEMA": None,
+                           "REFERENCED_TABLE_NAME": None, "REFERENCED_COLUMN_NAME": None}
+                    if view == "COLUMNS" or column["key"] == "PRI":
+                        rows.append(row)
+        return rows
+
+    def sample(self, db: str, table: str, limit: int) -> List[Dict[str, Any]]:
+        columns = self.catalog[db][table]
+        return [
+            {c["name"]: (i if c["type"] == "int" else f"{c['name']}_{i}") for c in columns}
+            for i in range(min(limit, self.sample_rows))
+        ]
+
+
+class FakeCursor:
+    def __init__(self, connection: "FakeConnection", dictionary: bool = False):
+        self.connection = connection
+        self.dictionary = dictionary
+        self._rows: List[Any] = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._rows = []
+
+    def execute(self, query: str, params=None):
+        server = self.connection.server
+        server._round_trip()
+        text = " ".join(query.split())
+        upper = text.upper()
+
+        if upper.startswith("SET "):
+            self._rows = []
+        elif upper == "SHOW DATABASES":
+            self._rows = [(db,) for db in ["information_schema", "mysql", *server.catalog]]
+        elif upper == "SHOW TABLES":
+            self._rows = [(t,) for t in server.catalog.get(self.connection.database, {})]
+        elif upper.startswith("DESCRIBE "):
+            table = text.split()[1].strip("`")
+            self._rows = [(c["name"], c["type"], "YES", c["key"], None, "")
+                          for c in server.catalog[self.connection.database][table]]
+        elif "INFORMATION_SCHEMA." in upper:
+            view = re.search(r"information_schema\.(\w+)", text, re.I).group(1).upper()
+            selected = [c.strip() for c in re.search(r"SELECT (.*?) FROM", text, re.I).group(1).split(",")]
+            rows = server.information_schema(view, server._schemas(text, params))
+            self._rows = [tuple(row[c] for c in selected) for row in rows]
+        else:
+            match = re.search(r"FROM\s+(?:`?(\w+)`?\.)?`?(\w+)`?.*?LIMIT\s+(\d+)", text, re.I)
+            if not match:
+                raise ValueError(f"FakeMySQLServer cannot answer: {query}")
+            db = match.group(1) or self.connection.database
+            rows = server.sample(db, match.group(2), int(match.group(3)))
+            self._rows = rows if self.dictionary else [tuple(r.values()) for r in rows]
+
+    def fetchall(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+    def fetchmany(self, size: int = 1):
+        rows, self._rows = self._rows[:size], self._rows[size:]
+        return rows
+
+
+class FakeConnection:
+    def __init__(self, server: FakeMySQLServer, database: Optional[str] = None):
+        self.server = server
+        self._database = database
+        self.closed = False
+
+    @property
+    def database(self):
+        return self._database
+
+    @database.setter
+    def database(self, value):
+        self.server._round_trip()  # USE <db>
+        self._database = value
+
+    def cursor(self, dictionary: bool = False, **kwargs):
+        return FakeCursor(self, dictionary)
+
+    def is_connected(self):
+        return not self.closed
+
+    def close(self):
+        self.closed = True
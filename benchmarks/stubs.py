@@ -0,0 +1,103 @@
+"""
+Deterministic local stand-ins for the hosted models, used by the benchmarks.
+
+StubGenerativeModel replaces google.generativeai.GenerativeModel: it answers
+after a fixed latency with a SQL query against the first table of the prompt
+context. HashingEmbeddingModel replaces the SentenceTransformer with a
+hashed bag of words, so questions that name a table land near its record.
+"""
+import asyncio
+import json
+import re
+import threading
+import time
+import zlib
+from typing import Iterator, List
+
+import numpy as np
+
+_HEADING = re.compile(r"\b(MySQL|CSV) table: (\S+)")
+_QUESTION = re.compile(r"Question:\s*(.*)")
+_WORD = re.compile(r"[a-z0-9_]+")
+
+
+class _Usage:
+    def __init__(self, prompt_token_count: int):
+        self.prompt_token_count = prompt_token_count
+
+
+class _Response:
+    def __init__(self, text: str, prompt_tokens: int):
+        self.text = text
+        self.usage_metadata = _Usage(prompt_tokens)
+
+
+class _StreamedResponse:
+    def __init__(self, chunks: List[str], prompt_tokens: int, latency: float):
+        self._chunks = chunks
+        self._latency = latency
+        self.usage_metadata = _Usage(prompt_tokens)
+
+    def __iter__(self) -> Iterator[_Response]:
+        for chunk in self._chunks:
+            time.sleep(self._latency / max(len(self._chunks), 1))
+            yield _Response(chunk, 0)
+
+
+class StubGenerativeModel:
+    """
+    generate_content / generate_content_async with `latency` seconds per call.
+    The answer has the JSON shape the prompt asks for.
+    """
+
+    def __init__(self, latency: float = 0.2):
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def answer(self, prompt: str) -> str:
+        with self._lock:
+            self.calls += 1
+        match = _HEADING.search(prompt)
+        if match is None:
+            return json.dumps({"type": None, "query": None})
+        source, table = match.groups()
+        question = _QUESTION.search(prompt)
+        literal = re.search(r"\d+", question.group(1) if question else "")
+        where = f" WHERE id = {literal.group(0)}" if literal else ""
+        return "```json\n" + json.dumps({
+            "type": "sql" if source == "MySQL" else "csv",
+            "query": f"SELECT * FROM {table}{where} LIMIT 10",
+        }) + "\n```"
+
+    def generate_content(self, prompt: str, stream: bool = False):
+        tokens = len(prompt) // 4
+        text = self.answer(prompt)
+        if stream:
+            return _StreamedResponse([text[i:i + 16] for i in range(0, len(text), 16)], tokens, self.latency)
+        time.sleep(self.latency)
+        return _Response(text, tokens)
+
+    async def generate_content_async(self, prompt: str):
+        await asyncio.sleep(self.latency)
+        return _Response(self.answer(prompt), len(prompt) // 4)
+
+
+class HashingEmbeddingModel:
+    """SentenceTransformer-compatible encode() over hashed word counts."""
+
+    def __init__(self, dim: int = 384, latency: float = 0.0):
+        self.dim = dim
+        self.latency = latency
+        self.encoded = 0
+
+    def encode(self, texts: List[str], batch_size: int = 32, **kwargs) -> np.ndarray:
+        if self.latency:
+            time.sleep(self.latency)
+        self.encoded += len(texts)
+        vectors = np.zeros((len(texts), self.dim), dtype="float32")
+        for row, text in enumerate(texts):
+            for word in _WORD.findall(text.lower()):
+                vectors[row, zlib.crc32(word.encode()) % self.dim] += 1.0
+        vectors[:, 0] += 1e-3  # keep empty texts off the zero vector
+        return vectors
@@ -9,23 +9,129 @@ class Config:
     FAISS_MODEL_NAME = os.environ.get("FAISS_MODEL_NAME")
     FAISS_INDEX_FILE = os.environ.get("FAISS_INDEX_FILE")
     FAISS_DATA_FILE = os.environ.get("FAISS_DATA_FILE")
+    # Record store behind the index: "json" (kept in memory) or "mmap" (offset table, memory-mapped)
+    FAISS_DOCSTORE = os.environ.get("FAISS_DOCSTORE", "json")
+    # Multi-process serving: versioned index + mmap data files behind symlinks, memory-mapped
+    # read-only by every worker and remapped when a new generation is published
+    FAISS_SHARED_INDEX = os.environ.get("FAISS_SHARED_INDEX", "false").lower() == "true"
+    FAISS_GENERATIONS_KEPT = int(os.environ.get("FAISS_GENERATIONS_KEPT", "2"))
+    # Column-level index for hierarchical retrieval (columns first, aggregated per table)
+    FAISS_COLUMN_INDEX_FILE = os.environ.get("FAISS_COLUMN_INDEX_FILE", "faiss_columns.index")
+    FAISS_COLUMN_DATA_FILE = os.environ.get("FAISS_COLUMN_DATA_FILE", "faiss_columns.json")
+    COLUMN_RETRIEVAL = os.environ.get("COLUMN_RETRIEVAL", "true").lower() == "true"
+    COLUMN_SEARCH_K = int(os.environ.get("COLUMN_SEARCH_K", "50"))
+    COLUMN_SCORE_TOP_N = int(os.environ.get("COLUMN_SCORE_TOP_N", "3"))
+    RETRIEVAL_TOP_K = int(os.environ.get("RETRIEVAL_TOP_K", "5"))
+    # Prompt context: token budget across retrieved tables, per-column sample values and their length
+    PROMPT_TOKEN_BUDGET = int(os.environ.get("PROMPT_TOKEN_BUDGET", "2000"))
+    CONTEXT_MAX_VALUES_PER_COLUMN = int(os.environ.get("CONTEXT_MAX_VALUES_PER_COLUMN", "3"))
+    CONTEXT_MAX_VALUE_CHARS = int(os.environ.get("CONTEXT_MAX_VALUE_CHARS", "40"))
+    # Index type: "auto" (by catalog size, never HNSW since it cannot remove vectors), "flat", "hnsw", "ivf_flat" or "ivf_pq"
+    FAISS_INDEX_TYPE = os.environ.get("FAISS_INDEX_TYPE", "auto")
+    FAISS_NLIST = int(os.environ.get("FAISS_NLIST", "0"))  # 0 = 4 * sqrt(N)
+    FAISS_NPROBE = int(os.environ.get("FAISS_NPROBE", "16"))
+    FAISS_HNSW_M = int(os.environ.get("FAISS_HNSW_M", "32"))
+    FAISS_EF_CONSTRUCTION = int(os.environ.get("FAISS_EF_CONSTRUCTION", "80"))
+    FAISS_EF_SEARCH = int(os.environ.get("FAISS_EF_SEARCH", "64"))
+
+    # Persistent embedding cache keyed by (model name, text hash); empty disables it
+    EMBEDDING_CACHE_FILE = os.environ.get("EMBEDDING_CACHE_FILE", "embedding_cache.db")
+    EMBEDDING_CACHE_MAX_ENTRIES = int(os.environ.get("EMBEDDING_CACHE_MAX_ENTRIES", "500000"))
+    EMBEDDING_CACHE_DTYPE = os.environ.get("EMBEDDING_CACHE_DTYPE", "float16")
+    EMBEDDING_BATCH_SIZE = int(os.environ.get("EMBEDDING_BATCH_SIZE", "64"))
+    # Freeze the preloaded model for copy-on-write sharing (set when forking workers, e.g. gunicorn --preload)
+    EMBEDDING_PRELOAD_FREEZE = os.environ.get("EMBEDDING_PRELOAD_FREEZE", "false").lower() == "true"
+
+    # Incremental catalog state (per-table / per-CSV fingerprints)
+    CATALOG_STATE_FILE = os.environ.get("CATALOG_STATE_FILE", "catalog_state.json")
+    # Background index rebuilds: POST /index/rebuild, or every INDEX_REBUILD_INTERVAL seconds (0 = never);
+    # the lock file keeps worker processes from rebuilding at the same time
+    INDEX_REBUILD_INTERVAL = float(os.environ.get("INDEX_REBUILD_INTERVAL", "0"))
+    INDEX_REBUILD_LOCK_FILE = os.environ.get("INDEX_REBUILD_LOCK_FILE", "index_rebuild.lock")
+    INDEX_JOB_HISTORY = int(os.environ.get("INDEX_JOB_HISTORY", "20"))
 
     # SQLite cache
     SQLITE_CACHE_FILE = os.getenv("SQLITE_CACHE_FILE")
+    CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", "86400"))  # 0 disables expiry
+    CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+    CACHE_ASYNC_WRITES = os.getenv("CACHE_ASYNC_WRITES", "true").lower() == "true"
+    # Semantic answer cache: reuse answers to questions whose embedding similarity reaches the threshold
+    SEMANTIC_CACHE = os.getenv("SEMANTIC_CACHE", "true").lower() == "true"
+    SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+    # Reuse generated SQL for questions that differ only in their literals
+    QUERY_TEMPLATES = os.getenv("QUERY_TEMPLATES", "true").lower() == "true"
+
+    # Coalesce identical in-flight queries; optionally across worker processes via a lease row in SQLITE_CACHE_FILE
+    SINGLE_FLIGHT_CROSS_PROCESS = os.getenv("SINGLE_FLIGHT_CROSS_PROCESS", "false").lower() == "true"
+    SINGLE_FLIGHT_LEASE_SECONDS = float(os.getenv("SINGLE_FLIGHT_LEASE_SECONDS", "120"))
+
+    # Executing generated SQL: rows per chunk, per-page row/byte/time limits and signed paging cursors
+    RESULT_CHUNK_ROWS = int(os.getenv("RESULT_CHUNK_ROWS", "500"))
+    RESULT_MAX_ROWS = int(os.getenv("RESULT_MAX_ROWS", "10000"))
+    RESULT_MAX_BYTES = int(os.getenv("RESULT_MAX_BYTES", str(8 * 1024 * 1024)))
+    RESULT_TIMEOUT = float(os.getenv("RESULT_TIMEOUT", "30"))
+    RESULT_CURSOR_SECRET = os.getenv("RESULT_CURSOR_SECRET", "")  # set when running several workers
+    RESULT_CURSOR_TTL = float(os.getenv("RESULT_CURSOR_TTL", "3600"))
+
+    # Async pipeline (asgi.py): blocking stages run on a thread pool, Gemini calls are bounded
+    ASYNC_WORKER_THREADS = int(os.getenv("ASYNC_WORKER_THREADS", "16"))
+    LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+    # Batch queries (/query/batch)
+    BATCH_MAX_QUERIES = int(os.getenv("BATCH_MAX_QUERIES", "10000"))
+    BATCH_LLM_CONCURRENCY = int(os.getenv("BATCH_LLM_CONCURRENCY", "8"))
+    # Per-stage timeouts in seconds (0 disables)
+    CACHE_STAGE_TIMEOUT = float(os.getenv("CACHE_STAGE_TIMEOUT", "5"))
+    RETRIEVAL_STAGE_TIMEOUT = float(os.getenv("RETRIEVAL_STAGE_TIMEOUT", "10"))
+    LLM_STAGE_TIMEOUT = float(os.getenv("LLM_STAGE_TIMEOUT", "60"))
+    POST_PROCESS_STAGE_TIMEOUT = float(os.getenv("POST_PROCESS_STAGE_TIMEOUT", "30"))
+
+    # Stage tracing: histogram bucket bounds in seconds for /metrics, and the request header
+    # that adds a per-request timing breakdown to /query responses (empty disables it)
+    TRACE_BUCKETS = [float(b) for b in os.getenv(
+        "TRACE_BUCKETS", "0.001,0.005,0.01,0.025,0.05,0.1,0.25,0.5,1,2.5,5,10,30,60").split(",")]
+    TIMING_HEADER = os.getenv("TIMING_HEADER", "X-Debug-Timing")
 
     # MySQL connection
     MYSQL_HOST = os.getenv("MYSQL_HOST")
     MYSQL_USER = os.getenv("MYSQL_USER")
     MYSQL_PASSWORD = os.getenv("MYSQL_PASSWORD")
 
+    # MySQL connection pool
+    MYSQL_POOL_SIZE = int(os.getenv("MYSQL_POOL_SIZE", "10"))
+    MYSQL_POOL_CHECKOUT_TIMEOUT = float(os.getenv("MYSQL_POOL_CHECKOUT_TIMEOUT", "30"))
+    MYSQL_POOL_IDLE_TIMEOUT = float(os.getenv("MYSQL_POOL_IDLE_TIMEOUT", "300"))
+    MYSQL_POOL_MAX_LIFETIME = float(os.getenv("MYSQL_POOL_MAX_LIFETIME", "3600"))
+    MYSQL_POOL_HEALTH_CHECK_INTERVAL = float(os.getenv("MYSQL_POOL_HEALTH_CHECK_INTERVAL", "30"))
+
+    # Catalog extraction: bulk information_schema queries instead of DESCRIBE per table
+    MYSQL_BULK_EXTRACTION = os.getenv("MYSQL_BULK_EXTRACTION", "true").lower() == "true"
+
+    # Parallel sample-data harvesting
+    SAMPLE_MAX_CONCURRENCY = int(os.getenv("SAMPLE_MAX_CONCURRENCY", "8"))
+    SAMPLE_TABLE_TIMEOUT = float(os.getenv("SAMPLE_TABLE_TIMEOUT", "5"))
+    SAMPLE_MAX_COLUMNS = int(os.getenv("SAMPLE_MAX_COLUMNS", "50"))
+    SAMPLE_MAX_VALUE_BYTES = int(os.getenv("SAMPLE_MAX_VALUE_BYTES", "256"))
+    SAMPLE_MAX_TABLE_BYTES = int(os.getenv("SAMPLE_MAX_TABLE_BYTES", "8192"))
+
     # CSV directory
     CSV_DIRECTORY = os.environ.get("CSV_DIRECTORY")
     MAX_SAMPLE_ROWS: int = 10
     ENCODING = os.environ.get("CSV_ENCODING")
     CSV_DATA_DIRECTORY = os.environ.get("CSV_DATA_DIRECTORY")
 
+    # CSV profiling (streamed in chunks, files in parallel, cached by file fingerprint)
+    CSV_PROFILE_CHUNK_ROWS = int(os.getenv("CSV_PROFILE_CHUNK_ROWS", "50000"))
+    CSV_PROFILE_WORKERS = int(os.getenv("CSV_PROFILE_WORKERS", str(os.cpu_count() or 1)))
+    CSV_PROFILE_CACHE_FILE = os.getenv("CSV_PROFILE_CACHE_FILE", "csv_profiles.json")
+
     # Flask app
     FLASK_HOST = os.getenv("FLASK_HOST")
+    # Startup: "background" builds the agents and warms up (embedding model, FAISS index, MySQL pool)
+    # on a thread once the app is created; "eager" does it before create_app returns
+    # (always the case with EMBEDDING_PRELOAD_FREEZE, whose warm-up must finish before forking)
+    STARTUP_MODE = os.getenv("STARTUP_MODE", "background")
+    STARTUP_WAIT_TIMEOUT = float(os.getenv("STARTUP_WAIT_TIMEOUT", "120"))  # a request waits this long for warm-up
+    MYSQL_POOL_PREFILL = int(os.getenv("MYSQL_POOL_PREFILL", "2"))
 
     # Google API key
     GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
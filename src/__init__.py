@@ -1,10 +1,21 @@
 from flask import Flask
 from flask_cors import CORS 
+from config import Config
 
 
-def create_app():
+def create_app(services=None):
+    """
+    Build the Flask app. The agents are built and warmed up by `services`
+    (an AppServices): on a background thread by default, so the app answers
+    /health at once and /ready once warm-up is done.
+    """
     app = Flask(__name__)
     CORS(app)
     from src.routes.query_route import query_bp
+    from src.startup import AppServices
+    services = services or AppServices()
+    app.extensions["rag_services"] = services
     app.register_blueprint(query_bp)
-    return app
\ No newline at end of file
+    eager = Config.STARTUP_MODE == "eager" or Config.EMBEDDING_PRELOAD_FREEZE
+    services.start(background=not eager)
+    return app
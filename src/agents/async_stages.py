@@ -0,0 +1,60 @@
+import os
+import sys
+import asyncio
+import logging
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Optional
+
+project_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.append(project_dir)
+from config import Config
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+class StageTimeoutError(Exception):
+    """A pipeline stage did not finish within its timeout."""
+
+    def __init__(self, stage: str, timeout: float):
+        super().__init__(f"Stage '{stage}' timed out after {timeout}s")
+        self.stage = stage
+        self.timeout = timeout
+
+
+def executor() -> ThreadPoolExecutor:
+    """Thread pool for blocking work (FAISS search, embedding, SQLite, MySQL) of the async pipeline."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=Config.ASYNC_WORKER_THREADS, thread_name_prefix="pipeline")
+    return _executor
+
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False)
+        _executor = None
+
+
+async def stage(name: str, timeout: Optional[float], awaitable: Awaitable) -> Any:
+    """Await `awaitable`, raising StageTimeoutError after `timeout` seconds (None or 0 waits forever)."""
+    try:
+        return await asyncio.wait_for(awaitable, timeout or None)
+    except asyncio.TimeoutError:
+        logger.error(f"Stage '{name}' timed out after {timeout}s")
+        raise StageTimeoutError(name, timeout)
+
+
+async def in_thread(name: str, timeout: Optional[float], fn: Callable, *args) -> Any:
+    """
+    Run blocking `fn(*args)` on the pipeline thread pool as a timed stage, in
+    a copy of the caller's context (so the request trace follows it).
+    On timeout the caller stops waiting; the thread finishes in the background.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await stage(name, timeout, loop.run_in_executor(executor(), context.run, fn, *args))
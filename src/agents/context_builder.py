@@ -0,0 +1,165 @@
+import os
+import sys
+import json
+import math
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain.schema import Document
+
+project_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.append(project_dir)
+from config import Config
+
+src_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(src_dir)
+from data_sources.column_catalog import column_names
+from data_sources.csv_query_engine import csv_table_name
+
+# Rough characters per token for English text and SQL identifiers
+CHARS_PER_TOKEN = 4
+# Between tables in the context
+SEPARATOR = "\n\n"
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _value_text(value: Any, max_chars: int) -> str:
+    text = json.dumps(value, default=str) if isinstance(value, (dict, list)) else str(value)
+    text = " ".join(text.split())
+    return text if len(text) <= max_chars else text[:max_chars - 3] + "..."
+
+
+def _heading(record: Dict[str, Any]) -> str:
+    table = record.get("table") or ""
+    if table.endswith(".csv"):
+        return f"CSV table: {csv_table_name(table)} (file: {table})"
+    return f"MySQL table: {record.get('database')}.{table}"
+
+
+def _profiles(record: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    return (record.get("profile") or {}).get("columns") or {}
+
+
+def render_schema(record: Dict[str, Any]) -> str:
+    """Heading plus one line listing columns with their types and keys."""
+    profiles = _profiles(record)
+    columns = []
+    for column in record.get("schema") or []:
+        if isinstance(column, dict):
+            parts = [column.get("Field"), column.get("Type")]
+            if column.get("Key") == "PRI":
+                parts.append("PK")
+            columns.append(" ".join(str(p) for p in parts if p))
+        else:
+            kind = profiles.get(str(column), {}).get("type")
+            columns.append(f"{column} {kind}" if kind else str(column))
+    return f"{_heading(record)}\nColumns: {', '.join(columns)}"
+
+
+def _render_profile(name: str, profile: Dict[str, Any], max_chars: int) -> str:
+    parts = []
+    if profile.get("min") is not None:
+        low, high = (_value_text(profile[key], max_chars) for key in ("min", "max"))
+        parts.append(f"{low}..{high}")
+    if profile.get("distinct") is not None:
+        parts.append(f"~{profile['distinct']} distinct")
+    if profile.get("nulls"):
+        parts.append(f"{profile['nulls']} nulls")
+    return f"  {name}: {', '.join(parts)}" if parts else ""
+
+
+def render_table(record: Dict[str, Any], max_value_chars: Optional[int] = None,
+                 max_values: Optional[int] = None) -> str:
+    """
+    Schema first, then per-column stats when the record has a profile, then up
+    to `max_values` distinct sample values per column, each truncated to
+    `max_value_chars`.
+    """
+    max_value_chars = max_value_chars or Config.CONTEXT_MAX_VALUE_CHARS
+    max_values = max_values or Config.CONTEXT_MAX_VALUES_PER_COLUMN
+    names = column_names(record)
+    samples: Dict[str, List[str]] = {name: [] for name in names}
+    for row in record.get("sample_data") or []:
+        values = [row.get(name) for name in names] if isinstance(row, dict) else list(row)
+        for name, value in zip(names, values):
+            if value in (None, ""):
+                continue
+            text = _value_text(value, max_value_chars)
+            if text not in samples[name] and len(samples[name]) < max_values:
+                samples[name].append(text)
+
+    lines = [render_schema(record)]
+    profiles = _profiles(record)
+    profile_lines = [_render_profile(name, profiles[name], max_value_chars) for name in names if name in profiles]
+    profile_lines = [line for line in profile_lines if line]
+    if profile_lines:
+        rows = (record.get("profile") or {}).get("row_count")
+        lines.append(f"Column stats ({rows} rows):" if rows is not None else "Column stats:")
+        lines.extend(profile_lines)
+    sample_lines = [f"  {name}: {' | '.join(values)}" for name, values in samples.items() if values]
+    if sample_lines:
+        lines.append("Sample values:")
+        lines.extend(sample_lines)
+    return "\n".join(lines)
+
+
+class ContextBuilder:
+    """
+    Assemble the prompt context from retrieved tables within a token budget.
+
+    Tables are added in score order with their full rendering; one that does
+    not fit is reduced to its schema line, and one whose schema line does not
+    fit either is dropped. Later, lower-scored tables are still tried, so a
+    smaller table can use budget a larger one could not. The separators
+    between tables count against the budget.
+    """
+
+    def __init__(self, token_budget: Optional[int] = None):
+        self.token_budget = token_budget or Config.PROMPT_TOKEN_BUDGET
+        self._lock = threading.Lock()
+        self._counters = {"requests": 0, "prompt_tokens": 0, "context_tokens": 0,
+                          "tables_reduced": 0, "tables_dropped": 0, "reported_prompt_tokens": 0}
+
+    def build(self, docs: List[Document]) -> Tuple[str, Dict[str, int]]:
+        ordered = sorted(docs, key=lambda d: d.metadata.get("score") or 0.0, reverse=True)
+        parts, used = [], 0
+        report = {"tables": 0, "tables_reduced": 0, "tables_dropped": 0}
+        for doc in ordered:
+            separator = estimate_tokens(SEPARATOR) if parts else 0
+            for text, reduced in ((doc.page_content, False), (render_schema(doc.metadata), True)):
+                tokens = separator + estimate_tokens(text)
+                if used + tokens <= self.token_budget:
+                    parts.append(text)
+                    used += tokens
+                    report["tables"] += 1
+                    report["tables_reduced"] += reduced
+                    break
+            else:
+                report["tables_dropped"] += 1
+        report["context_tokens"] = used
+        return SEPARATOR.join(parts), report
+
+    def record(self, report: Dict[str, int]):
+        """Add a request's prompt report to the running totals."""
+        with self._lock:
+            self._counters["requests"] += 1
+            for key in ("prompt_tokens", "context_tokens", "tables_reduced", "tables_dropped"):
+                self._counters[key] += report.get(key) or 0
+
+    def record_usage(self, response: Any):
+        """Add the prompt token count reported by Gemini, when the response carries usage metadata."""
+        usage = getattr(response, "usage_metadata", None)
+        count = getattr(usage, "prompt_token_count", None)
+        if isinstance(count, int):
+            with self._lock:
+                self._counters["reported_prompt_tokens"] += count
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._counters)
+        stats["token_budget"] = self.token_budget
+        stats["avg_prompt_tokens"] = round(stats["prompt_tokens"] / stats["requests"], 1) if stats["requests"] else 0.0
+        return stats
@@ -1,6 +1,6 @@
 import os
 import sys
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 import json
 import re
 
@@ -12,6 +12,12 @@ from data_sources.mysql_connector import MySQLConnector
 from data_sources.sqlite_connector import SQLiteConnector
 from data_sources.faiss_connector import FAISSConnector
 from data_sources.csv_connector import CSVConnector
+from data_sources.catalog_manager import CatalogManager
+from data_sources.index_lifecycle import IndexLifecycleManager
+from data_sources.csv_query_engine import CSVQueryEngine
+from data_sources.sql_executor import SQLExecutor, SQLRejectedError, check_read_only
+from agents import async_stages
+from monitoring import tracing
 
 project_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
 sys.path.append(project_dir)
@@ -27,8 +33,17 @@ class OrchestratorAgent:
         self.mysql_connector = MySQLConnector()
         self.sqlite_connector = SQLiteConnector()
         self.faiss_connector = FAISSConnector()
+        self.column_connector = FAISSConnector(Config.FAISS_COLUMN_INDEX_FILE, Config.FAISS_COLUMN_DATA_FILE) \
+            if Config.COLUMN_RETRIEVAL else None
         self.csv_connector = CSVConnector()
-        self.rag_agent = RAGAgent()
+        self.sql_executor = SQLExecutor(self.mysql_connector)
+        self.csv_engine = CSVQueryEngine()
+        self.catalog = CatalogManager(self.mysql_connector, self.csv_connector, self.faiss_connector,
+                                      column_connector=self.column_connector)
+        self.rag_agent = RAGAgent(faiss_connector=self.faiss_connector, column_connector=self.column_connector,
+                                  fingerprint_fn=self.catalog.fingerprint)
+        self.index_lifecycle = IndexLifecycleManager(
+            self.refresh_catalog, {"tables": self.faiss_connector, "columns": self.column_connector})
 
     def extract_data(self) -> List[Any]:
         """
@@ -55,6 +70,30 @@ class OrchestratorAgent:
             logger.error(f"Error storing data in FAISS: {str(e)}")
             raise
 
+    def refresh_catalog(self, force: bool = False, progress=None) -> Dict[str, int]:
+        """
+        Incrementally re-index changed tables and CSV files.
+        """
+        try:
+            with tracing.span("catalog_sync"):
+                report = self.catalog.sync(force=force, progress=progress)
+            if self.rag_agent.semantic_cache is not None and (report["added"] or report["changed"] or report["removed"]):
+                report["semantic_cache_invalidated"] = self.rag_agent.semantic_cache.purge_stale()
+            return report
+        except Exception as e:
+            logger.error(f"Error refreshing catalog: {str(e)}")
+            raise
+
+    def ensure_catalog(self) -> None:
+        """
+        Build the catalog index once if it does not exist yet.
+        """
+        if not self.faiss_connector.index_exists():
+            with self.index_lifecycle.process_lock():
+                # Another worker may have built it while we waited for the lock
+                if not self.faiss_connector.index_exists():
+                    self.refresh_catalog()
+
     def process_query(self, query: str) -> Tuple[str, List[str]]:
         """
         Process the query using the RAG pipeline.
@@ -72,8 +111,7 @@ class OrchestratorAgent:
         """
         try:
             logger.info(f"Processing query: {query}")
-            data = self.extract_data()
-            self.store_data_in_faiss(data)
+            self.ensure_catalog()
             answer, sources = self.process_query(query)
             logger.info("Query processed successfully")
             query, source_type = self.post_process(answer)
@@ -83,68 +121,135 @@ class OrchestratorAgent:
             logger.error(f"Error orchestrating query: {str(e)}")
             raise
 
+    async def orchestrate_query_async(self, query: str) -> Tuple[str, List[str]]:
+        """
+        Async counterpart of orchestrate_query: blocking stages run on the pipeline
+        thread pool and each stage is bounded by its configured timeout.
+        """
+        try:
+            logger.info(f"Processing query: {query}")
+            # The first catalog build can take minutes, so it is not timed
+            await async_stages.in_thread("catalog", None, self.ensure_catalog)
+            answer, sources = await self.rag_agent.run_rag_pipeline_async(query)
+            logger.info("Query processed successfully")
+            query, source_type = await async_stages.in_thread(
+                "post_process", Config.POST_PROCESS_STAGE_TIMEOUT, self.post_process, answer)
+
+            return query, source_type, sources
+        except Exception as e:
+            logger.error(f"Error orchestrating query: {str(e)}")
+            raise
+
+    def orchestrate_batch(self, queries: List[str]) -> Iterator[Dict[str, Any]]:
+        """
+        Orchestrate many queries, yielding one result per query as it finishes:
+        {"index", "query", "result", "query_type", "sources"} or {"index", "query", "error"}.
+        """
+        logger.info(f"Processing batch of {len(queries)} queries")
+        self.ensure_catalog()
+        for item in self.rag_agent.run_batch(queries):
+            entry = {"index": item["index"], "query": queries[item["index"]]}
+            if "error" in item:
+                entry["error"] = item["error"]
+            else:
+                try:
+                    result, query_type = self.post_process(item["answer"])
+                    entry.update(result=result, query_type=query_type, sources=item["sources"])
+                except Exception as e:
+                    entry["error"] = str(e)
+            yield entry
+
+    def stream_query(self, query: str, execute: bool = False) -> Iterator[Tuple[str, Any]]:
+        """
+        Orchestrate the query as a stream of (event, data) pairs: the RAG pipeline
+        events followed by "result" with the parsed {type, query} and, with
+        `execute`, the "columns", "rows" and "summary" of running the SQL.
+        """
+        logger.info(f"Streaming query: {query}")
+        self.ensure_catalog()
+        answer = None
+        sources = []
+        for event, data in self.rag_agent.rag_stream(query):
+            if event == "answer":
+                answer = data["text"]
+            elif event == "sources":
+                sources = data
+            yield event, data
+        query, source_type = self.post_process(answer)
+        yield "result", {"type": source_type, "query": query}
+        if execute and source_type in ("sql", "csv"):
+            for item in self.execute_sql(query, sources, source_type):
+                for event, data in item.items():
+                    yield event, data
+
     def post_process(self, answer: str):
         """
         Post-processing steps.
         """
         try:
-            # json_str = answer.replace('`', '').replace('python', 'json', '', 1).strip()
-            json_str = re.sub(r'`|python|json|java', '', answer).strip()
-            answer_json = json.loads(json_str)
-
-            if answer_json['type'] == "csv":
-                # Post-process the CSV data
-                query = self._process_csv(answer_json['query'])
-            elif answer_json['type'] == "sql":
-                # Post-process the SQL data
-                query = answer_json['query']
-                self._process_sql(query)
-            elif answer_json['type'] == None:
-                logger.info("No post-processing required.") 
-                query = None
-            return query, answer_json['type']           
+            with tracing.span("post_process"):
+                # json_str = answer.replace('`', '').replace('python', 'json', '', 1).strip()
+                json_str = re.sub(r'`|python|json|java', '', answer).strip()
+                answer_json = json.loads(json_str)
+
+                if answer_json['type'] == "csv":
+                    # Post-process the CSV data
+                    query = self._process_csv(answer_json['query'])
+                elif answer_json['type'] == "sql":
+                    # Post-process the SQL data
+                    query = answer_json['query']
+                    self._process_sql(query)
+                elif answer_json['type'] == None:
+                    logger.info("No post-processing required.") 
+                    query = None
+                return query, answer_json['type']           
         except Exception as e:
             logger.error(f"Error in post-processing: {str(e)}")
             raise
 
-    def _process_csv(self, query: str) -> Tuple[str, List[str]]:
+    def _process_csv(self, query: str) -> Optional[str]:
         """
-        Process the CSV query.
+        Process the CSV query: SQL over the tables the CSV query engine loads.
         """
         try:
-            with open('response.txt', 'r') as file:
-                response_str = file.read()
-
-            data_dir = Config.CSV_DATA_DIRECTORY
-            pattern = r"open\('(.+\.csv)', 'r'\)"
-            match = re.search(pattern, query)
-
-            if match:
-                csv_filename = match.group(1)  # Extract the current CSV file name
-                csv_path = data_dir / csv_filename  # Construct the new path
-                csv_path_str = str(csv_path).replace("\\", "/")
-                updated_query = re.sub(pattern, lambda m: f"open(r'{csv_path_str}', 'r')", answer_query)
-                try:
-                    exec(updated_query)
-                except Exception as e:
-                    logger.error(f"Error executing updated query: {str(e)}")
-            else:
-                print("No CSV file found in the query.")
-        except Exception as e:
-            logger.error(f"Error processing CSV query: {str(e)}")
+            check_read_only(query)
+            logger.info(f"Generated CSV query: {query}")
+        except SQLRejectedError as e:
+            logger.warning(f"Generated CSV query cannot be executed: {str(e)}")
+        return query
 
     def _process_sql(self, query: str) -> Tuple[str, List[str]]:
         """
         Process the SQL query.
         """
         try:
-            connection = self.mysql_connector.connect()
-            # results = self.mysql_connector.execute_query(connection, query)
-            connection.close()
-            logger.info(f"Executed SQL query: {query}")
-            
-        except Exception as e:
-            logger.error(f"Error processing SQL query: {str(e)}")
+            check_read_only(query)
+            logger.info(f"Generated SQL query: {query}")
+        except SQLRejectedError as e:
+            logger.warning(f"Generated SQL cannot be executed: {str(e)}")
+
+    @staticmethod
+    def _sql_database(sources: List[Dict[str, Any]]) -> Optional[str]:
+        """Database of the best matching MySQL source, used as the default schema for the generated SQL."""
+        for source in sources or []:
+            if source.get("table") and not str(source["table"]).endswith(".csv"):
+                return source.get("database")
+        return None
+
+    def execute_sql(self, query: str, sources: List[Dict[str, Any]], query_type: str = "sql") -> Iterator[Dict[str, Any]]:
+        """
+        Execute generated SQL, yielding columns, row chunks and a summary with the next page cursor.
+        CSV queries run on the in-memory CSV tables.
+        """
+        if query_type == "csv":
+            return self.csv_engine.execute(query)
+        return self.sql_executor.execute(query, self._sql_database(sources))
+
+    def resume_sql(self, cursor: str) -> Iterator[Dict[str, Any]]:
+        """
+        Continue a result from the cursor of a previous page.
+        """
+        return self.sql_executor.resume(cursor)
             
 
 # Example usage
@@ -1,28 +1,49 @@
 import os
 import sys
-from typing import List, Dict, Any
+import time
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Any, Callable, Iterator, Optional, Tuple
 from langchain.schema import Document
 from google.generativeai import GenerativeModel, configure
 from langchain.prompts import PromptTemplate
-import json
 import google.generativeai as genai
 
 src_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 sys.path.append(src_dir)
 from data_sources.mysql_connector import CustomEncoder
 from data_sources.faiss_connector import FAISSConnector
-from data_sources.sqlite_connector import SQLiteConnector
+from data_sources.sqlite_connector import SQLiteConnector, normalize_query
+from data_sources.semantic_cache import SemanticCache
+from data_sources.query_templates import QueryTemplateCache
+from data_sources.column_catalog import project_record
+from agents import async_stages
+from monitoring import tracing
+from agents.single_flight import SingleFlight
+from agents.context_builder import ContextBuilder, estimate_tokens, render_table
 
 project_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
 sys.path.append(project_dir)
 from config import Config
 
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
 class RAGAgent:
-    def __init__(self):
+    def __init__(self, faiss_connector: FAISSConnector = None, column_connector: FAISSConnector = None,
+                 fingerprint_fn: Optional[Callable[[str, str], Optional[str]]] = None):
         self.model = self._init_gemini()
         self.sqlite_connector = SQLiteConnector()
+        self.semantic_cache = SemanticCache(fingerprint_fn=fingerprint_fn) if Config.SEMANTIC_CACHE else None
+        self.query_templates = QueryTemplateCache(fingerprint_fn=fingerprint_fn) if Config.QUERY_TEMPLATES else None
         self.prompt_template = self._create_prompt_template()
-        self.faiss_connector = FAISSConnector()
+        self.context_builder = ContextBuilder()
+        self.faiss_connector = faiss_connector or FAISSConnector()
+        self.column_connector = column_connector
+        self._llm_slots = asyncio.Semaphore(Config.LLM_MAX_CONCURRENCY)
+        self.single_flight = SingleFlight(
+            lease_path=self.sqlite_connector.path if Config.SINGLE_FLIGHT_CROSS_PROCESS else None)
         # self.mysql_connector = MySQLConnector()
 
     def _init_gemini(self):
@@ -45,7 +66,7 @@ class RAGAgent:
         Don't try to make up an answer.
 
         A natural language query is given to you. Convert it into a CSV or SQL query based on the schemas and sample data provided in the context.
-        In case of CSV, the query will be the Python code.
+        In case of CSV, the query will be a SQLite SELECT statement over the CSV tables, using the table names given in the context.
 
         If the data source is SQL, return:
         {{
@@ -63,10 +84,8 @@ class RAGAgent:
         """
         return PromptTemplate(template=template, input_variables=["context", "question"])
 
-    def retriever(self, query: str) -> List[Document]:
-        # Placeholder for the actual search_index function
-        results = self.faiss_connector.search_faiss(query)
-        return [Document(page_content=json.dumps(r.get('sample_data', [])),  
+    def _documents(self, results: List[Dict[str, Any]]) -> List[Document]:
+        return [Document(page_content=render_table(r),
                  metadata={
                      "score": r.get('score'), 
                      "context": r.get('context', {}),
@@ -76,44 +95,355 @@ class RAGAgent:
                  }) 
         for r in results]
 
-    def rag_function(self, query: str) -> tuple:
-        self.sqlite_connector.connect()
+    def _use_columns(self) -> bool:
+        return self.column_connector is not None and self.column_connector.index_exists()
 
-        # Check if the query result is in the SQLite persistence layer
-        persisted_answer, persisted_sources = self.sqlite_connector.get_result(query)
-        print(f"Persisted answer: {persisted_answer}")
-        if persisted_answer:
-            self.sqlite_connector.close()
-            return persisted_answer, persisted_sources
+    def retriever(self, query: str) -> List[Document]:
+        if self._use_columns():
+            results = self._search_columns(query)
+        else:
+            results = self.faiss_connector.search_faiss(query, k=Config.RETRIEVAL_TOP_K)
+        return self._documents(results)
 
-        # If not in persistence layer, perform the RAG pipeline
-        docs = self.retriever(query)
-        
-        # Prepare context
-        context = "\n\n".join([doc.page_content for doc in docs])
+    def retriever_batch(self, query_vectors) -> List[List[Document]]:
+        """Retrieve for a matrix of normalised query vectors with a single index search."""
+        if self._use_columns():
+            hits = self.column_connector.search_vectors(query_vectors, k=Config.COLUMN_SEARCH_K)
+            results = [self._tables_for_columns(h) for h in hits]
+        else:
+            results = self.faiss_connector.search_vectors(query_vectors, k=Config.RETRIEVAL_TOP_K)
+        return [self._documents(r) for r in results]
+
+    def _search_columns(self, query: str) -> List[Dict[str, Any]]:
+        return self._tables_for_columns(self.column_connector.search_faiss(query, k=Config.COLUMN_SEARCH_K))
+
+    def _tables_for_columns(self, hits: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Score each table by the sum of its best matching column scores and return
+        the top tables restricted to their matching columns.
+        """
+        by_table: Dict[int, List[Dict[str, Any]]] = {}
+        for hit in hits:
+            by_table.setdefault(hit["table_id"], []).append(hit)
+
+        scored = sorted(
+            ((sum(sorted((h["score"] for h in columns), reverse=True)[:Config.COLUMN_SCORE_TOP_N]), table_id)
+             for table_id, columns in by_table.items()),
+            reverse=True,
+        )[:Config.RETRIEVAL_TOP_K]
+
+        tables = self.faiss_connector.get_records(table_id for _, table_id in scored)
+        results = []
+        for (score, table_id), table in zip(scored, tables):
+            if table is None:
+                continue
+            matched = [h["column"] for h in by_table[table_id]]
+            results.append(dict(project_record(table, matched), score=score))
+        return results
+
+    def cached_answer(self, query: str) -> tuple:
+        """
+        Answer from the caches without calling the LLM, or (None, None).
+        """
+        with tracing.span("cache_lookup"):
+            # Check if the query result is in the SQLite persistence layer
+            persisted_answer, persisted_sources = self.sqlite_connector.get_result(query)
+            print(f"Persisted answer: {persisted_answer}")
+            tracing.count("rag_cache_lookups_total", layer="answers", result="hit" if persisted_answer else "miss")
+            if persisted_answer:
+                return persisted_answer, persisted_sources
+
+            # Questions of a known shape get their SQL by substituting the new literals
+            if self.query_templates is not None:
+                answer, template_sources = self.query_templates.lookup(query)
+                tracing.count("rag_cache_lookups_total", layer="templates", result="miss" if answer is None else "hit")
+                if answer is not None:
+                    self.sqlite_connector.store_result(query, answer, template_sources)
+                    return answer, template_sources
+
+            # Then for an earlier answer to a question with the same meaning
+            if self.semantic_cache is not None:
+                cached_answer, cached_sources = self.semantic_cache.lookup(query)
+                tracing.count("rag_cache_lookups_total", layer="semantic", result="hit" if cached_answer else "miss")
+                if cached_answer:
+                    self.sqlite_connector.store_result(query, cached_answer, cached_sources)
+                    return cached_answer, cached_sources
+
+        return None, None
+
+    def build_prompt(self, query: str) -> Tuple[str, List[Dict[str, Any]]]:
+        """
+        Retrieve context for the query and return (prompt, sources).
+        """
+        return self._prompt(query, self.retriever(query))
+
+    def _prompt(self, query: str, docs: List[Document]) -> Tuple[str, List[Dict[str, Any]]]:
+        # Prepare context: best scoring tables first, within the token budget
+        with tracing.span("prompt"):
+            context, report = self.context_builder.build(docs)
 
         print(f"Context: {context}")
         
         # Prepare the prompt
         full_prompt = self.prompt_template.format(context=context, question=query)
+        report["prompt_tokens"] = estimate_tokens(full_prompt)
+        logger.info(f"Prompt tokens: {report}")
+        self.context_builder.record(report)
+        return full_prompt, [doc.metadata for doc in docs]
+
+    def remember(self, query: str, answer: str, sources: List[Dict[str, Any]]):
+        """
+        Store a generated answer in the caches.
+        """
+        print(f"Answer: {answer}")
+
+        with tracing.span("cache_store"):
+            # Store the results in the SQLite persistence layer
+            self.sqlite_connector.store_result(query, answer, sources)
+            if self.semantic_cache is not None:
+                self.semantic_cache.store(query, answer, sources)
+            if self.query_templates is not None:
+                self.query_templates.learn(query, answer, sources)
+
+    def rag_function(self, query: str) -> tuple:
+        answer, sources = self.cached_answer(query)
+        if answer:
+            return answer, sources
+
+        # If not in persistence layer, perform the RAG pipeline
+        full_prompt, sources = self.build_prompt(query)
         
         # Get the response from the Gemini model
-        response = self.model.generate_content(full_prompt)
+        with tracing.span("llm"):
+            response = self.model.generate_content(full_prompt)
+        self.context_builder.record_usage(response)
         
         answer = response.text
+        self.remember(query, answer, sources)
+        return answer, sources
 
-        print(f"Answer: {answer}")
+    def rag_stream(self, query: str) -> Iterator[Tuple[str, Any]]:
+        """
+        rag_function as a stream of (event, data): "sources" once retrieval is done,
+        "token" for each chunk Gemini streams back, then "answer" with the full text.
+        Cached answers are emitted at once, and so is the answer of a concurrent call
+        for the same question in this process once it is done.
+        """
+        key = normalize_query(query)
+        leader, flight = self.single_flight.begin(key)
+        if not leader:
+            try:
+                answer, sources = flight.result()
+            except Exception:
+                # The call we joined failed or was abandoned; answer on our own
+                yield from self._stream(query)
+                return
+            yield "sources", sources
+            yield "answer", {"text": answer, "cached": True}
+            return
 
-        sources = [doc.metadata for doc in docs]
+        answer, sources = None, None
+        try:
+            for event, data in self._stream(query):
+                if event == "sources":
+                    sources = data
+                elif event == "answer":
+                    answer = data["text"]
+                yield event, data
+        finally:
+            if answer is not None:
+                self.single_flight.finish(key, flight, (answer, sources))
+            else:
+                error = sys.exc_info()[1]
+                if not isinstance(error, Exception):
+                    # Closed by the client (GeneratorExit) before the answer was complete
+                    error = RuntimeError("Stream closed before the answer was complete")
+                self.single_flight.finish(key, flight, error=error)
 
-        # Store the results in the SQLite persistence layer
-        self.sqlite_connector.store_result(query, answer, sources)
-        
-        self.sqlite_connector.close()
+    def _stream(self, query: str) -> Iterator[Tuple[str, Any]]:
+        answer, sources = self.cached_answer(query)
+        if answer:
+            yield "sources", sources
+            yield "answer", {"text": answer, "cached": True}
+            return
+
+        full_prompt, sources = self.build_prompt(query)
+        yield "sources", sources
+
+        llm_start = time.perf_counter()
+        response = self.model.generate_content(full_prompt, stream=True)
+        chunks = []
+        for chunk in response:
+            try:
+                text = chunk.text
+            except ValueError:
+                # Chunks without text parts (e.g. only a finish reason)
+                continue
+            chunks.append(text)
+            yield "token", text
+        # Until the last chunk, including the time the client takes to read the tokens
+        tracing.observe("llm", time.perf_counter() - llm_start, stream="true")
+        self.context_builder.record_usage(response)
+
+        answer = "".join(chunks)
+        self.remember(query, answer, sources)
+        yield "answer", {"text": answer, "cached": False}
+
+    def run_batch(self, queries: List[str], max_concurrency: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Answer many questions, yielding {"index", "answer", "sources"} (or {"index", "error"})
+        per question as soon as it is done. Cache hits come first; the misses are
+        embedded in one batch, retrieved with one index search and sent to Gemini
+        with at most `max_concurrency` calls in flight. Duplicate questions are
+        answered once.
+        """
+        groups: Dict[str, List[int]] = {}
+        for i, query in enumerate(queries):
+            groups.setdefault(normalize_query(query), []).append(i)
+
+        def fan_out(key, item):
+            for i in groups[key]:
+                yield dict(item, index=i)
+
+        with tracing.span("cache_lookup", batch="true"):
+            cached = self.sqlite_connector.get_results(queries)
+        pending = []
+        for key in groups:
+            if key in cached:
+                answer, sources = cached[key]
+                yield from fan_out(key, {"answer": answer, "sources": sources})
+            else:
+                pending.append(key)
+
+        remaining = []
+        for key in pending:
+            query = queries[groups[key][0]]
+            answer, template_sources = (self.query_templates.lookup(query) if self.query_templates is not None
+                                        else (None, None))
+            if answer is not None:
+                self.sqlite_connector.store_result(query, answer, template_sources)
+                yield from fan_out(key, {"answer": answer, "sources": template_sources})
+            else:
+                remaining.append(key)
+        if not remaining:
+            return
+
+        texts = [queries[groups[key][0]] for key in remaining]
+        vectors = self.faiss_connector.encode_queries(texts)
+        if self.semantic_cache is not None:
+            keep = []
+            for row, (key, text) in enumerate(zip(remaining, texts)):
+                answer, sources = self.semantic_cache.lookup(text, vectors[row:row + 1])
+                if answer:
+                    self.sqlite_connector.store_result(text, answer, sources)
+                    yield from fan_out(key, {"answer": answer, "sources": sources})
+                else:
+                    keep.append(row)
+            remaining, texts, vectors = [remaining[r] for r in keep], [texts[r] for r in keep], vectors[keep]
+            if not remaining:
+                return
+
+        # Questions already being answered in this process (by any caller) are joined, not asked again
+        leading, joined = {}, {}
+        for key in remaining:
+            leader, flight = self.single_flight.begin(key)
+            (leading if leader else joined)[key] = flight
+        keep = [row for row, key in enumerate(remaining) if key in leading]
+        remaining, texts, vectors = [remaining[r] for r in keep], [texts[r] for r in keep], vectors[keep]
+
+        def answer_one(key: str, query: str, query_docs: List[Document]) -> tuple:
+            try:
+                full_prompt, sources = self._prompt(query, query_docs)
+                with tracing.span("llm"):
+                    response = self.model.generate_content(full_prompt)
+                self.context_builder.record_usage(response)
+                answer = response.text
+                self.remember(query, answer, sources)
+            except BaseException as e:
+                self.single_flight.finish(key, leading[key], error=e)
+                raise
+            self.single_flight.finish(key, leading[key], (answer, sources))
+            return answer, sources
+
+        pool = ThreadPoolExecutor(max_workers=max_concurrency or Config.BATCH_LLM_CONCURRENCY,
+                                  thread_name_prefix="batch-llm")
+        try:
+            docs = self.retriever_batch(vectors) if remaining else []
+            futures = {pool.submit(answer_one, key, text, query_docs): key
+                       for key, text, query_docs in zip(remaining, texts, docs)}
+            futures.update({flight: key for key, flight in joined.items()})
+            for future in as_completed(futures):
+                try:
+                    answer, sources = future.result()
+                    item = {"answer": answer, "sources": sources}
+                except Exception as e:
+                    item = {"error": str(e)}
+                yield from fan_out(futures[future], item)
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+            for key, flight in leading.items():
+                # Questions whose call never ran (batch abandoned or retrieval failed) release their waiters
+                self.single_flight.finish(key, flight, error=RuntimeError("Batch stopped before answering the question"))
+
+    async def _generate_async(self, prompt: str):
+        async with self._llm_slots:
+            with tracing.span("llm"):
+                return await self.model.generate_content_async(prompt)
+
+    async def rag_function_async(self, query: str) -> tuple:
+        """
+        rag_function without blocking the event loop: cache lookups, retrieval and
+        cache writes run on the pipeline thread pool, the Gemini call uses the async
+        client with at most LLM_MAX_CONCURRENCY calls in flight.
+        """
+        answer, sources = await async_stages.in_thread("cache", Config.CACHE_STAGE_TIMEOUT, self.cached_answer, query)
+        if answer:
+            return answer, sources
+
+        full_prompt, sources = await async_stages.in_thread(
+            "retrieval", Config.RETRIEVAL_STAGE_TIMEOUT, self.build_prompt, query)
+
+        response = await async_stages.stage("llm", Config.LLM_STAGE_TIMEOUT, self._generate_async(full_prompt))
+        self.context_builder.record_usage(response)
+
+        answer = response.text
+        await async_stages.in_thread("cache_write", Config.CACHE_STAGE_TIMEOUT, self.remember, query, answer, sources)
         return answer, sources
 
+    def cache_stats(self) -> Dict[str, Any]:
+        stats = {"answers": self.sqlite_connector.stats()}
+        if self.semantic_cache is not None:
+            stats["semantic"] = self.semantic_cache.stats()
+        if self.query_templates is not None:
+            stats["templates"] = self.query_templates.stats()
+        stats["single_flight"] = self.single_flight.stats()
+        stats["prompt"] = self.context_builder.stats()
+        return stats
+
+    def _shared_rag_function(self, query: str) -> tuple:
+        result = self.rag_function(query)
+        if self.single_flight.cross_process:
+            # Other processes re-read the cache once the lease is released
+            self.sqlite_connector.flush()
+        return result
+
     def run_rag_pipeline(self, query: str) -> tuple:
-        return self.rag_function(query)
+        """
+        Run the pipeline once per normalized query: concurrent duplicates share the result.
+        """
+        return self.single_flight.do(normalize_query(query), lambda: self._shared_rag_function(query))
+
+    async def _shared_rag_function_async(self, query: str) -> tuple:
+        result = await self.rag_function_async(query)
+        if self.single_flight.cross_process:
+            await async_stages.in_thread("cache_write", Config.CACHE_STAGE_TIMEOUT, self.sqlite_connector.flush)
+        return result
+
+    async def run_rag_pipeline_async(self, query: str) -> tuple:
+        """
+        run_rag_pipeline on the event loop: concurrent duplicates (async or threaded) share the result.
+        """
+        return await self.single_flight.do_async(normalize_query(query), lambda: self._shared_rag_function_async(query))
 
 # Example usage
 if __name__ == "__main__":
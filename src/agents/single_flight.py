@@ -0,0 +1,177 @@
+import os
+import sys
+import time
+import asyncio
+import sqlite3
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+project_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.append(project_dir)
+from config import Config
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls that share a key.
+
+    Within a process the first caller runs the function and duplicates that
+    arrive while it is in flight wait on the same future, whether they call
+    from threads (`do`), the event loop (`do_async`) or drive the call
+    themselves (`begin` / `finish`, e.g. a streamed answer). With `lease_path`
+    set, callers in other processes on the host are coordinated through a
+    lease row in that SQLite file: a process that finds the key leased waits
+    for the lease to be released (or to expire) before running the function
+    itself, by which time the answer is normally in the shared cache.
+    """
+
+    def __init__(self, lease_path: Optional[str] = None, lease_seconds: Optional[float] = None,
+                 poll_interval: float = 0.05):
+        self.lease_path = lease_path
+        self.lease_seconds = lease_seconds or Config.SINGLE_FLIGHT_LEASE_SECONDS
+        self.poll_interval = poll_interval
+        self.owner = f"{os.getpid()}-{id(self)}"
+        self._calls: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._counters = {"leaders": 0, "shared": 0, "lease_waits": 0}
+
+    @property
+    def cross_process(self) -> bool:
+        return self.lease_path is not None
+
+    def _count(self, name: str):
+        with self._lock:
+            self._counters[name] += 1
+
+    def begin(self, key: str) -> Tuple[bool, Future]:
+        """
+        Join the call in flight for `key`, or start one. Returns (leader, future): the
+        leader must call finish() with the outcome, others wait on the future.
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self._counters["shared"] += 1
+                return False, future
+            future = Future()
+            self._calls[key] = future
+            self._counters["leaders"] += 1
+            return True, future
+
+    def finish(self, key: str, future: Future, result: Any = None, error: Optional[BaseException] = None):
+        """Publish the leader's result (or error) to the callers waiting on `future`."""
+        with self._lock:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        """Return fn(), sharing one execution among concurrent callers with the same key."""
+        leader, future = self.begin(key)
+        if not leader:
+            return future.result()
+        try:
+            result = self._run(key, fn)
+        except BaseException as e:
+            self.finish(key, future, error=e)
+            raise
+        self.finish(key, future, result)
+        return result
+
+    async def do_async(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """do() for coroutines: await fn() once among concurrent callers (threads included) with the same key."""
+        leader, future = self.begin(key)
+        if not leader:
+            # Shielded: a follower giving up must not cancel the leader's future
+            return await asyncio.shield(asyncio.wrap_future(future))
+        try:
+            result = await self._run_async(key, fn)
+        except BaseException as e:
+            self.finish(key, future, error=e)
+            raise
+        self.finish(key, future, result)
+        return result
+
+    def _run(self, key: str, fn: Callable[[], Any]) -> Any:
+        if not self.cross_process:
+            return fn()
+        leased = self._acquire_lease(key)
+        try:
+            return fn()
+        finally:
+            if leased:
+                self._release_lease(key)
+
+    async def _run_async(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        if not self.cross_process:
+            return await fn()
+        loop = asyncio.get_running_loop()
+        leased = await loop.run_in_executor(None, self._acquire_lease, key)
+        try:
+            return await fn()
+        finally:
+            if leased:
+                await loop.run_in_executor(None, self._release_lease, key)
+
+    # Cross-process leases
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.lease_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute('''CREATE TABLE IF NOT EXISTS single_flight_leases
+                            (key TEXT PRIMARY KEY, owner TEXT, expires_at REAL)''')
+            self._local.conn = conn
+        return conn
+
+    def _acquire_lease(self, key: str) -> bool:
+        """
+        Wait until this process holds the lease for `key`. Gives up after
+        lease_seconds and returns False, in which case the caller runs unleased.
+        """
+        conn = self._connection()
+        deadline = time.monotonic() + self.lease_seconds
+        waited = False
+        while True:
+            now = time.time()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("DELETE FROM single_flight_leases WHERE key = ? AND expires_at < ?", (key, now))
+                acquired = conn.execute(
+                    "INSERT OR IGNORE INTO single_flight_leases (key, owner, expires_at) VALUES (?, ?, ?)",
+                    (key, self.owner, now + self.lease_seconds),
+                ).rowcount == 1
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            if acquired:
+                return True
+            if not waited:
+                waited = True
+                self._count("lease_waits")
+            if time.monotonic() >= deadline:
+                logger.warning(f"Timed out waiting for the single-flight lease on '{key}'")
+                return False
+            time.sleep(self.poll_interval)
+
+    def _release_lease(self, key: str):
+        self._connection().execute("DELETE FROM single_flight_leases WHERE key = ? AND owner = ?", (key, self.owner))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._counters)
+            stats["in_flight"] = len(self._calls)
+        return stats
@@ -0,0 +1,190 @@
+import os
+import sys
+import json
+import logging
+import threading
+from typing import Callable, Dict, Any, List, Optional
+
+project_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.append(project_dir)
+from config import Config
+
+src_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(src_dir)
+from data_sources.faiss_connector import entry_id
+from data_sources.column_catalog import column_records, column_ids
+from monitoring import tracing
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+class CatalogManager:
+    """
+    Keeps the FAISS catalog in sync with MySQL tables and CSV files.
+
+    Every table/file is tracked by a fingerprint; a sync re-extracts and
+    re-embeds only entries whose fingerprint changed and removes entries
+    that disappeared, addressing them by their stable id in the index.
+    The state file is reloaded whenever another worker process rewrites it,
+    so fingerprint() reflects syncs run elsewhere.
+    """
+
+    def __init__(self, mysql_connector, csv_connector, faiss_connector, state_file: Optional[str] = None,
+                 column_connector=None):
+        self.mysql_connector = mysql_connector
+        self.csv_connector = csv_connector
+        self.faiss_connector = faiss_connector
+        self.column_connector = column_connector
+        self.state_file = state_file or Config.CATALOG_STATE_FILE
+        self._state_signature: Optional[tuple] = None
+        self.state: Dict[str, Dict[str, Any]] = self._load_state()
+        self._lock = threading.Lock()
+
+    def _signature(self) -> Optional[tuple]:
+        try:
+            stat = os.stat(self.state_file)
+        except OSError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _load_state(self) -> Dict[str, Dict[str, Any]]:
+        if self.state_file and os.path.exists(self.state_file):
+            try:
+                self._state_signature = self._signature()
+                with open(self.state_file, "r") as f:
+                    return json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable catalog state {self.state_file}: {e}")
+        return {}
+
+    def _refresh_state(self):
+        """Reload the state file if another process replaced it since we last read or wrote it."""
+        if self.state_file and self._signature() not in (None, self._state_signature):
+            self.state = self._load_state()
+
+    def _save_state(self):
+        if not self.state_file:
+            return
+        tmp_file = f"{self.state_file}.tmp"
+        with open(tmp_file, "w") as f:
+            json.dump(self.state, f)
+        os.replace(tmp_file, self.state_file)
+        self._state_signature = self._signature()
+
+    def current_fingerprints(self) -> Dict[str, Dict[str, Any]]:
+        """Collect {entry_id: {source, database, table, fingerprint}} for every source."""
+        entries = {}
+        for (database, table), fingerprint in self.mysql_connector.get_table_fingerprints().items():
+            entries[str(entry_id(database, table))] = {
+                "source": "mysql", "database": database, "table": table, "fingerprint": fingerprint
+            }
+        csv_directory = self.csv_connector.csv_directory
+        for filename, fingerprint in self.csv_connector.get_file_fingerprints().items():
+            entries[str(entry_id(csv_directory, filename))] = {
+                "source": "csv", "database": csv_directory, "table": filename, "fingerprint": fingerprint
+            }
+        return entries
+
+    def fingerprint(self, database: str, table: str) -> Optional[str]:
+        """Fingerprint recorded at the last sync (in any worker process) for a table, or None if unknown."""
+        self._refresh_state()
+        entry = self.state.get(str(entry_id(database, table)))
+        return entry["fingerprint"] if entry else None
+
+    def _extract_all(self, entries: List[Dict[str, Any]]) -> Dict[int, Dict[str, Any]]:
+        """Extract records for the given entries, batching MySQL metadata lookups and CSV profiling."""
+        records = []
+        mysql_tables = [(e["database"], e["table"]) for e in entries if e["source"] == "mysql"]
+        if mysql_tables:
+            with tracing.span("extract", source="mysql"):
+                records += self.mysql_connector.extract_tables(mysql_tables)
+        csv_files = [e["table"] for e in entries if e["source"] == "csv"]
+        if csv_files:
+            with tracing.span("extract", source="csv"):
+                records += self.csv_connector.extract_files(csv_files)
+        return {entry_id(r["database"], r["table"]): r for r in records if r}
+
+    def _remove_columns(self, table_ids: List[int]):
+        """Drop the column entries of tables that changed or disappeared."""
+        old_records = self.faiss_connector.get_records(table_ids)
+        ids = [i for record in old_records if record for i in column_ids(record)]
+        self.column_connector.remove(ids)
+
+    def sync(self, force: bool = False, progress: Optional[Callable[[str], None]] = None) -> Dict[str, int]:
+        """
+        Bring the index up to date with the sources.
+        Returns counts of added, changed, removed and unchanged entries.
+
+        A rebuild starts from empty working copies; searches keep using the
+        published index until the new one is saved. `progress` is called with
+        each phase name (fingerprints, extract, tables, columns) as it starts.
+        """
+        progress = progress or (lambda phase: None)
+        with self._lock:
+            try:
+                return self._sync(force, progress)
+            except Exception:
+                # Searches never saw the half-updated working copies; reload them from the published index
+                self.faiss_connector.rollback()
+                if self.column_connector is not None:
+                    self.column_connector.rollback()
+                raise
+
+    def _sync(self, force: bool, progress: Callable[[str], None]) -> Dict[str, int]:
+        progress("fingerprints")
+        self._refresh_state()
+        current = self.current_fingerprints()
+        rebuild = force or not self.state or not self.faiss_connector.index_exists()
+        previous = {} if rebuild else self.state
+
+        added = [i for i in current if i not in previous]
+        changed = [i for i in current if i in previous and previous[i]["fingerprint"] != current[i]["fingerprint"]]
+        removed = [i for i in previous if i not in current]
+
+        if rebuild:
+            self.faiss_connector.reset()
+            if self.column_connector is not None:
+                self.column_connector.reset()
+
+        progress("extract")
+        records = self._extract_all([current[i] for i in added + changed])
+        for i in added + changed:
+            if int(i) not in records:
+                current.pop(i)
+
+        if self.column_connector is not None and not rebuild:
+            self._remove_columns([int(i) for i in changed + removed])
+
+        progress("tables")
+        self.faiss_connector.remove(int(i) for i in removed)
+        self.faiss_connector.upsert(records)
+        if rebuild or added or changed or removed:
+            self.faiss_connector.save()
+
+        if self.column_connector is not None:
+            progress("columns")
+            columns = {}
+            for record in records.values():
+                columns.update(column_records(record))
+            self.column_connector.upsert(columns)
+            if rebuild or added or changed or removed:
+                self.column_connector.save()
+
+        self.state = current
+        self._save_state()
+
+        report = {
+            "added": len(added),
+            "changed": len(changed),
+            "removed": len(removed),
+            "unchanged": len(current) - len(records),
+        }
+        if records and self.faiss_connector.last_encode_report:
+            report["embedding_cache"] = self.faiss_connector.last_encode_report
+        harvest = getattr(self.mysql_connector, "last_harvest_report", None)
+        if records and harvest:
+            report["samples_skipped"] = len(harvest["skipped"])
+        logger.info(f"Catalog sync: {report}")
+        return report
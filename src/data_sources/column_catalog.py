@@ -0,0 +1,72 @@
+import os
+import sys
+from typing import List, Dict, Any, Iterable
+
+src_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(src_dir)
+from data_sources.faiss_connector import entry_id
+
+MAX_COLUMN_SAMPLE_VALUES = 5
+
+
+def column_names(record: Dict[str, Any]) -> List[str]:
+    """Column names of a table record; MySQL schemas are dicts, CSV schemas are header strings."""
+    return [c["Field"] if isinstance(c, dict) else str(c) for c in record.get("schema") or []]
+
+
+def _column_values(record: Dict[str, Any], position: int, name: str) -> List[Any]:
+    values = []
+    for row in record.get("sample_data") or []:
+        if isinstance(row, dict):
+            value = row.get(name)
+        elif position < len(row):
+            value = row[position]
+        else:
+            continue
+        if value not in (None, "") and value not in values:
+            values.append(value)
+        if len(values) >= MAX_COLUMN_SAMPLE_VALUES:
+            break
+    return values
+
+
+def column_records(record: Dict[str, Any]) -> Dict[int, Dict[str, Any]]:
+    """Split a table record into {column_id: column record} linked to the table by table_id."""
+    database, table = record.get("database"), record.get("table")
+    table_id = entry_id(database, table)
+    profiles = (record.get("profile") or {}).get("columns") or {}
+    columns = {}
+    for position, column in enumerate(record.get("schema") or []):
+        name = column["Field"] if isinstance(column, dict) else str(column)
+        columns[entry_id(database, table, name)] = {
+            "database": database,
+            "table": table,
+            "table_id": table_id,
+            "column": name,
+            "type": column.get("Type") if isinstance(column, dict) else profiles.get(name, {}).get("type"),
+            "sample_values": [str(v) for v in _column_values(record, position, name)],
+        }
+    return columns
+
+
+def column_ids(record: Dict[str, Any]) -> List[int]:
+    return [entry_id(record.get("database"), record.get("table"), name) for name in column_names(record)]
+
+
+def project_record(record: Dict[str, Any], columns: Iterable[str]) -> Dict[str, Any]:
+    """Copy of a table record restricted to `columns` (key columns are always kept)."""
+    wanted = set(columns)
+    schema = record.get("schema") or []
+    keep = [
+        i for i, c in enumerate(schema)
+        if (c["Field"] if isinstance(c, dict) else str(c)) in wanted
+        or (isinstance(c, dict) and c.get("Key") == "PRI")
+    ]
+    names = [column_names(record)[i] for i in keep]
+    sample_data = []
+    for row in record.get("sample_data") or []:
+        if isinstance(row, dict):
+            sample_data.append({name: row.get(name) for name in names})
+        else:
+            sample_data.append([row[i] for i in keep if i < len(row)])
+    return dict(record, schema=[schema[i] for i in keep], sample_data=sample_data)
@@ -1,13 +1,16 @@
 import os
 import sys
-import csv
+import hashlib
 import logging
 from typing import List, Dict, Any
 
 project_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
 sys.path.append(project_dir)
 from config import Config
-from config import Config
+
+src_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(src_dir)
+from data_sources.csv_profiler import CSVProfileCache
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -18,50 +21,54 @@ class CSVConnector:
         self.csv_directory = Config.CSV_DIRECTORY
         self.encoding = Config.ENCODING
         self.max_sample_rows = Config.MAX_SAMPLE_ROWS
+        self.profiles = CSVProfileCache(self.csv_directory, self.encoding)
 
     def extract_all_csv_data(self) -> List[Dict[str, Any]]:
-        all_data = []
+        return self.extract_files(sorted(self.get_file_fingerprints()), prune=True)
 
+    def get_file_fingerprints(self) -> Dict[str, str]:
+        """
+        Fingerprint every CSV file by mtime, size and a hash of its header line.
+        Returns {filename: fingerprint}.
+        """
+        fingerprints = {}
         try:
             for filename in os.listdir(self.csv_directory):
                 if filename.endswith('.csv'):
-                    file_data = self._process_csv_file(filename)
-                    if file_data:
-                        all_data.append(file_data)
+                    filepath = os.path.join(self.csv_directory, filename)
+                    stat = os.stat(filepath)
+                    with open(filepath, 'rb') as f:
+                        header_hash = hashlib.sha1(f.readline()).hexdigest()
+                    fingerprints[filename] = f"{stat.st_mtime_ns}|{stat.st_size}|{header_hash}"
         except OSError as e:
-            self.logger.error(f"Error accessing directory {self.csv_directory}: {e}")
+            logger.error(f"Error accessing directory {self.csv_directory}: {e}")
+        return fingerprints
 
-        return all_data
+    def extract_files(self, filenames: List[str], prune: bool = False) -> List[Dict[str, Any]]:
+        """
+        Records for the given CSV files. Each carries a profile of every column
+        (type, nulls, min/max, approximate distinct count) and a reservoir sample
+        of rows; profiles come from the cache unless the file changed. Pass
+        `prune` only when `filenames` is the full listing: cached profiles of
+        other files are then dropped.
+        """
+        fingerprints = self.get_file_fingerprints()
+        wanted = {name: fingerprints[name] for name in filenames if name in fingerprints}
+        profiles = self.profiles.profiles(wanted, prune=prune)
+        records = []
+        for filename in filenames:
+            profile = profiles.get(filename)
+            if profile is None:
+                continue
+            records.append({
+                "database": self.csv_directory,
+                "table": filename,
+                "schema": profile["schema"],
+                "sample_data": profile["sample_data"],
+                "profile": {"row_count": profile["row_count"], "columns": profile["columns"]},
+            })
+        return records
 
     def _process_csv_file(self, filename: str) -> Dict[str, Any]:
-        filepath = os.path.join(self.csv_directory, filename)
-        try:
-            with open(filepath, 'r', newline='', encoding=self.encoding) as csvfile:
-                csv_reader = csv.reader(csvfile)
-                schema = next(csv_reader, [])
-                sample_data = self._get_sample_data(csv_reader)
-
-                return {
-                    "database": self.csv_directory,
-                    "table": filename,
-                    "schema": schema,
-                    "sample_data": sample_data
-                }
-        except IOError as e:
-            self.logger.error(f"Error reading file {filepath}: {e}")
-        except csv.Error as e:
-            self.logger.error(f"CSV error in file {filepath}: {e}")
-        return {}
-
-    def _get_sample_data(self, csv_reader) -> List[List[str]]:
-        sample_data = []
-        for _ in range(self.max_sample_rows):
-            try:
-                row = next(csv_reader, None)
-                if row is None:
-                    break
-                sample_data.append(row)
-            except csv.Error as e:
-                self.logger.warning(f"Error reading row: {e}")
-                break
-        return sample_data
\ No newline at end of file
+        records = self.extract_files([filename])
+        return records[0] if records else {}
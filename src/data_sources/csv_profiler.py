@@ -0,0 +1,252 @@
+import os
+import re
+import sys
+import csv
+import json
+import hashlib
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+project_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.append(project_dir)
+from config import Config
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+NULL_VALUES = {"", "null", "NULL", "None", "NA", "N/A", "nan", "NaN"}
+# Type lattice: a column widens from left to right as values stop fitting
+TYPES = ("integer", "float", "date", "datetime", "text")
+_DATE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+_DATETIME = re.compile(r"^\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}(:\d{2}(\.\d+)?)?(Z|[+-]\d{2}:?\d{2})?$")
+MAX_TEXT_BOUND_CHARS = 64
+MAX_NUMBER_CHARS = 40
+
+
+class HyperLogLog:
+    """Approximate distinct counter with 2**p one-byte registers (standard error ~1.04 / sqrt(2**p))."""
+
+    def __init__(self, p: int = 12):
+        self.p = p
+        self.m = 1 << p
+        self.registers = np.zeros(self.m, dtype=np.uint8)
+
+    def add_hashes(self, hashes: np.ndarray):
+        """Add 64-bit hashes (uint64 array)."""
+        if not len(hashes):
+            return
+        index = (hashes >> np.uint64(64 - self.p)).astype(np.int64)
+        rest = hashes & np.uint64((1 << (64 - self.p)) - 1)
+        bits = 64 - self.p
+        # Position of the leftmost 1-bit in the remaining `bits` bits (bits + 1 when all are zero)
+        _, exponent = np.frexp(rest.astype(np.float64))
+        rank = np.where(rest == 0, bits + 1, bits - exponent + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def add(self, values: List[str]):
+        # Stable across processes and runs, unlike the salted builtin hash()
+        self.add_hashes(np.fromiter(
+            (int.from_bytes(hashlib.blake2b(v.encode("utf-8", "surrogatepass"), digest_size=8).digest(), "little")
+             for v in values), dtype=np.uint64, count=len(values)))
+
+    def merge(self, other: "HyperLogLog"):
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def count(self) -> int:
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        estimate = alpha * self.m ** 2 / np.sum(np.power(2.0, -self.registers.astype(np.float64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * self.m and zeros:
+            estimate = self.m * np.log(self.m / zeros)
+        return int(round(estimate))
+
+
+class _ColumnProfile:
+    def __init__(self, p: int):
+        self.type_index = 0
+        self.nulls = 0
+        self.numeric_min: Optional[float] = None
+        self.numeric_max: Optional[float] = None
+        self.text_min: Optional[str] = None
+        self.text_max: Optional[str] = None
+        self.sketch = HyperLogLog(p)
+
+    def _widen(self, values: List[str]) -> Optional[np.ndarray]:
+        """
+        Move up to the narrowest type that fits every value of the chunk and
+        return the values as numbers when that type is numeric.
+        """
+        array = None
+        while TYPES[self.type_index] != "text":
+            kind = TYPES[self.type_index]
+            if kind in ("integer", "float"):
+                if array is None:
+                    # Long strings are never numbers; don't build a wide fixed-width array for them
+                    if max(map(len, values)) > MAX_NUMBER_CHARS:
+                        self.type_index = TYPES.index("date")
+                        continue
+                    array = np.asarray(values)
+                try:
+                    return array.astype(np.int64 if kind == "integer" else np.float64)
+                except (ValueError, OverflowError):
+                    self.type_index += 1
+                    continue
+            pattern = _DATE if kind == "date" else _DATETIME
+            if all(pattern.match(v) for v in values):
+                return None
+            self.type_index += 1
+        return None
+
+    def update(self, values: List[str]):
+        present = [v for v in values if v not in NULL_VALUES]
+        self.nulls += len(values) - len(present)
+        if not present:
+            return
+        self.sketch.add(present)
+        numbers = self._widen(present)
+        if numbers is not None:
+            low, high = float(numbers.min()), float(numbers.max())
+            self.numeric_min = low if self.numeric_min is None else min(self.numeric_min, low)
+            self.numeric_max = high if self.numeric_max is None else max(self.numeric_max, high)
+        low, high = min(present), max(present)
+        self.text_min = low if self.text_min is None else min(self.text_min, low)
+        self.text_max = high if self.text_max is None else max(self.text_max, high)
+
+    def result(self) -> Dict[str, Any]:
+        kind = TYPES[self.type_index]
+        if self.text_min is None:
+            kind, low, high = "empty", None, None
+        elif kind in ("integer", "float"):
+            cast = int if kind == "integer" else float
+            low, high = cast(self.numeric_min), cast(self.numeric_max)
+        else:
+            low, high = self.text_min[:MAX_TEXT_BOUND_CHARS], self.text_max[:MAX_TEXT_BOUND_CHARS]
+        return {"type": kind, "nulls": self.nulls, "min": low, "max": high, "distinct": self.sketch.count()}
+
+
+def profile_csv(path: str, encoding: str = "utf-8", chunk_rows: int = 50000, sample_rows: int = 10,
+                hll_precision: int = 12, seed: int = 0) -> Dict[str, Any]:
+    """
+    Profile a CSV file in one pass with memory bounded by `chunk_rows`.
+    Returns {"schema", "row_count", "columns": {name: {type, nulls, min, max, distinct}}, "sample_data"}.
+    """
+    rng = np.random.default_rng(seed)
+    with open(path, "r", newline="", encoding=encoding, errors="replace") as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        width = len(header)
+        columns = [_ColumnProfile(hll_precision) for _ in header]
+        sample: List[List[str]] = []
+        row_count = 0
+        while True:
+            chunk = [(row + [""] * width)[:width] for row in _take(reader, chunk_rows) if row]
+            if not chunk:
+                break
+            for column, values in zip(columns, zip(*chunk)):
+                column.update(list(values))
+
+            # Reservoir sample (algorithm R), vectorised over the chunk
+            fill = min(len(chunk), max(0, sample_rows - len(sample)))
+            sample.extend(chunk[:fill])
+            if fill < len(chunk):
+                positions = np.arange(row_count + fill, row_count + len(chunk))
+                slots = rng.integers(0, positions + 1)
+                for offset in np.nonzero(slots < sample_rows)[0]:
+                    sample[slots[offset]] = chunk[fill + offset]
+            row_count += len(chunk)
+
+    return {
+        "schema": header,
+        "row_count": row_count,
+        "columns": {name: column.result() for name, column in zip(header, columns)},
+        "sample_data": sample,
+    }
+
+
+def _take(reader, count: int) -> List[List[str]]:
+    rows = []
+    for row in reader:
+        rows.append(row)
+        if len(rows) >= count:
+            break
+    return rows
+
+
+class CSVProfileCache:
+    """
+    Profiles of the CSV files in a directory, cached in a JSON file by file
+    fingerprint so unchanged files are never re-read. Files that need
+    profiling are spread over a process pool.
+    """
+
+    def __init__(self, directory: str, encoding: Optional[str] = None, cache_file: Optional[str] = None,
+                 max_workers: Optional[int] = None):
+        self.directory = directory
+        self.encoding = encoding or "utf-8"
+        self.cache_file = cache_file if cache_file is not None else Config.CSV_PROFILE_CACHE_FILE
+        self.max_workers = max_workers or Config.CSV_PROFILE_WORKERS
+        self.entries: Optional[Dict[str, Dict[str, Any]]] = None
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        if self.entries is None:
+            self.entries = {}
+            if self.cache_file and os.path.exists(self.cache_file):
+                try:
+                    with open(self.cache_file, "r") as f:
+                        self.entries = json.load(f)
+                except (OSError, ValueError) as e:
+                    logger.warning(f"Ignoring unreadable CSV profile cache {self.cache_file}: {e}")
+        return self.entries
+
+    def _save(self):
+        if not self.cache_file:
+            return
+        tmp_path = f"{self.cache_file}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.entries, f)
+        os.replace(tmp_path, self.cache_file)
+
+    def profiles(self, fingerprints: Dict[str, str], prune: bool = False) -> Dict[str, Dict[str, Any]]:
+        """
+        Profiles for {filename: fingerprint}, profiling only files whose fingerprint changed.
+        With `prune`, `fingerprints` lists every file and cached profiles of the others are dropped.
+        """
+        entries = self._load()
+        stale = [name for name, fingerprint in fingerprints.items()
+                 if entries.get(name, {}).get("fingerprint") != fingerprint]
+        if stale:
+            paths = [os.path.join(self.directory, name) for name in stale]
+            kwargs = dict(encoding=self.encoding, chunk_rows=Config.CSV_PROFILE_CHUNK_ROWS,
+                          sample_rows=Config.MAX_SAMPLE_ROWS)
+            if len(stale) == 1 or self.max_workers == 1:
+                results = [_profile_or_none(path, kwargs) for path in paths]
+            else:
+                # Never fork: the app already runs threads (warm-up, rebuilds, cache writer) whose
+                # locks a forked child would inherit; profile_csv only needs plain arguments
+                start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+                with ProcessPoolExecutor(max_workers=min(self.max_workers, len(stale)),
+                                         mp_context=multiprocessing.get_context(start_method)) as pool:
+                    results = list(pool.map(_profile_or_none, paths, [kwargs] * len(paths)))
+            for name, profile in zip(stale, results):
+                if profile is not None:
+                    entries[name] = {"fingerprint": fingerprints[name], "profile": profile}
+            logger.info(f"Profiled {len(stale)} CSV files")
+        removed = set(entries) - set(fingerprints) if prune else set()
+        for name in removed:
+            del entries[name]
+        if stale or removed:
+            self._save()
+        return {name: entries[name]["profile"] for name in fingerprints if name in entries}
+
+
+def _profile_or_none(path: str, kwargs: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    try:
+        return profile_csv(path, **kwargs)
+    except (OSError, csv.Error) as e:
+        logger.error(f"Error profiling CSV file {path}: {e}")
+        return None
@@ -0,0 +1,192 @@
+import os
+import re
+import sys
+import csv
+import time
+import sqlite3
+import logging
+import itertools
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+project_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.append(project_dir)
+from config import Config
+
+src_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(src_dir)
+from data_sources.sql_executor import check_read_only, json_value
+from monitoring import tracing
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Statements a query may consist of; everything else (ATTACH, PRAGMA, writes, ...) is denied
+_ALLOWED_ACTIONS = {sqlite3.SQLITE_SELECT, sqlite3.SQLITE_READ, sqlite3.SQLITE_FUNCTION, sqlite3.SQLITE_RECURSIVE}
+_INTEGER = re.compile(r"^[+-]?\d+$")
+_REAL = re.compile(r"^[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?$")
+# Rows read to infer column types before the rest of the file is streamed in
+TYPE_SAMPLE_ROWS = 10000
+INT64_MIN, INT64_MAX = -2 ** 63, 2 ** 63 - 1
+
+
+def csv_table_name(filename: str) -> str:
+    """SQL table name for a CSV file: the file stem with non-identifier characters replaced."""
+    name = re.sub(r"\W", "_", os.path.splitext(filename)[0])
+    return f"t_{name}" if not name or name[0].isdigit() else name
+
+
+def quote_name(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _is_int64(value: str) -> bool:
+    return bool(_INTEGER.match(value)) and INT64_MIN <= int(value) <= INT64_MAX
+
+
+def _column_type(values: List[str]) -> str:
+    present = [v for v in values if v != ""]
+    if present and all(_is_int64(v) for v in present):
+        return "INTEGER"
+    if present and all(_REAL.match(v) for v in present):
+        return "REAL"
+    return "TEXT"
+
+
+def _convert(value: str, column_type: str) -> Any:
+    """
+    Value for a column of the type inferred from the sample. Values past the
+    sample that do not fit (text, integers beyond 64 bits) are stored as REAL
+    or TEXT rather than failing the load.
+    """
+    if value == "":
+        return None
+    if column_type == "INTEGER" and _is_int64(value):
+        return int(value)
+    if column_type in ("INTEGER", "REAL") and _REAL.match(value):
+        return float(value)
+    return value
+
+
+class CSVQueryEngine:
+    """
+    SQL over the CSV files of a directory.
+
+    Each file is streamed once into a typed table of an in-process SQLite
+    database (INTEGER / REAL / TEXT inferred per column from the first
+    TYPE_SAMPLE_ROWS rows) and reloaded when its mtime or size changes; a
+    file that fails to load keeps its previous table and is retried on the
+    next refresh. Queries are single read-only statements run
+    under an authorizer that only permits reads, with a row limit and a
+    time limit.
+    """
+
+    def __init__(self, directory: Optional[str] = None, encoding: Optional[str] = None,
+                 max_rows: Optional[int] = None, timeout: Optional[float] = None, chunk_size: Optional[int] = None):
+        self.directory = directory or Config.CSV_DATA_DIRECTORY or Config.CSV_DIRECTORY
+        self.encoding = encoding or Config.ENCODING or "utf-8"
+        self.max_rows = max_rows or Config.RESULT_MAX_ROWS
+        self.timeout = timeout or Config.RESULT_TIMEOUT
+        self.chunk_size = chunk_size or Config.RESULT_CHUNK_ROWS
+        self.conn = sqlite3.connect(":memory:", check_same_thread=False)
+        self.tables: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.RLock()
+
+    def _signature(self, path: str) -> Tuple[int, int]:
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def _load(self, filename: str, signature: Tuple[int, int]):
+        path = os.path.join(self.directory, filename)
+        table = csv_table_name(filename)
+        staging = f"{table}__loading"
+        with open(path, "r", newline="", encoding=self.encoding) as f:
+            reader = csv.reader(f)
+            header = next(reader, [])
+            width = len(header)
+            rows = ((row + [""] * width)[:width] for row in reader if row)
+            sample = list(itertools.islice(rows, TYPE_SAMPLE_ROWS))
+            types = [_column_type([row[i] for row in sample]) for i in range(width)]
+            columns = ", ".join(f"{quote_name(name)} {column_type}" for name, column_type in zip(header, types))
+
+            self.conn.execute(f"DROP TABLE IF EXISTS {quote_name(staging)}")
+            self.conn.execute(f"CREATE TABLE {quote_name(staging)} ({columns})")
+            try:
+                cursor = self.conn.executemany(
+                    f"INSERT INTO {quote_name(staging)} VALUES ({', '.join('?' * width)})",
+                    ([_convert(v, t) for v, t in zip(row, types)] for row in itertools.chain(sample, rows)),
+                )
+                row_count = cursor.rowcount
+                self.conn.execute(f"DROP TABLE IF EXISTS {quote_name(table)}")
+                self.conn.execute(f"ALTER TABLE {quote_name(staging)} RENAME TO {quote_name(table)}")
+                self.conn.commit()
+            except BaseException:
+                self.conn.rollback()
+                self.conn.execute(f"DROP TABLE IF EXISTS {quote_name(staging)}")
+                raise
+        self.tables[filename] = {"table": table, "signature": signature, "columns": dict(zip(header, types)),
+                                 "rows": row_count}
+        logger.info(f"Loaded CSV {filename} into table {table} ({row_count} rows)")
+
+    def refresh(self):
+        """Load new or changed CSV files and drop the tables of removed ones."""
+        with self._lock:
+            try:
+                filenames = [f for f in os.listdir(self.directory) if f.endswith(".csv")]
+            except OSError as e:
+                logger.error(f"Error accessing directory {self.directory}: {e}")
+                return
+            for filename in filenames:
+                try:
+                    signature = self._signature(os.path.join(self.directory, filename))
+                    if self.tables.get(filename, {}).get("signature") != signature:
+                        self._load(filename, signature)
+                except Exception as e:
+                    # One bad file must not take down queries over the others
+                    logger.error(f"Error loading CSV file {filename}: {e}")
+            for filename in set(self.tables) - set(filenames):
+                self.conn.execute(f"DROP TABLE IF EXISTS {quote_name(self.tables.pop(filename)['table'])}")
+            self.conn.commit()
+
+    @staticmethod
+    def _authorize(action, *args):
+        return sqlite3.SQLITE_OK if action in _ALLOWED_ACTIONS else sqlite3.SQLITE_DENY
+
+    def execute(self, sql: str) -> Iterator[Dict[str, Any]]:
+        """
+        Yield {"columns": [...]}, {"rows": [...]} per chunk and a {"summary": {...}},
+        in the same shape as SQLExecutor.execute.
+        """
+        sql = check_read_only(sql)
+        self.refresh()
+        start = time.monotonic()
+        deadline = start + self.timeout
+        with self._lock:
+            self.conn.set_authorizer(self._authorize)
+            self.conn.set_progress_handler(lambda: int(time.monotonic() > deadline), 10000)
+            try:
+                with tracing.span("sql_execute", source="csv"):
+                    cursor = self.conn.execute(sql)
+                    columns = [column[0] for column in cursor.description or []]
+                    rows = cursor.fetchmany(self.max_rows + 1)
+            except sqlite3.OperationalError as e:
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"CSV query exceeded {self.timeout}s") from e
+                raise
+            finally:
+                self.conn.set_authorizer(None)
+                self.conn.set_progress_handler(None, 0)
+
+        truncated = "rows" if len(rows) > self.max_rows else None
+        rows = [[json_value(v) for v in row] for row in rows[:self.max_rows]]
+        yield {"columns": columns}
+        for position in range(0, len(rows), self.chunk_size):
+            yield {"rows": rows[position:position + self.chunk_size]}
+        yield {"summary": {
+            "row_count": len(rows),
+            "offset": 0,
+            "truncated": truncated,
+            "next_cursor": None,
+            "elapsed_ms": round((time.monotonic() - start) * 1000, 1),
+        }}
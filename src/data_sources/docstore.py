@@ -0,0 +1,214 @@
+import os
+import json
+import mmap
+import struct
+import logging
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Type
+
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+MMAP_MAGIC = b"TTQDOC1\0"
+MMAP_HEADER = struct.Struct("<8sQ")
+OFFSET_DTYPE = np.dtype([("id", "<i8"), ("offset", "<u8"), ("length", "<u8")])
+
+
+def _file_signature(path: str) -> Optional[tuple]:
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+class JSONDocStore:
+    """
+    Records of the FAISS index kept in memory as {id: record}.
+
+    The JSON file is read on first access and re-read only when its inode,
+    mtime or size changes, so a lookup is a dict access plus one stat().
+    An `immutable` file (an index generation) is read once and never checked again.
+    """
+
+    def __init__(self, path: str, encoder: Optional[Type[json.JSONEncoder]] = None, immutable: bool = False):
+        self.path = path
+        self.encoder = encoder
+        self.immutable = immutable
+        self._records: Optional[Dict[int, Any]] = None
+        self._signature = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[int, Any]:
+        if self._records is not None and self.immutable:
+            return self._records
+        signature = _file_signature(self.path)
+        if self._records is not None and signature == self._signature:
+            return self._records
+        with self._lock:
+            signature = _file_signature(self.path)
+            if self._records is None or signature != self._signature:
+                self._records = self._read() if signature else {}
+                self._signature = signature
+            return self._records
+
+    def _read(self) -> Dict[int, Any]:
+        with open(self.path, "r") as f:
+            data = json.load(f)
+        if not isinstance(data, dict):
+            logger.warning(f"Ignoring data file in legacy list format: {self.path}")
+            return {}
+        logger.info(f"Loaded {len(data)} records from {self.path}")
+        return {int(i): r for i, r in data.items()}
+
+    def get_many(self, ids: Iterable[int]) -> List[Optional[Any]]:
+        records = self._load()
+        return [records.get(int(i)) for i in ids]
+
+    def load_all(self) -> Dict[int, Any]:
+        return dict(self._load())
+
+    def write(self, records: Dict[int, Any]):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({str(i): r for i, r in records.items()}, f, cls=self.encoder)
+        os.replace(tmp_path, self.path)
+        with self._lock:
+            self._records = dict(records)
+            self._signature = _file_signature(self.path)
+
+    def invalidate(self):
+        with self._lock:
+            self._records = None
+            self._signature = None
+
+    def __len__(self):
+        return len(self._load())
+
+
+class MmapDocStore:
+    """
+    On-disk record store with an offset table, read through mmap.
+
+    Layout: header (magic, count), `count` (id, offset, length) entries
+    sorted by id, then the JSON-encoded records. A lookup binary-searches
+    the offset table and decodes only the requested records, so its cost
+    does not depend on the number of records in the file. An `immutable`
+    file stays mapped without checking for changes, even once it is deleted.
+    """
+
+    def __init__(self, path: str, encoder: Optional[Type[json.JSONEncoder]] = None, immutable: bool = False):
+        self.path = path
+        self.encoder = encoder
+        self.immutable = immutable
+        self._file = None
+        self._mmap = None
+        self._table = None
+        self._signature = None
+        self._lock = threading.Lock()
+
+    def _open(self):
+        if self._table is not None and self.immutable:
+            return self._mmap, self._table
+        signature = _file_signature(self.path)
+        if self._table is not None and signature == self._signature:
+            return self._mmap, self._table
+        with self._lock:
+            signature = _file_signature(self.path)
+            if self._table is None or signature != self._signature:
+                self._close()
+                if signature is None:
+                    self._mmap, self._table = None, np.zeros(0, dtype=OFFSET_DTYPE)
+                else:
+                    self._map()
+                self._signature = signature
+            return self._mmap, self._table
+
+    def _map(self):
+        self._file = open(self.path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count = MMAP_HEADER.unpack_from(self._mmap, 0)
+        if magic != MMAP_MAGIC:
+            raise ValueError(f"Not a docstore file: {self.path}")
+        self._table = np.frombuffer(self._mmap, dtype=OFFSET_DTYPE, count=count, offset=MMAP_HEADER.size)
+        logger.info(f"Memory-mapped {count} records from {self.path}")
+
+    def _close(self):
+        self._table = None
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # Still referenced by an in-flight lookup; the GC unmaps it later.
+                pass
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def get_many(self, ids: Iterable[int]) -> List[Optional[Any]]:
+        buffer, table = self._open()
+        ids = np.asarray(list(ids), dtype="<i8")
+        if not len(table) or not len(ids):
+            return [None] * len(ids)
+        positions = np.searchsorted(table["id"], ids)
+        results = []
+        for record_id, position in zip(ids, positions):
+            if position < len(table) and table["id"][position] == record_id:
+                offset, length = int(table["offset"][position]), int(table["length"][position])
+                results.append(json.loads(buffer[offset:offset + length]))
+            else:
+                results.append(None)
+        return results
+
+    def load_all(self) -> Dict[int, Any]:
+        buffer, table = self._open()
+        return {
+            int(entry["id"]): json.loads(buffer[int(entry["offset"]):int(entry["offset"] + entry["length"])])
+            for entry in table
+        }
+
+    def write(self, records: Dict[int, Any]):
+        ids = sorted(records)
+        payloads = [json.dumps(records[i], cls=self.encoder).encode("utf-8") for i in ids]
+        table = np.zeros(len(ids), dtype=OFFSET_DTYPE)
+        offset = MMAP_HEADER.size + table.nbytes
+        for position, (record_id, payload) in enumerate(zip(ids, payloads)):
+            table[position] = (record_id, offset, len(payload))
+            offset += len(payload)
+
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(MMAP_HEADER.pack(MMAP_MAGIC, len(ids)))
+            f.write(table.tobytes())
+            for payload in payloads:
+                f.write(payload)
+        os.replace(tmp_path, self.path)
+
+    def invalidate(self):
+        with self._lock:
+            self._close()
+            self._signature = None
+
+    def __len__(self):
+        return len(self._open()[1])
+
+
+def open_docstore(path: str, kind: str = "json", encoder: Optional[Type[json.JSONEncoder]] = None,
+                  immutable: bool = False):
+    """Docstore for `path`: "json" (in-memory) or "mmap" (offset table + mmap)."""
+    if kind == "mmap":
+        return MmapDocStore(path, encoder, immutable)
+    return JSONDocStore(path, encoder, immutable)
+
+
+def stored_kind(path: str, default: str = "json") -> str:
+    """Kind of docstore file at `path`, by its header (`default` when it does not exist)."""
+    try:
+        with open(path, "rb") as f:
+            return "mmap" if f.read(len(MMAP_MAGIC)) == MMAP_MAGIC else "json"
+    except OSError:
+        return default
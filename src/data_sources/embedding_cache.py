@@ -0,0 +1,122 @@
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def text_key(model_name: str, text: str) -> str:
+    """Cache key for a text: model name plus a hash of the whitespace-normalised text."""
+    normalized = " ".join(text.split())
+    return f"{model_name}:{hashlib.sha256(normalized.encode('utf-8')).hexdigest()}"
+
+
+class EmbeddingCache:
+    """
+    Persistent cache of embedding vectors keyed by (model name, text hash).
+
+    Vectors are stored as raw float16/float32 blobs in SQLite and evicted
+    least-recently-used once the cache holds more than `max_entries`.
+    """
+
+    def __init__(self, path: str, max_entries: int = 500000, dtype: str = "float16", batch_size: int = 64):
+        self.path = path
+        self.max_entries = max_entries
+        self.dtype = np.dtype(dtype)
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings "
+            "(key TEXT PRIMARY KEY, dtype TEXT, vector BLOB, last_used REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings (last_used)")
+        self._conn.commit()
+        self._seconds_per_text: Optional[float] = None
+        self.last_report: Dict[str, float] = {}
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, dtype, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                for key, dtype, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=dtype).astype("float32")
+            if found:
+                now = time.time()
+                self._conn.executemany("UPDATE embeddings SET last_used = ? WHERE key = ?",
+                                       [(now, key) for key in found])
+                self._conn.commit()
+        return found
+
+    def put_many(self, items: Dict[str, np.ndarray]):
+        if not items:
+            return
+        now = time.time()
+        rows = [(key, self.dtype.name, np.asarray(vector, dtype=self.dtype).tobytes(), now)
+                for key, vector in items.items()]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, dtype, vector, last_used) VALUES (?, ?, ?, ?)", rows
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM embeddings WHERE key IN "
+                "(SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?)", (excess,)
+            )
+            logger.info(f"Evicted {excess} embeddings from cache")
+
+    def encode(self, model_name: str, texts: List[str], encode_fn: Callable[[List[str]], np.ndarray]) -> np.ndarray:
+        """
+        Embed `texts`, calling `encode_fn` in batches only for cache misses.
+        """
+        keys = [text_key(model_name, t) for t in texts]
+        cached = self.get_many(list(set(keys)))
+        missing = list(dict.fromkeys(k for k in keys if k not in cached))
+        texts_by_key = dict(zip(keys, texts))
+
+        start = time.perf_counter()
+        encoded = {}
+        for batch_start in range(0, len(missing), self.batch_size):
+            batch = missing[batch_start:batch_start + self.batch_size]
+            vectors = np.asarray(encode_fn([texts_by_key[k] for k in batch]), dtype="float32")
+            encoded.update(zip(batch, vectors))
+        encode_seconds = time.perf_counter() - start
+        self.put_many(encoded)
+
+        if missing:
+            self._seconds_per_text = encode_seconds / len(missing)
+        hits = len(keys) - sum(1 for k in keys if k in encoded)
+        self.last_report = {
+            "texts": len(keys),
+            "hits": hits,
+            "misses": len(missing),
+            "hit_rate": round(hits / len(keys), 4) if keys else 0.0,
+            "encode_seconds": round(encode_seconds, 4),
+            "saved_seconds": round(hits * (self._seconds_per_text or 0.0), 4),
+        }
+        logger.info(f"Embedding cache: {self.last_report}")
+
+        vectors = {**cached, **encoded}
+        return np.stack([vectors[k] for k in keys]) if keys else np.zeros((0, 0), dtype="float32")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
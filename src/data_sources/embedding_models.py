@@ -0,0 +1,97 @@
+"""
+Process-wide registry of embedding models: each model is loaded once per
+process and shared by every connector through `encode`.
+"""
+import gc
+import os
+import sys
+import logging
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+project_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.append(project_dir)
+from config import Config
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+_models: Dict[str, Any] = {}
+_model_locks: Dict[str, threading.Lock] = {}
+_registry_lock = threading.Lock()
+
+
+def _reset_locks_after_fork():
+    global _registry_lock
+    _registry_lock = threading.Lock()
+    _model_locks.clear()
+
+
+os.register_at_fork(after_in_child=_reset_locks_after_fork)
+
+
+def _lock_for(model_name: str) -> threading.Lock:
+    with _registry_lock:
+        return _model_locks.setdefault(model_name, threading.Lock())
+
+
+def get_model(model_name: Optional[str] = None):
+    """Return the shared model for `model_name`, loading it on first use."""
+    model_name = model_name or Config.FAISS_MODEL_NAME
+    model = _models.get(model_name)
+    if model is not None:
+        return model
+    with _lock_for(model_name):
+        model = _models.get(model_name)
+        if model is None:
+            from sentence_transformers import SentenceTransformer
+            try:
+                model = SentenceTransformer(model_name)
+            except Exception as e:
+                logger.error(f"Failed to load SentenceTransformer model: {e}")
+                raise
+            _models[model_name] = model
+            logger.info(f"Loaded SentenceTransformer model: {model_name}")
+    return model
+
+
+def register_model(model_name: str, model: Any):
+    """Install an already-built model (or a stand-in exposing `encode`) under `model_name`."""
+    with _lock_for(model_name):
+        _models[model_name] = model
+
+
+def unload_model(model_name: str):
+    with _lock_for(model_name):
+        _models.pop(model_name, None)
+
+
+def is_loaded(model_name: Optional[str] = None) -> bool:
+    return (model_name or Config.FAISS_MODEL_NAME) in _models
+
+
+def encode(texts: List[str], model_name: Optional[str] = None, batch_size: Optional[int] = None) -> np.ndarray:
+    """Embed `texts` with the shared model and return a float32 matrix."""
+    model = get_model(model_name)
+    if batch_size:
+        vectors = model.encode(texts, batch_size=batch_size)
+    else:
+        vectors = model.encode(texts)
+    return np.asarray(vectors, dtype="float32")
+
+
+def warm_up(model_names: Optional[Iterable[str]] = None, freeze: bool = False):
+    """
+    Load the given models (default: FAISS_MODEL_NAME) ahead of the first request.
+    `freeze=True` is meant for a parent process that is about to fork workers.
+    """
+    model_names = [name for name in (model_names or [Config.FAISS_MODEL_NAME]) if name]
+    for model_name in model_names:
+        get_model(model_name)
+    if freeze:
+        gc.collect()
+        gc.freeze()
+        logger.info(f"Froze {gc.get_freeze_count()} objects for copy-on-write sharing with forked workers")
@@ -1,10 +1,12 @@
 import os
 import sys
 import json
+import hashlib
 import logging
-from typing import List, Any
+import threading
+from typing import List, Dict, Any, Iterable, NamedTuple, Optional
 import faiss
-from sentence_transformers import SentenceTransformer
+import numpy as np
 from decimal import Decimal
 import datetime
 
@@ -12,11 +14,27 @@ project_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'
 sys.path.append(project_dir)
 from config import Config
 
+src_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(src_dir)
+from data_sources import embedding_models
+from data_sources.docstore import open_docstore, stored_kind
+from data_sources.embedding_cache import EmbeddingCache
+from data_sources import faiss_index_factory
+from data_sources import index_generations
+from monitoring import tracing
+
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Zero-copy mmap of the vector storage, shared through the page cache by every worker.
+# Older faiss builds only have IO_FLAG_MMAP, which still copies flat and IVF-flat vectors to the heap
+MMAP_IN_PLACE = hasattr(faiss, "IO_FLAG_MMAP_IFC")
+MMAP_FLAGS = (faiss.IO_FLAG_MMAP_IFC if MMAP_IN_PLACE else faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+# Stored ids looked up in the docstore when validating a new generation
+VALIDATION_PROBES = 32
+
 class CustomEncoder(json.JSONEncoder):
     def default(self, obj):
         if isinstance(obj, Decimal):
@@ -25,33 +43,104 @@ class CustomEncoder(json.JSONEncoder):
             return obj.isoformat()
         return super(CustomEncoder, self).default(obj)
 
+class IndexView(NamedTuple):
+    """A published generation as it is searched: index and records, swapped as one reference."""
+    generation: Optional[int]
+    index: faiss.Index
+    docstore: Any
+    records: Optional[Dict[int, Any]] = None
+    mapped: bool = False
+
+    def get_records(self, ids: Iterable[int]) -> List[Optional[Any]]:
+        if self.records is not None:
+            return [self.records.get(int(i)) for i in ids]
+        return self.docstore.get_many(ids)
+
+    def load_all(self) -> Dict[int, Any]:
+        return dict(self.records) if self.records is not None else self.docstore.load_all()
+
+def entry_id(*parts: str) -> int:
+    """Stable 63-bit id for a catalog entry, e.g. entry_id(database, table)."""
+    digest = hashlib.sha1("\x1f".join(str(p) for p in parts).encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") & 0x7FFFFFFFFFFFFFFF
+
 class FAISSConnector:
-    def __init__(self):
+    def __init__(self, index_file: Optional[str] = None, data_file: Optional[str] = None):
         self.model_name = Config.FAISS_MODEL_NAME
-        self.index_file = Config.FAISS_INDEX_FILE
-        self.data_file = Config.FAISS_DATA_FILE
-        self.model = None
+        self.index_file = index_file or Config.FAISS_INDEX_FILE
+        self.data_file = data_file or Config.FAISS_DATA_FILE
         self.index = None
+        self.shared = Config.FAISS_SHARED_INDEX
+        self.docstore_kind = "mmap" if self.shared else Config.FAISS_DOCSTORE
+        self.records: Optional[Dict[int, Any]] = None
+        self._docstore = None
+        self.embedding_cache_file = Config.EMBEDDING_CACHE_FILE
+        self._embedding_cache = None
+        self._rebuild_pending = False
+        # Updates go to the working copy (index, records); searches read the published
+        # generation in _view, which is only ever replaced as a whole
+        self._view: Optional[IndexView] = None
+        self._reload_lock = threading.Lock()
+
+    @property
+    def docstore(self):
+        """Record store of the searched generation (of the data file before one is loaded)."""
+        view = self._view
+        if view is not None:
+            return view.docstore
+        if self._docstore is None or self._docstore.path != self.data_file:
+            self._docstore = open_docstore(self.data_file, stored_kind(self.data_file, self.docstore_kind),
+                                           CustomEncoder)
+        return self._docstore
+
+    @property
+    def generation(self) -> Optional[int]:
+        """Generation being searched (None when nothing is loaded or the files are unversioned)."""
+        view = self._view
+        return view.generation if view is not None else None
 
     def _load_model(self):
-        """Load the SentenceTransformer model."""
-        try:
-            self.model = SentenceTransformer(self.model_name)
-            logger.info(f"Loaded SentenceTransformer model: {self.model_name}")
-        except Exception as e:
-            logger.error(f"Failed to load SentenceTransformer model: {e}")
-            raise
+        """Load the shared SentenceTransformer model."""
+        return embedding_models.get_model(self.model_name)
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        with tracing.span("embed"):
+            return embedding_models.encode(texts, self.model_name)
+
+    def _encode_texts(self, data: List[Any]) -> np.ndarray:
+        """Encode records into L2-normalised float32 vectors."""
+        texts = [json.dumps(item, cls=CustomEncoder) for item in data]
+        cache = self._get_embedding_cache()
+        if cache is not None:
+            vectors = cache.encode(self.model_name, texts, self._encode)
+        else:
+            vectors = self._encode(texts)
+        faiss.normalize_L2(vectors)
+        return vectors
+
+    def _get_embedding_cache(self) -> Optional[EmbeddingCache]:
+        if self._embedding_cache is None and self.embedding_cache_file:
+            self._embedding_cache = EmbeddingCache(
+                self.embedding_cache_file,
+                max_entries=Config.EMBEDDING_CACHE_MAX_ENTRIES,
+                dtype=Config.EMBEDDING_CACHE_DTYPE,
+                batch_size=Config.EMBEDDING_BATCH_SIZE,
+            )
+        return self._embedding_cache
+
+    @property
+    def last_encode_report(self) -> Dict[str, float]:
+        """Hit rate and encode time saved by the embedding cache on the last encode."""
+        return self._embedding_cache.last_report if self._embedding_cache else {}
 
-    def _encode_data(self, data: List[Any]) -> faiss.IndexFlatIP:
-        """Encode the data and create a FAISS index."""
+    def _encode_data(self, data: List[Any], ids: Optional[List[int]] = None) -> faiss.Index:
+        """Encode the data and create a FAISS index (type per FAISS_INDEX_TYPE) keyed by stable entry ids."""
         try:
-            texts = [json.dumps(item, cls=CustomEncoder) for item in data]
-            vectors = self.model.encode(texts)
-            faiss.normalize_L2(vectors)
+            vectors = self._encode_texts(data)
+            if ids is None:
+                ids = [self.record_id(item) for item in data]
 
-            dimension = vectors.shape[1]
-            index = faiss.IndexFlatIP(dimension)
-            index.add(vectors)
+            index = faiss_index_factory.build_index(vectors, np.asarray(ids, dtype="int64"))
 
             logger.info(f"Encoded {len(data)} items and created FAISS index")
             return index
@@ -59,81 +148,299 @@ class FAISSConnector:
             logger.error(f"Failed to encode data and create FAISS index: {e}")
             raise
 
-    def store_in_faiss(self, data: List[Any]):
-        """Store data in FAISS index and save to disk."""
-        try:
-            self._load_model()
-            self.index = self._encode_data(data)
+    @staticmethod
+    def record_id(record: Dict[str, Any]) -> int:
+        """Stable id of a table-level (or column-level) record."""
+        if "column" in record:
+            return entry_id(record.get("database"), record.get("table"), record["column"])
+        return entry_id(record.get("database"), record.get("table"))
 
-            faiss.write_index(self.index, self.index_file)
-            logger.info(f"Saved FAISS index to {self.index_file}")
-
-            with open(self.data_file, "w") as f:
-                json.dump(data, f, cls=CustomEncoder)
-            logger.info(f"Saved original data to {self.data_file}")
+    def get_records(self, ids: Iterable[int]) -> List[Optional[Any]]:
+        """Look up records of the searched generation by id (None for unknown ids)."""
+        view = self._view or self.load_faiss_index()
+        if view is None:
+            return [None for _ in ids]
+        return view.get_records(ids)
 
+    def store_in_faiss(self, data: List[Any]):
+        """Rebuild the FAISS index from scratch and save it to disk."""
+        try:
+            ids = [self.record_id(item) for item in data]
+            self.index = self._encode_data(data, ids)
+            self.records = dict(zip(ids, data))
+            self.save()
             logger.info(f"Successfully stored {len(data)} items in FAISS index")
         except Exception as e:
             logger.error(f"Failed to store data in FAISS: {e}")
             raise
 
+    def upsert(self, records: Dict[int, Any]):
+        """Add or replace records by id, encoding only the given records."""
+        if not records:
+            return
+        try:
+            self._ensure_loaded()
+            self.records.update(records)
+            if self._needs_rebuild():
+                self._rebuild()
+                return
+            ids = np.asarray(list(records.keys()), dtype="int64")
+            vectors = self._encode_texts(list(records.values()))
+            index = self._writable_index()
+            index.remove_ids(ids)
+            index.add_with_ids(vectors, ids)
+            logger.info(f"Upserted {len(records)} items in FAISS index")
+        except Exception as e:
+            logger.error(f"Failed to upsert data in FAISS: {e}")
+            raise
+
+    def remove(self, ids: Iterable[int]):
+        """Remove records by id."""
+        ids = list(ids)
+        if not ids:
+            return
+        self._ensure_loaded()
+        if self.index is not None:
+            if faiss_index_factory.supports_remove(self.index):
+                self._writable_index().remove_ids(np.asarray(ids, dtype="int64"))
+            else:
+                self._rebuild_pending = True
+        for i in ids:
+            self.records.pop(i, None)
+        logger.info(f"Removed {len(ids)} items from FAISS index")
+
+    def _needs_rebuild(self) -> bool:
+        """
+        True when the index must be rebuilt rather than updated in place: it does not
+        exist, cannot remove vectors (HNSW), or "auto" now calls for another index type.
+        """
+        if self.index is None or self._rebuild_pending:
+            return True
+        if not faiss_index_factory.supports_remove(self.index):
+            return True
+        if Config.FAISS_INDEX_TYPE == "auto":
+            wanted = faiss_index_factory.choose_index_type(len(self.records))
+            return wanted != faiss_index_factory.index_type_of(self.index)
+        return False
+
+    def _rebuild(self):
+        """Rebuild the index from every record; unchanged records come from the embedding cache."""
+        self._rebuild_pending = False
+        if not self.records:
+            self.index = None
+            return
+        ids = list(self.records.keys())
+        self.index = self._encode_data([self.records[i] for i in ids], ids)
+
+    def reset(self):
+        """Start over with an empty working copy; searches keep the published generation until save()."""
+        self.index, self.records, self._rebuild_pending = None, {}, False
+
+    def rollback(self):
+        """Discard unsaved updates; the next update reloads the working copy from the published generation."""
+        self.index, self.records, self._rebuild_pending = None, None, False
+
+    def _writable_index(self) -> faiss.Index:
+        """The working index, copied first while the searched generation still shares it."""
+        view = self._view
+        if view is not None and self.index is view.index:
+            self.index = faiss.clone_index(self.index)
+        return self.index
+
+    def save(self):
+        """Write the working copy as a new generation, validate it and publish it."""
+        if self._rebuild_pending:
+            self._rebuild()
+        if self.index is None:
+            if self.index_exists():
+                self.delete_faiss_index()
+            return
+        generation = index_generations.claim(self.index_file)
+        index_path, data_path = index_generations.paths(self.index_file, self.data_file, generation)
+        try:
+            faiss.write_index(self.index, index_path)
+            open_docstore(data_path, self.docstore_kind, CustomEncoder).write(self.records or {})
+            self._validate_generation(generation)
+        except Exception:
+            index_generations.discard(self.index_file, self.data_file, generation)
+            raise
+        logger.info(f"Saved FAISS index to {index_path} and original data to {data_path}")
+        self._publish_generation(generation)
+
+    def _validate_generation(self, generation: int):
+        """Read a written generation back: the index and data file must agree with the working copy."""
+        index_path, data_path = index_generations.paths(self.index_file, self.data_file, generation)
+        index = faiss.read_index(index_path, MMAP_FLAGS)
+        docstore = open_docstore(data_path, self.docstore_kind, CustomEncoder)
+        try:
+            expected = len(self.records or {})
+            if index.ntotal != expected or len(docstore) != expected:
+                raise ValueError(f"Generation {generation} has {index.ntotal} vectors and {len(docstore)} "
+                                 f"records, expected {expected}")
+            probes = list(self.records or {})[:VALIDATION_PROBES]
+            if any(record is None for record in docstore.get_many(probes)):
+                raise ValueError(f"Generation {generation} is missing records")
+        finally:
+            docstore.invalidate()
+
+    def _publish_generation(self, generation: int):
+        """Swap the symlinks to `generation` on disk, then the searched view in memory."""
+        index_generations.publish(self.index_file, self.data_file, generation)
+        if self.shared:
+            view = self._read_generation(generation, mmap=True)
+            # Drop the private copy; the records are read through the mapped data file from now on
+            self.index, self.records = None, None
+        else:
+            # The working index is shared until the next update copies it (_writable_index)
+            data_path = index_generations.paths(self.index_file, self.data_file, generation)[1]
+            view = IndexView(generation, self.index, open_docstore(data_path, self.docstore_kind, CustomEncoder,
+                                                                   immutable=True), dict(self.records or {}))
+        self._view = view
+        index_generations.prune(self.index_file, self.data_file, Config.FAISS_GENERATIONS_KEPT)
+
+    def index_exists(self) -> bool:
+        return os.path.exists(self.index_file) and os.path.exists(self.data_file)
+
+    def _ensure_loaded(self):
+        """Load the working copy from the published generation before the first update."""
+        if self.records is not None:
+            return
+        view = self._view or self.load_faiss_index()
+        if view is not None and view.mapped:
+            # A memory-mapped index is read-only; updates go to a private copy
+            view = self._read_view(mmap=False)
+        if view is None:
+            self.index, self.records = None, {}
+        else:
+            self.index, self.records = view.index, view.load_all()
+
     def delete_faiss_index(self):
-        """Delete FAISS index and associated data file."""
+        """Delete FAISS index and associated data file, with every generation of both."""
         try:
-            if os.path.exists(self.index_file):
+            if os.path.lexists(self.index_file):
                 os.remove(self.index_file)
                 logger.info(f"Deleted FAISS index file: {self.index_file}")
             else:
                 logger.warning(f"FAISS index file not found: {self.index_file}")
 
-            if os.path.exists(self.data_file):
+            if os.path.lexists(self.data_file):
                 os.remove(self.data_file)
                 logger.info(f"Deleted associated data file: {self.data_file}")
             else:
                 logger.warning(f"Associated data file not found: {self.data_file}")
 
+            index_generations.discard_all(self.index_file, self.data_file)
+
             self.index = None
+            self.records = None
+            self._view = None
+            self.docstore.invalidate()
             logger.info("FAISS index and associated data have been deleted.")
         except Exception as e:
             logger.error(f"Failed to delete FAISS index and associated data: {e}")
             raise
 
-    def load_faiss_index(self):
-        """Load FAISS index from disk."""
+    def _read_view(self, mmap: bool) -> Optional[IndexView]:
+        """Read the published generation (or the unversioned files) from disk."""
+        while True:
+            generation = index_generations.current(self.index_file)
+            try:
+                return self._read_generation(generation, mmap)
+            except (OSError, RuntimeError, ValueError):
+                # Pruned between resolving the symlink and opening the files: resolve it again
+                if generation is None or generation == index_generations.current(self.index_file):
+                    raise
+
+    def _read_generation(self, generation: Optional[int], mmap: bool) -> Optional[IndexView]:
+        index_path, data_path = index_generations.paths(self.index_file, self.data_file, generation)
+        if generation is None and not os.path.exists(index_path):
+            return None
+        index = faiss.read_index(index_path, MMAP_FLAGS if mmap else 0)
+        faiss_index_factory.set_search_params(index)
+        docstore = open_docstore(data_path, stored_kind(data_path, self.docstore_kind), CustomEncoder,
+                                 immutable=generation is not None)
+        # Reads (or maps) the data file now, so that pruning it later cannot take it away
+        if generation is not None and len(docstore) != index.ntotal:
+            raise ValueError(f"Generation {generation} has {index.ntotal} vectors and {len(docstore)} records")
+        return IndexView(generation, index, docstore, mapped=mmap)
+
+    def load_faiss_index(self) -> Optional[IndexView]:
+        """Load the published index for searching; in shared mode it is memory-mapped read-only."""
         try:
-            if os.path.exists(self.index_file):
-                self.index = faiss.read_index(self.index_file)
-                logger.info(f"Loaded FAISS index from {self.index_file}")
-            else:
+            view = self._read_view(mmap=self.shared)
+            if view is None:
                 logger.warning(f"FAISS index file not found: {self.index_file}")
+                return None
+            self._view = view
+            logger.info(f"Loaded FAISS index from {self.index_file} (generation {view.generation}"
+                        + (", memory-mapped)" if view.mapped else ")"))
+            if view.mapped and not MMAP_IN_PLACE:
+                logger.warning(f"faiss {faiss.__version__} has no IO_FLAG_MMAP_IFC: flat and IVF-flat vectors "
+                               "are copied into every worker's memory instead of shared (needs faiss-cpu >= 1.11)")
+            return view
         except Exception as e:
             logger.error(f"Failed to load FAISS index: {e}")
             raise
 
-    def search_faiss(self, query: str, k: int = 5) -> List[Any]:
-        """Search the FAISS index for similar items."""
-        try:
-            if self.index is None:
-                self.load_faiss_index()
+    def encode_queries(self, queries: List[str]) -> np.ndarray:
+        """L2-normalised query vectors, encoded in one batch."""
+        vectors = self._encode(list(queries))
+        faiss.normalize_L2(vectors)
+        return vectors
 
-            if self.model is None:
-                self._load_model()
+    def _search_view(self) -> IndexView:
+        """
+        The generation to search. When another process has published a newer one,
+        one reader loads it while the others keep searching the current view.
+        """
+        view = self._view or self.load_faiss_index()
+        if view is None:
+            raise ValueError(f"FAISS index not found: {self.index_file}")
+        if index_generations.current(self.index_file) not in (None, view.generation) \
+                and self._reload_lock.acquire(blocking=False):
+            try:
+                view = self.load_faiss_index() or view
+            finally:
+                self._reload_lock.release()
+        return view
 
-            query_vector = self.model.encode([query])
-            faiss.normalize_L2(query_vector)
+    def search_vectors(self, query_vectors: np.ndarray, k: int = 5) -> List[List[Any]]:
+        """Search the index with a matrix of normalised query vectors; one result list per row."""
+        view = self._search_view()
 
-            distances, indices = self.index.search(query_vector, k)
+        with tracing.span("faiss_search"):
+            distances, indices = view.index.search(query_vectors, k)
+            hits = [[(int(i), float(d)) for i, d in zip(row_ids, row_distances) if i != -1]
+                    for row_ids, row_distances in zip(indices, distances)]
+            records = view.get_records(i for row in hits for i, _ in row)
+        results, position = [], 0
+        for row in hits:
+            row_records = records[position:position + len(row)]
+            position += len(row)
+            results.append([dict(record, score=score)
+                            for record, (_, score) in zip(row_records, row) if record is not None])
+        return results
 
-            with open(self.data_file, "r") as f:
-                data = json.load(f)
-
-            results = [data[i] for i in indices[0]]
+    def search_faiss(self, query: str, k: int = 5) -> List[Any]:
+        """Search the FAISS index for similar items."""
+        try:
+            results = self.search_vectors(self.encode_queries([query]), k)[0]
             logger.info(f"Performed FAISS search with query: {query}")
             return results
         except Exception as e:
             logger.error(f"Failed to perform FAISS search: {e}")
             raise
 
+    def search_faiss_batch(self, queries: List[str], k: int = 5) -> List[List[Any]]:
+        """Search for many queries with one encode call and one index search."""
+        try:
+            results = self.search_vectors(self.encode_queries(queries), k)
+            logger.info(f"Performed batched FAISS search for {len(queries)} queries")
+            return results
+        except Exception as e:
+            logger.error(f"Failed to perform FAISS search: {e}")
+            raise
+
 # Usage example
 if __name__ == "__main__":
     faiss_manager = FAISSManager()
@@ -0,0 +1,123 @@
+import os
+import sys
+import math
+import logging
+from typing import Optional
+
+import faiss
+import numpy as np
+
+project_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.append(project_dir)
+from config import Config
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+INDEX_TYPES = ("flat", "hnsw", "ivf_flat", "ivf_pq")
+
+# Catalog sizes at which "auto" switches to the next index type. HNSW is never chosen
+# automatically: it cannot remove vectors, so every incremental upsert or removal of a
+# catalog entry would force a full rebuild. It remains available via FAISS_INDEX_TYPE.
+AUTO_IVF_FLAT_MIN = 20000
+AUTO_IVF_PQ_MIN = 2000000
+
+
+def choose_index_type(num_vectors: int) -> str:
+    """Pick an index type that supports in-place removal for a catalog of `num_vectors` entries."""
+    if num_vectors < AUTO_IVF_FLAT_MIN:
+        return "flat"
+    if num_vectors < AUTO_IVF_PQ_MIN:
+        return "ivf_flat"
+    return "ivf_pq"
+
+
+def _nlist(num_vectors: int) -> int:
+    if Config.FAISS_NLIST:
+        return Config.FAISS_NLIST
+    return max(1, min(int(4 * math.sqrt(num_vectors)), num_vectors // 39 or 1))
+
+
+def _pq_subquantizers(dimension: int) -> int:
+    """Largest divisor of `dimension` giving sub-vectors of at least 8 dims."""
+    for m in range(max(1, dimension // 8), 0, -1):
+        if dimension % m == 0:
+            return m
+    return 1
+
+
+def _training_sample(vectors: np.ndarray, size: int, seed: int = 1234) -> np.ndarray:
+    if len(vectors) <= size:
+        return vectors
+    rng = np.random.default_rng(seed)
+    return vectors[rng.choice(len(vectors), size, replace=False)]
+
+
+def build_index(vectors: np.ndarray, ids: np.ndarray, index_type: Optional[str] = None) -> faiss.Index:
+    """
+    Build an inner-product index over L2-normalised `vectors` keyed by `ids`.
+    `index_type` is one of INDEX_TYPES or "auto" (default: FAISS_INDEX_TYPE).
+    """
+    index_type = index_type or Config.FAISS_INDEX_TYPE
+    num_vectors, dimension = vectors.shape
+    if index_type == "auto":
+        index_type = choose_index_type(num_vectors)
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown FAISS index type: {index_type}")
+
+    if index_type == "flat":
+        index = faiss.IndexIDMap2(faiss.IndexFlatIP(dimension))
+    elif index_type == "hnsw":
+        hnsw = faiss.IndexHNSWFlat(dimension, Config.FAISS_HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        hnsw.hnsw.efConstruction = Config.FAISS_EF_CONSTRUCTION
+        index = faiss.IndexIDMap2(hnsw)
+    else:
+        nlist = _nlist(num_vectors)
+        quantizer = faiss.IndexFlatIP(dimension)
+        if index_type == "ivf_flat":
+            index = faiss.IndexIVFFlat(quantizer, dimension, nlist, faiss.METRIC_INNER_PRODUCT)
+            sample = _training_sample(vectors, nlist * 64)
+        else:
+            index = faiss.IndexIVFPQ(quantizer, dimension, nlist, _pq_subquantizers(dimension), 8,
+                                     faiss.METRIC_INNER_PRODUCT)
+            index.do_polysemous_training = False
+            sample = _training_sample(vectors, max(nlist * 64, 256 * 64))
+        index.train(sample)
+
+    index.add_with_ids(vectors, np.asarray(ids, dtype="int64"))
+    set_search_params(index)
+    logger.info(f"Built {index_type} FAISS index over {num_vectors} vectors")
+    return index
+
+
+def set_search_params(index: faiss.Index, nprobe: Optional[int] = None, ef_search: Optional[int] = None):
+    """Apply nprobe (IVF) / efSearch (HNSW) to an index, looking through id maps."""
+    nprobe = nprobe or Config.FAISS_NPROBE
+    ef_search = ef_search or Config.FAISS_EF_SEARCH
+    inner = index
+    if isinstance(inner, (faiss.IndexIDMap, faiss.IndexIDMap2)):
+        inner = faiss.downcast_index(inner.index)
+    if isinstance(inner, faiss.IndexHNSW):
+        inner.hnsw.efSearch = ef_search
+    ivf = faiss.try_extract_index_ivf(inner)
+    if ivf is not None:
+        ivf.nprobe = nprobe
+
+
+def index_type_of(index: faiss.Index) -> str:
+    inner = index
+    if isinstance(inner, (faiss.IndexIDMap, faiss.IndexIDMap2)):
+        inner = faiss.downcast_index(inner.index)
+    if isinstance(inner, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(inner, faiss.IndexIVFPQ):
+        return "ivf_pq"
+    if isinstance(inner, faiss.IndexIVF):
+        return "ivf_flat"
+    return "flat"
+
+
+def supports_remove(index: faiss.Index) -> bool:
+    """HNSW graphs cannot drop vectors; updating them requires a rebuild."""
+    return index_type_of(index) != "hnsw"
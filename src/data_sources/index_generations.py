@@ -0,0 +1,107 @@
+"""
+Versioned index files behind a symlink.
+
+Generation N of an index is written to `<index_file>.vN` and `<data_file>.vN`,
+and published by pointing the `index_file` and `data_file` symlinks at them.
+The index symlink is swapped last with a rename, so it is the single commit
+point: readers resolve it and take the data file of the same generation.
+"""
+import os
+import re
+import glob
+import uuid
+import logging
+from typing import List, Optional, Tuple
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+GENERATION_SUFFIX = re.compile(r"\.v(\d+)$")
+
+
+def generation_path(path: str, generation: int) -> str:
+    return f"{path}.v{generation}"
+
+
+def generations(index_file: str) -> List[int]:
+    """Generations of `index_file` on disk, oldest first."""
+    found = []
+    for path in glob.glob(glob.escape(index_file) + ".v*"):
+        match = GENERATION_SUFFIX.search(path)
+        if match and path == generation_path(index_file, int(match.group(1))):
+            found.append(int(match.group(1)))
+    return sorted(found)
+
+
+def current(index_file: str) -> Optional[int]:
+    """Published generation, or None when `index_file` is missing or not a generation symlink."""
+    try:
+        target = os.readlink(index_file)
+    except OSError:
+        return None
+    match = GENERATION_SUFFIX.search(target)
+    return int(match.group(1)) if match else None
+
+
+def claim(index_file: str) -> int:
+    """Reserve the next generation number (the index file is created empty)."""
+    existing = generations(index_file)
+    generation = existing[-1] + 1 if existing else 1
+    while True:
+        try:
+            fd = os.open(generation_path(index_file, generation), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            generation += 1
+            continue
+        os.close(fd)
+        return generation
+
+
+def _swap_symlink(path: str, target: str):
+    # Unique per call: two processes publishing at once must not share the temporary link
+    tmp_path = f"{path}.link.{os.getpid()}.{uuid.uuid4().hex}.tmp"
+    os.symlink(os.path.basename(target), tmp_path)
+    try:
+        os.replace(tmp_path, path)
+    except OSError:
+        os.remove(tmp_path)
+        raise
+
+
+def publish(index_file: str, data_file: str, generation: int):
+    """Point both symlinks at `generation`; the index symlink goes last."""
+    _swap_symlink(data_file, generation_path(data_file, generation))
+    _swap_symlink(index_file, generation_path(index_file, generation))
+    logger.info(f"Published generation {generation} of {index_file}")
+
+
+def paths(index_file: str, data_file: str, generation: Optional[int]) -> Tuple[str, str]:
+    """Index and data file of `generation` (the plain paths for None)."""
+    if generation is None:
+        return index_file, data_file
+    return generation_path(index_file, generation), generation_path(data_file, generation)
+
+
+def discard(index_file: str, data_file: str, generation: int):
+    for path in paths(index_file, data_file, generation):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def prune(index_file: str, data_file: str, keep: int):
+    """
+    Delete all but the newest `keep` generations, never the published one.
+    Workers that still map a deleted generation keep reading it until they remap.
+    """
+    published = current(index_file)
+    for generation in generations(index_file)[:-keep or None]:
+        if generation != published:
+            discard(index_file, data_file, generation)
+            logger.info(f"Pruned generation {generation} of {index_file}")
+
+
+def discard_all(index_file: str, data_file: str):
+    """Delete every generation of both files, published or not."""
+    for generation in sorted(set(generations(index_file)) | set(generations(data_file))):
+        discard(index_file, data_file, generation)
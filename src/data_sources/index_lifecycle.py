@@ -0,0 +1,165 @@
+import os
+import sys
+import time
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+project_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.append(project_dir)
+from config import Config
+
+src_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(src_dir)
+from data_sources import index_generations
+
+try:
+    import fcntl
+except ImportError:  # Windows: rebuilds are then only serialised within one process
+    fcntl = None
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Catalog sync phases in order, as reported through the progress callback
+PHASES = ("fingerprints", "extract", "tables", "columns")
+
+
+class IndexLifecycleManager:
+    """
+    Runs index rebuilds as background jobs, one at a time.
+
+    A job runs `refresh(force, progress)` (the catalog sync). Each connector
+    builds its working copy, writes it to a staging generation, validates it
+    and then swaps the on-disk symlinks and its in-memory view. Searches keep
+    using the previous generation until then and never wait for the job.
+    Jobs are started by rebuild(), or every INDEX_REBUILD_INTERVAL seconds
+    once start() is called; job() and status() report their progress.
+    Foreground syncs go through run() or process_lock(), so they never
+    overlap a rebuild in another worker process either.
+    """
+
+    def __init__(self, refresh: Callable[..., Dict[str, Any]], connectors: Dict[str, Any],
+                 interval: Optional[float] = None, lock_file: Optional[str] = None):
+        self.refresh = refresh
+        self.connectors = {name: c for name, c in connectors.items() if c is not None}
+        self.interval = Config.INDEX_REBUILD_INTERVAL if interval is None else interval
+        self.lock_file = lock_file if lock_file is not None else Config.INDEX_REBUILD_LOCK_FILE
+        self._jobs: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._active: Optional[Dict[str, Any]] = None
+        self._next_id = 1
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._scheduler: Optional[threading.Thread] = None
+
+    def rebuild(self, force: bool = True, trigger: str = "admin") -> Dict[str, Any]:
+        """Start a rebuild job; while one is queued or running, that job is returned instead."""
+        with self._lock:
+            if self._active is not None:
+                return dict(self._active)
+            job = {"id": self._next_id, "trigger": trigger, "force": force, "status": "queued",
+                   "phase": None, "progress": 0.0, "created": time.time()}
+            self._next_id += 1
+            self._jobs[job["id"]] = job
+            while len(self._jobs) > max(Config.INDEX_JOB_HISTORY, 1):
+                self._jobs.popitem(last=False)
+            self._active = job
+            snapshot = dict(job)
+        threading.Thread(target=self._run, args=(job,), name=f"index-rebuild-{job['id']}", daemon=True).start()
+        return snapshot
+
+    def _update(self, job: Dict[str, Any], **fields):
+        with self._lock:
+            job.update(fields)
+
+    def _progress(self, job: Dict[str, Any], phase: str):
+        if phase in PHASES:
+            self._update(job, phase=phase, progress=round(PHASES.index(phase) / len(PHASES), 2))
+
+    def _run(self, job: Dict[str, Any]):
+        self._update(job, status="running", started=time.time())
+        lock = None
+        try:
+            lock = self._acquire_process_lock()
+            if lock is False:
+                self._update(job, status="skipped", error="Another process is rebuilding the index")
+                return
+            report = self.refresh(force=job["force"], progress=lambda phase: self._progress(job, phase))
+            self._update(job, status="done", phase=None, progress=1.0, report=report,
+                         generations=self.generations())
+            logger.info(f"Index rebuild job {job['id']} finished: {report}")
+        except Exception as e:
+            self._update(job, status="failed", error=str(e))
+            logger.error(f"Index rebuild job {job['id']} failed: {e}")
+        finally:
+            if lock:
+                lock.close()
+            with self._lock:
+                job["finished"] = time.time()
+                job["seconds"] = round(job["finished"] - job["started"], 3)
+                self._active = None
+
+    def _acquire_process_lock(self, wait: bool = False):
+        """
+        Open file holding an exclusive lock, None when locking is off, False when
+        another process holds it (with `wait`, block until it is released instead).
+        """
+        if fcntl is None or not self.lock_file:
+            return None
+        lock = open(self.lock_file, "a")
+        try:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_EX if wait else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock.close()
+            if wait:
+                raise
+            return False
+        return lock
+
+    @contextmanager
+    def process_lock(self):
+        """Hold the cross-process rebuild lock, waiting while another process rebuilds."""
+        lock = self._acquire_process_lock(wait=True)
+        try:
+            yield
+        finally:
+            if lock:
+                lock.close()
+
+    def run(self, force: bool = False) -> Dict[str, Any]:
+        """Sync in the calling thread under the cross-process rebuild lock and return the sync report."""
+        with self.process_lock():
+            return self.refresh(force=force)
+
+    def start(self):
+        """Start the rebuild schedule (does nothing when INDEX_REBUILD_INTERVAL is 0)."""
+        if self.interval <= 0 or self._scheduler is not None:
+            return
+        self._scheduler = threading.Thread(target=self._schedule, name="index-rebuild-schedule", daemon=True)
+        self._scheduler.start()
+
+    def _schedule(self):
+        while not self._stop.wait(self.interval):
+            self.rebuild(force=True, trigger="schedule")
+
+    def stop(self):
+        self._stop.set()
+
+    def job(self, job_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def generations(self) -> Dict[str, Dict[str, Optional[int]]]:
+        """Per index: the generation this process searches and the one published on disk."""
+        return {name: {"active": connector.generation, "published": index_generations.current(connector.index_file)}
+                for name, connector in self.connectors.items()}
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            jobs: List[Dict[str, Any]] = [dict(job) for job in reversed(self._jobs.values())]
+            active = dict(self._active) if self._active is not None else None
+        return {"generations": self.generations(), "active_job": active, "jobs": jobs}
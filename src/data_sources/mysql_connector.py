@@ -7,16 +7,23 @@ import os
 import sys
 
 import mysql.connector
-from mysql.connector import Error
+from mysql.connector import Error, InterfaceError, OperationalError
 
 project_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
 sys.path.append(project_dir)
 from config import Config
 
+src_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(src_dir)
+from data_sources.mysql_pool import MySQLConnectionPool
+from data_sources.sample_harvester import SampleHarvester
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+SYSTEM_DATABASES = ['information_schema', 'mysql', 'performance_schema', 'sys']
+
 class CustomEncoder(json.JSONEncoder):
     def default(self, obj):
         if isinstance(obj, Decimal):
@@ -30,94 +37,240 @@ class MySQLConnector:
         self.host=Config.MYSQL_HOST
         self.user=Config.MYSQL_USER
         self.password=Config.MYSQL_PASSWORD
+        self.pool = MySQLConnectionPool(
+            self._new_connection,
+            max_size=Config.MYSQL_POOL_SIZE,
+            checkout_timeout=Config.MYSQL_POOL_CHECKOUT_TIMEOUT,
+            idle_timeout=Config.MYSQL_POOL_IDLE_TIMEOUT,
+            max_lifetime=Config.MYSQL_POOL_MAX_LIFETIME,
+            health_check_interval=Config.MYSQL_POOL_HEALTH_CHECK_INTERVAL,
+            discard_on=(InterfaceError, OperationalError),
+        )
+        self.harvester = SampleHarvester(self)
+        self.last_harvest_report: Optional[Dict[str, Any]] = None
+
+    def _new_connection(self, database: Optional[str] = None) -> mysql.connector.MySQLConnection:
+        return mysql.connector.connect(
+            host=self.host,
+            user=self.user,
+            password=self.password,
+            database=database
+        )
 
     def connect(self, database: Optional[str] = None) -> Optional[mysql.connector.MySQLConnection]:
+        """Open a dedicated, un-pooled connection. Prefer `connection()`."""
         try:
-            connection = mysql.connector.connect(
-                host=self.host,
-                user=self.user,
-                password=self.password,
-                database=database
-            )
-            return connection
+            return self._new_connection(database)
         except Error as e:
             logger.error(f"Error connecting to MySQL: {e}")
             return None
 
+    def connection(self, database: Optional[str] = None):
+        """Check out a pooled connection: `with connector.connection(db) as conn: ...`"""
+        return self.pool.connection(database)
+
+    def cancel(self, connection: mysql.connector.MySQLConnection):
+        """
+        Kill the statement running on a pooled connection (from a dedicated connection,
+        so it works even when the pool is exhausted) and close the connection instead
+        of returning it to the pool.
+        """
+        self.pool.discard(connection)
+        killer = self.connect()
+        if killer is None:
+            return
+        try:
+            with killer.cursor() as cursor:
+                cursor.execute(f"KILL QUERY {int(connection.connection_id)}")
+        except Error as e:
+            logger.warning(f"Could not cancel MySQL query: {e}")
+        finally:
+            killer.close()
+
+    def pool_metrics(self) -> Dict[str, Any]:
+        return self.pool.metrics()
+
     @staticmethod
-    def execute_query(connection: mysql.connector.MySQLConnection, query: str) -> List[tuple]:
+    def execute_query(connection: mysql.connector.MySQLConnection, query: str, params: Optional[tuple] = None) -> List[tuple]:
         try:
             with connection.cursor() as cursor:
-                cursor.execute(query)
+                cursor.execute(query, params)
                 return cursor.fetchall()
         except Error as e:
             logger.error(f"Error executing query: {e}")
             return []
 
-    def get_databases(self) -> List[str]:
-        connection = self.connect()
-        if not connection:
+    def _query(self, query: str, database: Optional[str] = None, params: Optional[tuple] = None) -> List[tuple]:
+        try:
+            with self.connection(database) as connection:
+                return self.execute_query(connection, query, params)
+        except Error as e:
+            logger.error(f"Error connecting to MySQL: {e}")
             return []
 
-        query = "SHOW DATABASES"
-        results = self.execute_query(connection, query)
-        connection.close()
-
-        return [db[0] for db in results if db[0] not in ['information_schema', 'mysql', 'performance_schema', 'sys']]
+    def get_databases(self) -> List[str]:
+        results = self._query("SHOW DATABASES")
+        return [db[0] for db in results if db[0] not in SYSTEM_DATABASES]
 
     def get_tables(self, database: str) -> List[str]:
-        connection = self.connect(database)
-        if not connection:
-            return []
-
-        query = "SHOW TABLES"
-        results = self.execute_query(connection, query)
-        connection.close()
-
+        results = self._query("SHOW TABLES", database)
         return [table[0] for table in results]
 
     def get_schema(self, database: str, table: str) -> List[Dict[str, str]]:
-        connection = self.connect(database)
-        if not connection:
-            return []
-
-        query = f"DESCRIBE {table}"
-        results = self.execute_query(connection, query)
-        connection.close()
-
+        results = self._query(f"DESCRIBE {table}", database)
         return [{"Field": column[0], "Type": column[1]} for column in results]
 
     def get_sample_data(self, database: str, table: str) -> List[Dict[str, Any]]:
-        connection = self.connect(database)
-        if not connection:
+        query = f"SELECT * FROM {table} LIMIT 10"
+        try:
+            with self.connection(database) as connection:
+                with connection.cursor(dictionary=True) as cursor:
+                    cursor.execute(query)
+                    return cursor.fetchall()
+        except Error as e:
+            logger.error(f"Error fetching sample data from {database}.{table}: {e}")
             return []
 
-        query = f"SELECT * FROM {table} LIMIT 10"
-        with connection.cursor(dictionary=True) as cursor:
-            cursor.execute(query)
-            results = cursor.fetchall()
+    def extract_table(self, database: str, table: str) -> Dict[str, Any]:
+        return {
+            "database": database,
+            "table": table,
+            "schema": self.get_schema(database, table),
+            "sample_data": self.get_sample_data(database, table)
+        }
+
+    def get_bulk_metadata(self, databases: Optional[List[str]] = None) -> Dict[tuple, Dict[str, Any]]:
+        """
+        Fetch columns, primary/foreign keys and table statistics for every user
+        table (or only those in `databases`) with three information_schema queries.
+        Returns {(database, table): {"schema": [...], "stats": {...}}}.
+        """
+        if databases is not None and not databases:
+            return {}
+
+        if databases is None:
+            where = f"TABLE_SCHEMA NOT IN ({', '.join(['%s'] * len(SYSTEM_DATABASES))})"
+            params = tuple(SYSTEM_DATABASES)
+        else:
+            where = f"TABLE_SCHEMA IN ({', '.join(['%s'] * len(databases))})"
+            params = tuple(databases)
+
+        tables_query = (
+            "SELECT TABLE_SCHEMA, TABLE_NAME, TABLE_ROWS, DATA_LENGTH, CREATE_TIME, UPDATE_TIME "
+            f"FROM information_schema.TABLES WHERE {where}"
+        )
+        columns_query = (
+            "SELECT TABLE_SCHEMA, TABLE_NAME, COLUMN_NAME, COLUMN_TYPE, IS_NULLABLE, COLUMN_KEY "
+            f"FROM information_schema.COLUMNS WHERE {where} "
+            "ORDER BY TABLE_SCHEMA, TABLE_NAME, ORDINAL_POSITION"
+        )
+        keys_query = (
+            "SELECT TABLE_SCHEMA, TABLE_NAME, COLUMN_NAME, CONSTRAINT_NAME, "
+            "REFERENCED_TABLE_SCHEMA, REFERENCED_TABLE_NAME, REFERENCED_COLUMN_NAME "
+            f"FROM information_schema.KEY_COLUMN_USAGE WHERE {where} "
+            "AND (CONSTRAINT_NAME = 'PRIMARY' OR REFERENCED_TABLE_NAME IS NOT NULL)"
+        )
+
+        try:
+            with self.connection() as connection:
+                tables = self.execute_query(connection, tables_query, params)
+                columns = self.execute_query(connection, columns_query, params)
+                keys = self.execute_query(connection, keys_query, params)
+        except Error as e:
+            logger.error(f"Error fetching bulk metadata: {e}")
+            return {}
 
-        connection.close()
-        return results
+        metadata = {
+            (row[0], row[1]): {
+                "schema": [],
+                "stats": {"rows": row[2], "data_length": row[3], "create_time": row[4], "update_time": row[5]},
+            }
+            for row in tables
+        }
+
+        key_info = {}
+        for db, table, column, constraint, ref_db, ref_table, ref_column in keys:
+            info = key_info.setdefault((db, table, column), {})
+            if constraint == 'PRIMARY':
+                info["Key"] = "PRI"
+            else:
+                info["References"] = f"{ref_db}.{ref_table}.{ref_column}"
+
+        for db, table, column, column_type, is_nullable, column_key in columns:
+            entry = metadata.get((db, table))
+            if entry is None:
+                continue
+            field = {"Field": column, "Type": column_type}
+            if column_key:
+                field["Key"] = column_key
+            field.update(key_info.get((db, table, column), {}))
+            entry["schema"].append(field)
+
+        return metadata
+
+    def _records_with_samples(self, metadata: Dict[tuple, Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Build catalog records from bulk metadata, sampling all tables in parallel."""
+        samples, self.last_harvest_report = self.harvester.harvest(
+            [(db, table, entry["schema"]) for (db, table), entry in metadata.items()]
+        )
+        return [
+            {
+                "database": db,
+                "table": table,
+                "schema": entry["schema"],
+                "sample_data": samples.get((db, table), [])
+            }
+            for (db, table), entry in metadata.items()
+        ]
+
+    def extract_tables(self, tables: List[tuple]) -> List[Dict[str, Any]]:
+        """
+        Extract records for the given (database, table) pairs, fetching their
+        metadata in bulk and sample data in parallel.
+        """
+        if not Config.MYSQL_BULK_EXTRACTION:
+            return [self.extract_table(db, table) for db, table in tables]
+
+        metadata = self.get_bulk_metadata(sorted({db for db, _ in tables}))
+        wanted = set(tables)
+        return self._records_with_samples({key: entry for key, entry in metadata.items() if key in wanted})
 
     def extract_all_mysql_data(self) -> List[Dict[str, Any]]:
+        if Config.MYSQL_BULK_EXTRACTION:
+            return self._records_with_samples(self.get_bulk_metadata())
+
         all_data = []
         databases = self.get_databases()
 
         for db in databases:
             tables = self.get_tables(db)
             for table in tables:
-                schema = self.get_schema(db, table)
-                sample_data = self.get_sample_data(db, table)
-                all_data.append({
-                    "database": db,
-                    "table": table,
-                    "schema": schema,
-                    "sample_data": sample_data
-                })
+                all_data.append(self.extract_table(db, table))
 
         return all_data
 
+    def get_table_fingerprints(self) -> Dict[tuple, str]:
+        """
+        Fingerprint every user table from information_schema.TABLES in a single query.
+        Returns {(database, table): fingerprint}.
+
+        Connection and query errors are raised rather than logged: an empty result
+        would read as "every table was dropped" and empty the catalog.
+        """
+        query = (
+            "SELECT TABLE_SCHEMA, TABLE_NAME, CREATE_TIME, UPDATE_TIME, TABLE_ROWS, DATA_LENGTH "
+            "FROM information_schema.TABLES "
+            f"WHERE TABLE_SCHEMA NOT IN ({', '.join(['%s'] * len(SYSTEM_DATABASES))})"
+        )
+        with self.connection() as connection:
+            with connection.cursor() as cursor:
+                cursor.execute(query, tuple(SYSTEM_DATABASES))
+                results = cursor.fetchall()
+        return {
+            (row[0], row[1]): "|".join(str(value) for value in row[2:])
+            for row in results
+        }
+
 def main():
     connector = MySQLConnector()
     all_data = connector.extract_all_mysql_data()
@@ -0,0 +1,269 @@
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional, Tuple, Type
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no connection could be checked out within the timeout."""
+
+
+class _PooledEntry:
+    __slots__ = ("connection", "database", "created_at", "last_used")
+
+    def __init__(self, connection: Any, database: Optional[str]):
+        now = time.monotonic()
+        self.connection = connection
+        self.database = database
+        self.created_at = now
+        self.last_used = now
+
+
+class MySQLConnectionPool:
+    """
+    Bounded, thread-safe pool of MySQL connections.
+
+    Connections are shared across databases: a checkout prefers an idle
+    connection already on the requested database and otherwise switches
+    the default database of any idle one (a checkout without a database
+    gets a fresh connection instead, since MySQL cannot unselect one).
+    Every connection is rolled back on checkin so no transaction or
+    snapshot carries over to the next borrower. Idle connections are evicted
+    after `idle_timeout`, recycled after `max_lifetime` and pinged before
+    reuse when they have been idle longer than `health_check_interval`.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[Optional[str]], Any],
+        max_size: int = 10,
+        checkout_timeout: float = 30.0,
+        idle_timeout: float = 300.0,
+        max_lifetime: float = 3600.0,
+        health_check_interval: float = 30.0,
+        discard_on: Tuple[Type[BaseException], ...] = (),
+    ):
+        self._connect = connect
+        self.max_size = max_size
+        self.checkout_timeout = checkout_timeout
+        self.idle_timeout = idle_timeout
+        self.max_lifetime = max_lifetime
+        self.health_check_interval = health_check_interval
+        self.discard_on = discard_on
+        self._discard_requests: set = set()
+
+        self._idle: deque = deque()
+        self._size = 0
+        self._in_use = 0
+        self._condition = threading.Condition()
+
+        self._stats = {
+            "checkouts": 0,
+            "waits": 0,
+            "timeouts": 0,
+            "created": 0,
+            "closed": 0,
+            "health_check_failures": 0,
+            "checkout_latency_total": 0.0,
+            "checkout_latency_max": 0.0,
+        }
+
+    @contextmanager
+    def connection(self, database: Optional[str] = None):
+        """Check out a connection for `database` and return it to the pool afterwards."""
+        entry = self._checkout(database)
+        discard = False
+        try:
+            yield entry.connection
+        except self.discard_on:
+            discard = True
+            raise
+        finally:
+            with self._condition:
+                if id(entry.connection) in self._discard_requests:
+                    self._discard_requests.remove(id(entry.connection))
+                    discard = True
+            self._checkin(entry, discard)
+
+    def discard(self, connection: Any):
+        """Close `connection` instead of returning it to the pool when its `connection()` block exits."""
+        with self._condition:
+            self._discard_requests.add(id(connection))
+
+    def fill(self, count: int, database: Optional[str] = None) -> int:
+        """Open idle connections until the pool holds `count` (at most max_size). Returns how many were opened."""
+        opened = 0
+        while True:
+            with self._condition:
+                if self._size >= min(count, self.max_size):
+                    return opened
+                self._size += 1
+            try:
+                connection = self._connect(database)
+            except BaseException:
+                with self._condition:
+                    self._size -= 1
+                    self._condition.notify()
+                raise
+            with self._condition:
+                self._stats["created"] += 1
+                self._idle.append(_PooledEntry(connection, database))
+                self._condition.notify()
+            opened += 1
+
+    def _checkout(self, database: Optional[str]) -> _PooledEntry:
+        start = time.monotonic()
+        deadline = start + self.checkout_timeout
+        entry = None
+        waited = False
+        timed_out = False
+        expired = []
+
+        with self._condition:
+            while True:
+                expired.extend(self._evict_expired())
+                entry = self._take_idle(database)
+                if entry is not None:
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats["timeouts"] += 1
+                    timed_out = True
+                    break
+                if not waited:
+                    waited = True
+                    self._stats["waits"] += 1
+                self._condition.wait(remaining)
+            if not timed_out:
+                self._in_use += 1
+
+        self._close_all(expired)
+        if timed_out:
+            raise PoolTimeoutError(f"Timed out after {self.checkout_timeout}s waiting for a MySQL connection")
+
+        try:
+            if entry is not None and (
+                (database is None and entry.database is not None) or not self._is_healthy(entry)
+            ):
+                self._close(entry.connection)
+                entry = None
+            if entry is None:
+                entry = _PooledEntry(self._connect(database), database)
+                with self._condition:
+                    self._stats["created"] += 1
+            elif entry.database != database:
+                entry.connection.database = database
+                entry.database = database
+        except BaseException:
+            if entry is not None:
+                self._close(entry.connection)
+            with self._condition:
+                self._size -= 1
+                self._in_use -= 1
+                self._condition.notify()
+            raise
+
+        latency = time.monotonic() - start
+        with self._condition:
+            self._stats["checkouts"] += 1
+            self._stats["checkout_latency_total"] += latency
+            self._stats["checkout_latency_max"] = max(self._stats["checkout_latency_max"], latency)
+        return entry
+
+    def _checkin(self, entry: _PooledEntry, discard: bool = False):
+        now = time.monotonic()
+        if not discard and now - entry.created_at >= self.max_lifetime:
+            discard = True
+        if not discard:
+            try:
+                entry.connection.rollback()
+            except Exception as e:
+                logger.warning(f"Discarding pooled MySQL connection that failed to roll back: {e}")
+                discard = True
+        with self._condition:
+            self._in_use -= 1
+            if discard:
+                self._size -= 1
+            else:
+                entry.last_used = now
+                self._idle.append(entry)
+            self._condition.notify()
+        if discard:
+            self._close(entry.connection)
+
+    def _take_idle(self, database: Optional[str]) -> Optional[_PooledEntry]:
+        """Pop the most recently used idle entry, preferring one on `database`."""
+        for entry in reversed(self._idle):
+            if entry.database == database:
+                self._idle.remove(entry)
+                return entry
+        if self._idle:
+            return self._idle.pop()
+        return None
+
+    def _evict_expired(self) -> list:
+        """Remove idle entries past their idle timeout or lifetime. Caller holds the lock."""
+        now = time.monotonic()
+        expired = [
+            e for e in self._idle
+            if now - e.last_used >= self.idle_timeout or now - e.created_at >= self.max_lifetime
+        ]
+        for entry in expired:
+            self._idle.remove(entry)
+            self._size -= 1
+        return expired
+
+    def _is_healthy(self, entry: _PooledEntry) -> bool:
+        if time.monotonic() - entry.last_used < self.health_check_interval:
+            return True
+        try:
+            healthy = entry.connection.is_connected()
+        except Exception:
+            healthy = False
+        if not healthy:
+            with self._condition:
+                self._stats["health_check_failures"] += 1
+            logger.warning("Discarding unhealthy pooled MySQL connection")
+        return healthy
+
+    def _close(self, connection: Any):
+        try:
+            connection.close()
+        except Exception as e:
+            logger.debug(f"Error closing pooled connection: {e}")
+        with self._condition:
+            self._stats["closed"] += 1
+
+    def _close_all(self, entries: list):
+        for entry in entries:
+            self._close(entry.connection)
+
+    def close(self):
+        """Close every idle connection."""
+        with self._condition:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+        self._close_all(idle)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._condition:
+            stats = dict(self._stats)
+            stats.update({
+                "size": self._size,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "max_size": self.max_size,
+            })
+        checkouts = stats["checkouts"]
+        stats["checkout_latency_avg"] = stats["checkout_latency_total"] / checkouts if checkouts else 0.0
+        return stats
@@ -0,0 +1,277 @@
+import os
+import re
+import sys
+import json
+import time
+import sqlite3
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+project_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.append(project_dir)
+from config import Config
+
+src_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(src_dir)
+from data_sources.sqlite_connector import is_value_word, normalize_query
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Quoted text, then words that look like values rather than English: containing
+# a digit or '@', or with upper case after the first letter (e.g. FZwdkpHZ)
+_LITERAL = re.compile(
+    r"'(?P<single>[^']*)'|\"(?P<double>[^\"]*)\"|(?P<word>[\w@.\-]*[\w@])"
+)
+_NUMBER = re.compile(r"^-?\d+(?:\.\d+)?$")
+_WHERE = re.compile(r"\bWHERE\b", re.IGNORECASE)
+_WHERE_END = re.compile(r"\b(?:GROUP\s+BY|ORDER\s+BY|HAVING|LIMIT|UNION|WINDOW)\b", re.IGNORECASE)
+_FENCE = re.compile(r"^\s*```[a-zA-Z]*\s*|\s*```\s*$")
+_SQL_STRING = re.compile(r"'((?:[^']|'')*)'")
+_WORD = re.compile(r"\w+")
+
+
+def source_fingerprints(sources: List[Dict[str, Any]],
+                        fingerprint_fn: Optional[Callable[[str, str], Optional[str]]]) -> List[List[Optional[str]]]:
+    """
+    [database, table, fingerprint] of every source table. Kept as triples: a CSV
+    database is a directory path such as `./data`, so a dotted key cannot be split back.
+    """
+    if fingerprint_fn is None:
+        return []
+    return [[s.get("database"), s.get("table"), fingerprint_fn(s.get("database"), s.get("table"))]
+            for s in sources if s.get("table")]
+
+
+def fingerprints_current(fingerprints: Any, fingerprint_fn: Optional[Callable[[str, str], Optional[str]]]) -> bool:
+    """Whether every table recorded by source_fingerprints() still has its fingerprint."""
+    if fingerprint_fn is None:
+        return True
+    if isinstance(fingerprints, dict):
+        # Older entries keyed by "database.table": not reliably splittable, so only an empty one is current
+        return not fingerprints
+    return all(fingerprint_fn(database, table) == fingerprint for database, table, fingerprint in fingerprints)
+
+
+def extract_literals(question: str) -> Tuple[str, List[Tuple[str, str]]]:
+    """
+    Split a question into its shape key and literals.
+    Returns (shape, [(kind, value)]) where kind is "num" or "str".
+    """
+    literals: List[Tuple[str, str]] = []
+
+    def replace(match: re.Match) -> str:
+        quoted = match.group("single") if match.group("single") is not None else match.group("double")
+        value = quoted if quoted is not None else match.group("word")
+        if quoted is None and not is_value_word(value):
+            return value
+        kind = "num" if _NUMBER.match(value) else "str"
+        literals.append((kind, value))
+        return f"<{kind}>"
+
+    return normalize_query(_LITERAL.sub(replace, question)), literals
+
+
+def literals_agree(question: str, cached_question: str, cached_answer: str) -> bool:
+    """
+    Whether the answer to `cached_question` may be reused for `question`: both have
+    the same literals, and every word of the cached question that the cached answer
+    quotes as a string (e.g. a lower-case name) appears in `question` too.
+    """
+    if extract_literals(question)[1] != extract_literals(cached_question)[1]:
+        return False
+    words = set(_WORD.findall(question.casefold()))
+    cached_words = set(_WORD.findall(cached_question.casefold()))
+    for quoted in _SQL_STRING.findall(cached_answer or ""):
+        for word in _WORD.findall(quoted.casefold()):
+            if word in cached_words and word not in words:
+                return False
+    return True
+
+
+def where_clause(sql: str) -> Tuple[int, int]:
+    """Character span of the first WHERE clause in `sql`, or (-1, -1). Keywords inside string literals are ignored."""
+    masked = _SQL_STRING.sub(lambda m: "'" + " " * (len(m.group(0)) - 2) + "'", sql)
+    match = _WHERE.search(masked)
+    if match is None:
+        return -1, -1
+    end = _WHERE_END.search(masked, match.end())
+    return match.end(), end.start() if end else len(sql)
+
+
+# SQL dialect of each answer type: "sql" runs on MySQL, "csv" on the SQLite CSV engine
+DIALECTS = {"sql": "mysql", "csv": "sqlite"}
+
+
+def render_literal(value: str, quoted: bool, dialect: str = "mysql") -> str:
+    """
+    SQL text for a literal: numbers bare, strings in single quotes (a double-quoted
+    string is an identifier under ANSI_QUOTES and in SQLite) with quotes doubled and,
+    for MySQL only, backslashes doubled (SQLite takes them literally).
+    """
+    if not quoted:
+        return value
+    if dialect == "mysql":
+        value = value.replace("\\", "\\\\")
+    return "'" + value.replace("'", "''") + "'"
+
+
+def parse_sql_answer(answer: str) -> Tuple[Optional[str], Optional[str]]:
+    """(type, query) of an LLM answer of type "sql" or "csv", or (None, None)."""
+    try:
+        parsed = json.loads(_FENCE.sub("", answer or ""))
+    except (TypeError, ValueError):
+        return None, None
+    if not isinstance(parsed, dict) or parsed.get("type") not in DIALECTS or not isinstance(parsed.get("query"), str):
+        return None, None
+    return parsed["type"], parsed["query"]
+
+
+class QueryTemplateCache:
+    """
+    NL-to-SQL templates keyed by question shape.
+
+    Literals (quoted text, numbers, identifier-like words) are cut out of the
+    question to form a shape key. When the generated SQL (MySQL, or SQLite
+    for CSV answers) contains each of those literals exactly once inside its
+    WHERE clause, as a single-quoted string or a bare number, the SQL is
+    stored as a template with a slot per literal; later questions of the same
+    shape get their SQL by substituting their own literals, escaped for the
+    template's dialect.
+    """
+
+    def __init__(self, path: Optional[str] = None,
+                 fingerprint_fn: Optional[Callable[[str, str], Optional[str]]] = None):
+        self.path = path or Config.SQLITE_CACHE_FILE
+        self.fingerprint_fn = fingerprint_fn
+        self.templates: Optional[Dict[str, Dict[str, Any]]] = None
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.RLock()
+        self._counters = {"hits": 0, "misses": 0, "learned": 0, "rejected": 0}
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute('''CREATE TABLE IF NOT EXISTS query_templates
+                                  (shape TEXT PRIMARY KEY, segments TEXT, sources TEXT,
+                                   fingerprints TEXT, answer_type TEXT, created_at REAL)''')
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(query_templates)")}
+            if "answer_type" not in columns:
+                self._conn.execute("ALTER TABLE query_templates ADD COLUMN answer_type TEXT DEFAULT 'sql'")
+            self._conn.commit()
+            self.templates = {
+                shape: {"segments": json.loads(segments), "sources": json.loads(sources),
+                        "fingerprints": json.loads(fingerprints), "type": answer_type}
+                for shape, segments, sources, fingerprints, answer_type in
+                self._conn.execute("SELECT shape, segments, sources, fingerprints, answer_type FROM query_templates")
+            }
+        return self._conn
+
+    def _fingerprints(self, sources: List[Dict[str, Any]]) -> List[List[Optional[str]]]:
+        return source_fingerprints(sources, self.fingerprint_fn)
+
+    def _is_current(self, fingerprints: Any) -> bool:
+        return fingerprints_current(fingerprints, self.fingerprint_fn)
+
+    def _forget(self, shape: str):
+        self.templates.pop(shape, None)
+        self._conn.execute("DELETE FROM query_templates WHERE shape = ?", (shape,))
+        self._conn.commit()
+
+    def lookup(self, question: str) -> Tuple[Optional[str], Optional[List[Dict[str, Any]]]]:
+        """Return (answer, sources) for a question of a known shape, or (None, None)."""
+        shape, literals = extract_literals(question)
+        with self._lock:
+            self._connection()
+            template = self.templates.get(shape) if literals else None
+            if template is not None and not self._is_current(template["fingerprints"]):
+                self._forget(shape)
+                template = None
+            if template is None:
+                self._counters["misses"] += 1
+                return None, None
+
+            dialect = DIALECTS[template["type"]]
+            sql = "".join(
+                segment if isinstance(segment, str)
+                else render_literal(literals[segment["slot"]][1], segment["quote"] is not None, dialect)
+                for segment in template["segments"]
+            )
+            self._counters["hits"] += 1
+            return json.dumps({"type": template["type"], "query": sql}), template["sources"]
+
+    def learn(self, question: str, answer: str, sources: List[Dict[str, Any]]) -> bool:
+        """Store the SQL of `answer` as a template if every literal of `question` maps to one WHERE-clause slot."""
+        shape, literals = extract_literals(question)
+        answer_type, sql = parse_sql_answer(answer)
+        if not literals or sql is None:
+            return False
+        dialect = DIALECTS[answer_type]
+
+        slots = []
+        for position, (kind, value) in enumerate(literals):
+            # A double-quoted occurrence may be an identifier (ANSI_QUOTES, SQLite): never a slot
+            candidates = [(render_literal(value, True, dialect), "'"), ('"' + value.replace('"', '""') + '"', '"')]
+            if kind == "num":
+                candidates.append((value, None))
+            found = []
+            for text, quote in candidates:
+                pattern = re.escape(text) if quote else r"(?<![\w.'\"])" + re.escape(text) + r"(?![\w.'\"])"
+                found += [(m.start(), m.end(), quote) for m in re.finditer(pattern, sql)]
+            if len(found) != 1 or found[0][2] == '"':
+                return self._reject()
+            slots.append((found[0][0], found[0][1], position, found[0][2]))
+
+        segments: List[Any] = []
+        cursor = 0
+        for slot_start, slot_end, position, quote in sorted(slots):
+            if slot_start < cursor:
+                return self._reject()
+            segments.append(sql[cursor:slot_start])
+            segments.append({"slot": position, "quote": quote})
+            cursor = slot_end
+        segments.append(sql[cursor:])
+
+        # Every slot must sit inside the template's WHERE clause whatever gets substituted,
+        # so check the template with its slots blanked rather than the SQL it was cut from
+        skeleton, placeholders = "", []
+        for segment in segments:
+            if isinstance(segment, str):
+                skeleton += segment
+            else:
+                placeholders.append(len(skeleton))
+                skeleton += "?"
+        where_start, where_end = where_clause(skeleton)
+        if not all(where_start <= offset < where_end for offset in placeholders):
+            return self._reject()
+
+        fingerprints = self._fingerprints(sources)
+        with self._lock:
+            conn = self._connection()
+            conn.execute("INSERT OR REPLACE INTO query_templates "
+                         "(shape, segments, sources, fingerprints, answer_type, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                         (shape, json.dumps(segments), json.dumps(sources), json.dumps(fingerprints), answer_type,
+                          time.time()))
+            conn.commit()
+            self.templates[shape] = {"segments": segments, "sources": sources, "fingerprints": fingerprints,
+                                     "type": answer_type}
+            self._counters["learned"] += 1
+        logger.info(f"Learned SQL template for '{shape}'")
+        return True
+
+    def _reject(self) -> bool:
+        with self._lock:
+            self._counters["rejected"] += 1
+        return False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._connection()
+            stats = dict(self._counters)
+            stats["templates"] = len(self.templates)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        return stats
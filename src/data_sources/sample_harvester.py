@@ -0,0 +1,188 @@
+import os
+import sys
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+project_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.append(project_dir)
+from config import Config
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Column types that are never sampled, and types whose values are truncated server-side
+SKIPPED_TYPES = ('blob', 'binary', 'varbinary', 'geometry', 'point', 'linestring', 'polygon')
+TRUNCATED_TYPES = ('json', 'text', 'char', 'varchar')
+
+
+def quote_identifier(name: str) -> str:
+    return "`" + str(name).replace("`", "``") + "`"
+
+
+class SampleHarvester:
+    """
+    Fetch sample rows for many tables concurrently.
+
+    At most `max_concurrency` sampling queries run against the server at once.
+    Each query carries a MAX_EXECUTION_TIME hint and is cancelled after
+    `table_timeout` seconds (its statement killed and its connection closed
+    rather than returned to the pool); failed or slow tables are skipped and
+    listed in the harvest report. Only up to `max_columns` columns are projected,
+    binary/spatial columns are left out, long values are truncated and rows
+    stop being added once a table's sample exceeds `max_table_bytes`.
+    """
+
+    def __init__(
+        self,
+        mysql_connector,
+        max_concurrency: Optional[int] = None,
+        table_timeout: Optional[float] = None,
+        sample_rows: Optional[int] = None,
+        max_columns: Optional[int] = None,
+        max_value_bytes: Optional[int] = None,
+        max_table_bytes: Optional[int] = None,
+    ):
+        self.mysql_connector = mysql_connector
+        self.max_concurrency = max_concurrency or Config.SAMPLE_MAX_CONCURRENCY
+        self.table_timeout = table_timeout or Config.SAMPLE_TABLE_TIMEOUT
+        self.sample_rows = sample_rows or Config.MAX_SAMPLE_ROWS
+        self.max_columns = max_columns or Config.SAMPLE_MAX_COLUMNS
+        self.max_value_bytes = max_value_bytes or Config.SAMPLE_MAX_VALUE_BYTES
+        self.max_table_bytes = max_table_bytes or Config.SAMPLE_MAX_TABLE_BYTES
+
+    def build_query(self, database: str, table: str, schema: List[Dict[str, str]]) -> Optional[str]:
+        """Projected sampling query for a table, or None if no column is worth sampling."""
+        columns = []
+        for column in schema:
+            column_type = str(column.get("Type", "")).lower()
+            if any(t in column_type for t in SKIPPED_TYPES):
+                continue
+            name = quote_identifier(column["Field"])
+            if column_type.startswith(TRUNCATED_TYPES) or column_type.endswith('text'):
+                columns.append(f"LEFT({name}, {self.max_value_bytes}) AS {name}")
+            else:
+                columns.append(name)
+            if len(columns) >= self.max_columns:
+                break
+
+        if schema and not columns:
+            return None
+        projection = ", ".join(columns) if columns else "*"
+        timeout_ms = int(self.table_timeout * 1000)
+        return (
+            f"SELECT /*+ MAX_EXECUTION_TIME({timeout_ms}) */ {projection} "
+            f"FROM {quote_identifier(database)}.{quote_identifier(table)} LIMIT {self.sample_rows}"
+        )
+
+    def _fit_budget(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Truncate long values and drop rows past the per-table byte budget."""
+        sample, used = [], 0
+        for row in rows:
+            fitted, size = {}, 0
+            for key, value in row.items():
+                if isinstance(value, (bytes, bytearray)):
+                    value = f"<{len(value)} bytes>"
+                elif isinstance(value, str) and len(value) > self.max_value_bytes:
+                    value = value[:self.max_value_bytes] + "..."
+                fitted[key] = value
+                size += len(str(key)) + len(str(value))
+            if sample and used + size > self.max_table_bytes:
+                break
+            sample.append(fitted)
+            used += size
+        return sample
+
+    def sample_table(
+        self,
+        database: str,
+        table: str,
+        schema: List[Dict[str, str]],
+        on_connection: Optional[Callable[[Any], bool]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Sample one table. `on_connection` is called with the checked-out connection
+        before the query runs; returning False skips the query.
+        """
+        query = self.build_query(database, table, schema)
+        if query is None:
+            return []
+        with self.mysql_connector.connection() as connection:
+            if on_connection is not None and not on_connection(connection):
+                return []
+            with connection.cursor(dictionary=True) as cursor:
+                cursor.execute(query)
+                rows = cursor.fetchall()
+        return self._fit_budget(rows)
+
+    def harvest(self, tables: List[Tuple[str, str, List[Dict[str, str]]]]) -> Tuple[Dict[tuple, List[Dict[str, Any]]], Dict[str, Any]]:
+        """
+        Sample every (database, table, schema) in parallel.
+        Returns ({(database, table): rows}, report).
+        """
+        start = time.monotonic()
+        samples: Dict[tuple, List[Dict[str, Any]]] = {}
+        skipped: List[Dict[str, str]] = []
+        started: Dict[Any, float] = {}
+        # Connections of running queries, and tables given up on; a table abandoned before
+        # its connection is checked out never runs its query
+        active: Dict[tuple, Any] = {}
+        abandoned: set = set()
+        lock = threading.Lock()
+
+        def task(key, schema):
+            started[key] = time.monotonic()
+
+            def register(connection) -> bool:
+                with lock:
+                    if key in abandoned:
+                        return False
+                    active[key] = connection
+                    return True
+
+            try:
+                return self.sample_table(key[0], key[1], schema, on_connection=register)
+            finally:
+                with lock:
+                    active.pop(key, None)
+
+        def abandon(key):
+            with lock:
+                abandoned.add(key)
+                connection = active.pop(key, None)
+            if connection is not None:
+                self.mysql_connector.cancel(connection)
+
+        executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="sample-harvest")
+        try:
+            pending = {executor.submit(task, (db, table), schema): (db, table) for db, table, schema in tables}
+            while pending:
+                done, _ = wait(pending, timeout=min(self.table_timeout, 0.5), return_when=FIRST_COMPLETED)
+                for future in done:
+                    key = pending.pop(future)
+                    try:
+                        samples[key] = future.result()
+                    except Exception as e:
+                        skipped.append({"database": key[0], "table": key[1], "reason": str(e)})
+                now = time.monotonic()
+                for future, key in list(pending.items()):
+                    if key in started and now - started[key] > self.table_timeout:
+                        del pending[future]
+                        abandon(key)
+                        skipped.append({"database": key[0], "table": key[1], "reason": "timeout"})
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        report = {
+            "tables": len(tables),
+            "sampled": len(samples),
+            "skipped": skipped,
+            "seconds": round(time.monotonic() - start, 3),
+        }
+        if skipped:
+            logger.warning(f"Skipped sampling {len(skipped)} tables: {skipped[:10]}")
+        logger.info(f"Sampled {len(samples)}/{len(tables)} tables in {report['seconds']}s")
+        return samples, report
@@ -0,0 +1,152 @@
+import os
+import sys
+import json
+import time
+import sqlite3
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import faiss
+import numpy as np
+
+project_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.append(project_dir)
+from config import Config
+
+src_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(src_dir)
+from data_sources import embedding_models
+from data_sources.query_templates import fingerprints_current, literals_agree, source_fingerprints
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+FingerprintFn = Callable[[str, str], Optional[str]]
+
+
+class SemanticCache:
+    """
+    Cache of answers keyed by question meaning rather than exact text.
+
+    Answered questions are embedded and kept in an in-memory FAISS index
+    (vectors persist in SQLite next to the answers). A lookup returns the
+    closest cached answer when its similarity reaches `threshold`, both
+    questions carry the same literals (so "top 10 users" never reuses the
+    answer to "top 20 users") and the fingerprints of the tables it was
+    built from are unchanged; answers over tables that changed since are
+    dropped.
+    """
+
+    def __init__(self, path: Optional[str] = None, threshold: Optional[float] = None,
+                 fingerprint_fn: Optional[FingerprintFn] = None, model_name: Optional[str] = None):
+        self.path = path or Config.SQLITE_CACHE_FILE
+        self.threshold = Config.SEMANTIC_CACHE_THRESHOLD if threshold is None else threshold
+        self.fingerprint_fn = fingerprint_fn
+        self.model_name = model_name or Config.FAISS_MODEL_NAME
+        self.index: Optional[faiss.Index] = None
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.RLock()
+        self._counters = {"hits": 0, "misses": 0, "invalidated": 0}
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute('''CREATE TABLE IF NOT EXISTS semantic_cache
+                                  (id INTEGER PRIMARY KEY, question TEXT, answer TEXT, sources TEXT,
+                                   fingerprints TEXT, vector BLOB, created_at REAL)''')
+            self._conn.commit()
+            self._load_index()
+        return self._conn
+
+    def _load_index(self):
+        rows = self._conn.execute("SELECT id, vector FROM semantic_cache").fetchall()
+        if not rows:
+            return
+        vectors = np.stack([np.frombuffer(blob, dtype="float32") for _, blob in rows])
+        self.index = faiss.IndexIDMap2(faiss.IndexFlatIP(vectors.shape[1]))
+        self.index.add_with_ids(vectors, np.asarray([row_id for row_id, _ in rows], dtype="int64"))
+        logger.info(f"Loaded {len(rows)} semantic cache entries")
+
+    def _embed(self, question: str) -> np.ndarray:
+        vector = embedding_models.encode([question], self.model_name)
+        faiss.normalize_L2(vector)
+        return vector
+
+    def _fingerprints(self, sources: List[Dict[str, Any]]) -> List[List[Optional[str]]]:
+        return source_fingerprints(sources, self.fingerprint_fn)
+
+    def _is_current(self, fingerprints: Any) -> bool:
+        return fingerprints_current(fingerprints, self.fingerprint_fn)
+
+    def _delete(self, ids: List[int]):
+        if not ids:
+            return
+        self._connection().executemany("DELETE FROM semantic_cache WHERE id = ?", [(i,) for i in ids])
+        self._conn.commit()
+        if self.index is not None:
+            self.index.remove_ids(np.asarray(ids, dtype="int64"))
+        self._counters["invalidated"] += len(ids)
+
+    def lookup(self, question: str, vector: Optional[np.ndarray] = None) -> Tuple[Optional[str], Optional[Any]]:
+        """Return (answer, sources) of the closest still-valid cached question, or (None, None)."""
+        with self._lock:
+            self._connection()
+            if self.index is None or self.index.ntotal == 0:
+                self._counters["misses"] += 1
+                return None, None
+            vector = self._embed(question) if vector is None else vector
+            scores, ids = self.index.search(vector, 3)
+            stale = []
+            for score, entry_id in zip(scores[0], ids[0]):
+                if entry_id == -1 or score < self.threshold:
+                    break
+                row = self._conn.execute(
+                    "SELECT question, answer, sources, fingerprints FROM semantic_cache WHERE id = ?", (int(entry_id),)
+                ).fetchone()
+                if row is None or not literals_agree(question, row[0], row[1]):
+                    continue
+                if not self._is_current(json.loads(row[3])):
+                    stale.append(int(entry_id))
+                    continue
+                self._delete(stale)
+                self._counters["hits"] += 1
+                logger.info(f"Semantic cache hit ({score:.3f}): '{question}' ~ '{row[0]}'")
+                return row[1], json.loads(row[2])
+            self._delete(stale)
+            self._counters["misses"] += 1
+            return None, None
+
+    def store(self, question: str, answer: str, sources: List[Dict[str, Any]], vector: Optional[np.ndarray] = None):
+        """Cache an answer, tagged with the current fingerprints of its source tables."""
+        with self._lock:
+            conn = self._connection()
+            vector = self._embed(question) if vector is None else vector
+            cursor = conn.execute(
+                "INSERT INTO semantic_cache (question, answer, sources, fingerprints, vector, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (question, answer, json.dumps(sources), json.dumps(self._fingerprints(sources)),
+                 vector.astype("float32").tobytes(), time.time()),
+            )
+            conn.commit()
+            if self.index is None:
+                self.index = faiss.IndexIDMap2(faiss.IndexFlatIP(vector.shape[1]))
+            self.index.add_with_ids(vector, np.asarray([cursor.lastrowid], dtype="int64"))
+
+    def purge_stale(self) -> int:
+        """Drop every entry whose source tables changed. Returns the number removed."""
+        with self._lock:
+            rows = self._connection().execute("SELECT id, fingerprints FROM semantic_cache").fetchall()
+            stale = [row_id for row_id, fingerprints in rows if not self._is_current(json.loads(fingerprints))]
+            self._delete(stale)
+            if stale:
+                logger.info(f"Invalidated {len(stale)} semantic cache entries after schema changes")
+            return len(stale)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._counters)
+            stats["entries"] = self.index.ntotal if self.index is not None else 0
+        return stats
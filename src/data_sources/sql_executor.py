@@ -0,0 +1,304 @@
+import os
+import re
+import sys
+import json
+import hmac
+import time
+import base64
+import hashlib
+import logging
+import datetime
+from decimal import Decimal
+from typing import Any, Dict, Iterator, Optional
+
+project_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.append(project_dir)
+from config import Config
+
+src_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(src_dir)
+from monitoring import tracing
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+READ_ONLY_STATEMENTS = ("select", "with", "show", "describe", "desc", "explain")
+PAGEABLE_STATEMENTS = ("select", "with")
+_LOCKING_CLAUSES = re.compile(
+    r"\b(?:INTO\s+(?:OUTFILE|DUMPFILE)|FOR\s+UPDATE|FOR\s+SHARE|LOCK\s+IN\s+SHARE\s+MODE)\b", re.IGNORECASE
+)
+_TRAILING_LIMIT = re.compile(r"\bLIMIT\s+(\d+)(?:\s*,\s*(\d+)|\s+OFFSET\s+(\d+))?\s*$", re.IGNORECASE)
+_ORDER_BY = re.compile(r"\bORDER\s+BY\b", re.IGNORECASE)
+
+_process_secret: Optional[bytes] = None
+
+
+class SQLRejectedError(ValueError):
+    """Generated SQL that the executor refuses to run."""
+
+
+class ResultCursorError(ValueError):
+    """A paging cursor that is malformed, tampered with or expired."""
+
+
+def _split_statements(sql: str) -> list:
+    """
+    Split on semicolons outside quotes and comments. Comments are dropped
+    (including MySQL's executable /*! ... */ ones); optimizer hints (/*+ ... */) are kept.
+    """
+    statements, current, quote, i = [], [], None, 0
+    while i < len(sql):
+        char = sql[i]
+        if quote:
+            current.append(char)
+            if char == "\\" and quote != "`" and i + 1 < len(sql):
+                current.append(sql[i + 1])
+                i += 1
+            elif char == quote:
+                quote = None
+        elif char in ("'", '"', "`"):
+            quote = char
+            current.append(char)
+        elif sql.startswith("/*", i):
+            end = sql.find("*/", i + 2)
+            end = len(sql) if end < 0 else end + 2
+            current.append(sql[i:end] if sql.startswith("/*+", i) else " ")
+            i = end
+            continue
+        elif char == "#" or (sql.startswith("--", i) and (i + 2 == len(sql) or sql[i + 2].isspace())):
+            end = sql.find("\n", i)
+            i = len(sql) if end < 0 else end
+            current.append(" ")
+            continue
+        elif char == ";":
+            statements.append("".join(current))
+            current = []
+        else:
+            current.append(char)
+        i += 1
+    statements.append("".join(current))
+    return [s.strip() for s in statements if s.strip()]
+
+
+def _top_level(sql: str) -> str:
+    """`sql` with quoted text and everything inside parentheses blanked out."""
+    out, quote, depth, escaped = [], None, 0, False
+    for char in sql:
+        if quote:
+            if escaped:
+                escaped = False
+            elif char == "\\" and quote != "`":
+                escaped = True
+            elif char == quote:
+                quote = None
+            out.append(" ")
+        elif char in ("'", '"', "`"):
+            quote = char
+            out.append(" ")
+        elif char == "(":
+            depth += 1
+            out.append(" ")
+        elif char == ")":
+            depth = max(0, depth - 1)
+            out.append(" ")
+        else:
+            out.append(char if depth == 0 else " ")
+    return "".join(out)
+
+
+def check_read_only(sql: str) -> str:
+    """Return `sql` as a single read-only statement, or raise SQLRejectedError."""
+    statements = _split_statements(sql or "")
+    if len(statements) != 1:
+        raise SQLRejectedError("Expected exactly one SQL statement")
+    statement = statements[0]
+    keyword = statement.split(None, 1)[0].lower()
+    if keyword not in READ_ONLY_STATEMENTS:
+        raise SQLRejectedError(f"Only read-only statements can be executed, got {keyword.upper()}")
+    if _LOCKING_CLAUSES.search(statement):
+        raise SQLRejectedError("Locking or file-writing clauses are not allowed")
+    return statement
+
+
+def json_value(value: Any) -> Any:
+    """Row value as a JSON-serialisable value."""
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime.date, datetime.datetime, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, datetime.timedelta):
+        return str(value)
+    if isinstance(value, (bytes, bytearray)):
+        try:
+            return value.decode("utf-8")
+        except UnicodeDecodeError:
+            return f"<{len(value)} bytes>"
+    return str(value)
+
+
+def _secret() -> bytes:
+    global _process_secret
+    if Config.RESULT_CURSOR_SECRET:
+        return Config.RESULT_CURSOR_SECRET.encode()
+    if _process_secret is None:
+        logger.warning("RESULT_CURSOR_SECRET is not set; result cursors are only valid in this process")
+        _process_secret = os.urandom(32)
+    return _process_secret
+
+
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _unb64(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def encode_cursor(payload: Dict[str, Any]) -> str:
+    body = _b64(json.dumps(payload, separators=(",", ":")).encode())
+    return f"{body}.{_b64(hmac.new(_secret(), body.encode(), hashlib.sha256).digest())}"
+
+
+def decode_cursor(token: str) -> Dict[str, Any]:
+    try:
+        body, signature = token.split(".", 1)
+        expected = _b64(hmac.new(_secret(), body.encode(), hashlib.sha256).digest())
+        if not hmac.compare_digest(signature, expected):
+            raise ResultCursorError("Invalid result cursor")
+        payload = json.loads(_unb64(body))
+    except ResultCursorError:
+        raise
+    except (ValueError, AttributeError, TypeError):
+        raise ResultCursorError("Malformed result cursor")
+    if payload.get("exp", 0) < time.time():
+        raise ResultCursorError("Result cursor has expired")
+    return payload
+
+
+class SQLExecutor:
+    """
+    Run generated SQL on a pooled connection and stream the result.
+
+    Statements run one at a time in a read-only transaction through an
+    unbuffered cursor with MAX_EXECUTION_TIME set, and rows are read in
+    chunks of `chunk_size`. A page holds at most `max_rows` rows and
+    `max_bytes` of values and stops after `timeout` seconds. SELECT results
+    with a top-level ORDER BY that go on are continued through a signed
+    cursor that encodes the statement and the offset of the next page;
+    without one, LIMIT/OFFSET pages (each its own transaction) could skip or
+    repeat rows, so an unordered result is truncated instead.
+    """
+
+    def __init__(self, mysql_connector, chunk_size: Optional[int] = None, max_rows: Optional[int] = None,
+                 max_bytes: Optional[int] = None, timeout: Optional[float] = None):
+        self.mysql_connector = mysql_connector
+        self.chunk_size = chunk_size or Config.RESULT_CHUNK_ROWS
+        self.max_rows = max_rows or Config.RESULT_MAX_ROWS
+        self.max_bytes = max_bytes or Config.RESULT_MAX_BYTES
+        self.timeout = timeout or Config.RESULT_TIMEOUT
+
+    def page_query(self, sql: str, offset: int) -> str:
+        """`sql` limited to one page (plus one row to detect a next page) starting at `offset`."""
+        match = _TRAILING_LIMIT.search(sql)
+        if match:
+            # Page within the statement's own LIMIT, keeping the ORDER BY that goes with it
+            if match.group(2) is not None:
+                own_offset, own_count = int(match.group(1)), int(match.group(2))
+            else:
+                own_count, own_offset = int(match.group(1)), int(match.group(3) or 0)
+            count = max(0, min(self.max_rows + 1, own_count - offset))
+            return f"{sql[:match.start()]}LIMIT {count} OFFSET {own_offset + offset}"
+        return f"{sql} LIMIT {self.max_rows + 1} OFFSET {offset}"
+
+    def resume(self, token: str) -> Iterator[Dict[str, Any]]:
+        payload = decode_cursor(token)
+        return self.execute(payload["sql"], payload.get("database"), payload["offset"])
+
+    def execute(self, sql: str, database: Optional[str] = None, offset: int = 0) -> Iterator[Dict[str, Any]]:
+        """
+        Yield {"columns": [...]}, then {"rows": [[...], ...]} per chunk, then
+        {"summary": {...}} with row_count, truncated (None, "rows", "bytes" or
+        "time") and next_cursor.
+        """
+        sql = check_read_only(sql)
+        limited = sql.split(None, 1)[0].lower() in PAGEABLE_STATEMENTS
+        # Later pages only line up with this one when the rows come in a fixed order
+        pageable = limited and _ORDER_BY.search(_top_level(sql)) is not None
+        query = self.page_query(sql, offset) if limited else sql
+        start = time.monotonic()
+        row_count, byte_count, truncated, has_more = 0, 0, None, False
+        # Time spent on the server and reading rows, without the time the consumer holds each chunk
+        busy = 0.0
+
+        with self.mysql_connector.connection(database) as connection:
+            reusable = False
+            try:
+                connection.rollback()
+                with connection.cursor() as setup:
+                    setup.execute(f"SET SESSION MAX_EXECUTION_TIME = {int(self.timeout * 1000)}")
+                connection.start_transaction(readonly=True)
+                cursor = connection.cursor(buffered=False)
+                busy_start = time.perf_counter()
+                cursor.execute(query)
+                busy += time.perf_counter() - busy_start
+                yield {"columns": [column[0] for column in cursor.description or []]}
+
+                exhausted = False
+                while truncated is None and not has_more:
+                    busy_start = time.perf_counter()
+                    rows = cursor.fetchmany(self.chunk_size)
+                    busy += time.perf_counter() - busy_start
+                    if not rows:
+                        exhausted = True
+                        break
+                    chunk = []
+                    for row in rows:
+                        if row_count >= self.max_rows:
+                            if pageable:
+                                has_more = True
+                            else:
+                                truncated = "rows"
+                            break
+                        values = [json_value(v) for v in row]
+                        size = sum(len(str(v)) for v in values)
+                        if row_count and byte_count + size > self.max_bytes:
+                            truncated = "bytes"
+                            break
+                        chunk.append(values)
+                        row_count += 1
+                        byte_count += size
+                    if chunk:
+                        yield {"rows": chunk}
+                    if truncated is None and time.monotonic() - start > self.timeout:
+                        truncated = "time"
+
+                if not exhausted and limited and truncated != "time":
+                    # At most one page plus a row is left; read it so the connection can be reused
+                    cursor.fetchall()
+                    exhausted = True
+                if exhausted:
+                    cursor.close()
+                    connection.rollback()
+                    with connection.cursor() as setup:
+                        setup.execute("SET SESSION MAX_EXECUTION_TIME = DEFAULT")
+                    reusable = True
+            finally:
+                if not reusable:
+                    # Unread rows are left on the wire; close the connection rather than reuse it
+                    self.mysql_connector.pool.discard(connection)
+
+        tracing.observe("sql_execute", busy, source="mysql")
+        next_cursor = None
+        if pageable and (has_more or truncated in ("bytes", "time")):
+            next_cursor = encode_cursor({"sql": sql, "database": database, "offset": offset + row_count,
+                                         "exp": time.time() + Config.RESULT_CURSOR_TTL})
+        yield {"summary": {
+            "row_count": row_count,
+            "offset": offset,
+            "truncated": truncated,
+            "next_cursor": next_cursor,
+            "elapsed_ms": round((time.monotonic() - start) * 1000, 1),
+        }}
@@ -1,34 +1,287 @@
+import re
 import sqlite3
 import json
+import time
+import queue
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Tuple
 from config import Config
 
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+# Quoted text and words of the question, to case-fold only those that are plain English
+_TOKEN = re.compile(r"'[^']*'|\"[^\"]*\"|`[^`]*`|[\w@.\-]*[\w@]")
+
+
+def is_value_word(word: str) -> bool:
+    """Whether a word looks like a value rather than English: a digit or '@', or upper case after the first letter."""
+    return (any(c.isdigit() for c in word) or "@" in word
+            or (any(c.islower() for c in word) and any(c.isupper() for c in word[1:])))
+
+
+def _fold(match: re.Match) -> str:
+    token = match.group(0)
+    if token[0] in "'\"`" or is_value_word(token):
+        return token
+    return token.casefold()
+
+
+def normalize_query(query: str) -> str:
+    """
+    Cache key for a question: whitespace-collapsed, trailing punctuation removed and
+    case-folded except for quoted text and value-like words (e.g. 'Smith', FZwdkpHZ).
+    """
+    return _TOKEN.sub(_fold, re.sub(r"\s+", " ", query).strip().rstrip("?.!;").strip())
+
+
 class SQLiteConnector:
-    def __init__(self):
-        self.conn = None
-        self.cursor = None
+    """
+    Answer cache backed by SQLite.
+
+    Each thread keeps its own persistent WAL-mode connection. Lookups go
+    through a unique index on the normalized query key; entries expire
+    after `ttl` seconds and the least recently used ones are evicted once
+    the cache holds more than `max_entries`. Inserts and access-time
+    updates are handed to a background writer so commits stay off the
+    response path.
+    """
+
+    def __init__(self, path: Optional[str] = None, ttl: Optional[float] = None,
+                 max_entries: Optional[int] = None, async_writes: Optional[bool] = None):
+        self.path = path or Config.SQLITE_CACHE_FILE
+        self.ttl = Config.CACHE_TTL_SECONDS if ttl is None else ttl
+        self.max_entries = max_entries or Config.CACHE_MAX_ENTRIES
+        self.async_writes = Config.CACHE_ASYNC_WRITES if async_writes is None else async_writes
+
+        self._local = threading.local()
+        self._schema_ready = False
+        self._schema_lock = threading.Lock()
+        self._pending: Dict[str, Tuple[str, Any]] = {}
+        self._pending_lock = threading.Lock()
+        self._writes: "queue.Queue" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self._writer_lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0, "writes": 0}
+        self._counters_lock = threading.Lock()
+
+    # Connections
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._create_table(conn)
+        return conn
 
     def connect(self):
-        self.conn = sqlite3.connect(Config.SQLITE_CACHE_FILE)
-        self.cursor = self.conn.cursor()
-        self._create_table()
+        self._connection()
 
-    def _create_table(self):
-        self.cursor.execute('''CREATE TABLE IF NOT EXISTS rag_results
-                               (id INTEGER PRIMARY KEY, query TEXT, answer TEXT, sources TEXT)''')
-        self.conn.commit()
+    @property
+    def conn(self) -> sqlite3.Connection:
+        return self._connection()
+
+    def _create_table(self, conn: sqlite3.Connection):
+        if self._schema_ready:
+            return
+        with self._schema_lock:
+            if self._schema_ready:
+                return
+            conn.execute('''CREATE TABLE IF NOT EXISTS rag_results
+                            (id INTEGER PRIMARY KEY, query TEXT, answer TEXT, sources TEXT,
+                             query_key TEXT, created_at REAL, last_access REAL)''')
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(rag_results)")}
+            if "query_key" not in columns:
+                self._migrate(conn)
+            conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_rag_results_query_key ON rag_results (query_key)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_rag_results_last_access ON rag_results (last_access)")
+            conn.commit()
+            self._schema_ready = True
+
+    def _migrate(self, conn: sqlite3.Connection):
+        """Add cache columns to a legacy rag_results table and drop duplicate queries."""
+        now = time.time()
+        conn.execute("ALTER TABLE rag_results ADD COLUMN query_key TEXT")
+        conn.execute("ALTER TABLE rag_results ADD COLUMN created_at REAL")
+        conn.execute("ALTER TABLE rag_results ADD COLUMN last_access REAL")
+        rows = conn.execute("SELECT id, query FROM rag_results ORDER BY id DESC").fetchall()
+        seen, duplicates = set(), []
+        for row_id, query in rows:
+            key = normalize_query(query or "")
+            if key in seen:
+                duplicates.append((row_id,))
+                continue
+            seen.add(key)
+            conn.execute("UPDATE rag_results SET query_key = ?, created_at = ?, last_access = ? WHERE id = ?",
+                         (key, now, now, row_id))
+        conn.executemany("DELETE FROM rag_results WHERE id = ?", duplicates)
+        logger.info(f"Migrated rag_results cache: {len(seen)} entries kept, {len(duplicates)} duplicates removed")
+
+    # Reads
+
+    def _count(self, name: str, amount: int = 1):
+        with self._counters_lock:
+            self._counters[name] += amount
 
     def get_result(self, query):
-        self.cursor.execute("SELECT answer, sources FROM rag_results WHERE query = ?", (query,))
-        result = self.cursor.fetchone()
-        if result:
-            return result[0], json.loads(result[1])
-        return None, None
+        key = normalize_query(query)
+        with self._pending_lock:
+            pending = self._pending.get(key)
+        if pending is not None:
+            self._count("hits")
+            return pending
+
+        row = self._connection().execute(
+            "SELECT answer, sources, created_at FROM rag_results WHERE query_key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            self._count("misses")
+            return None, None
+        if self.ttl and row[2] is not None and time.time() - row[2] > self.ttl:
+            self._count("expired")
+            self._count("misses")
+            self._submit(("delete", key))
+            return None, None
+
+        self._count("hits")
+        self._submit(("touch", key, time.time()))
+        return row[0], json.loads(row[1])
+
+    def get_results(self, queries: List[str]) -> Dict[str, Tuple[str, Any]]:
+        """
+        Look up many questions at once.
+        Returns {normalized query: (answer, sources)} for the hits.
+        """
+        keys = {normalize_query(q) for q in queries}
+        with self._pending_lock:
+            found = {key: self._pending[key] for key in keys if key in self._pending}
+        missing = [key for key in keys if key not in found]
+        now = time.time()
+        conn = self._connection()
+        for start in range(0, len(missing), 500):
+            chunk = missing[start:start + 500]
+            rows = conn.execute(
+                f"SELECT query_key, answer, sources, created_at FROM rag_results "
+                f"WHERE query_key IN ({','.join('?' * len(chunk))})", chunk
+            ).fetchall()
+            for key, answer, sources, created_at in rows:
+                if self.ttl and created_at is not None and now - created_at > self.ttl:
+                    continue
+                found[key] = (answer, json.loads(sources))
+                self._submit(("touch", key, now))
+        self._count("hits", len(found))
+        self._count("misses", len(keys) - len(found))
+        return found
+
+    # Writes
 
     def store_result(self, query, answer, sources):
-        self.cursor.execute("INSERT INTO rag_results (query, answer, sources) VALUES (?, ?, ?)",
-                            (query, answer, json.dumps(sources)))
-        self.conn.commit()
+        key = normalize_query(query)
+        if self.async_writes:
+            with self._pending_lock:
+                self._pending[key] = (answer, sources)
+        self._submit(("store", key, query, answer, json.dumps(sources), time.time()))
+
+    def _submit(self, operation: tuple):
+        if not self.async_writes:
+            conn = self._connection()
+            self._apply(conn, [operation])
+            return
+        self._ensure_writer()
+        self._writes.put(operation)
+
+    def _ensure_writer(self):
+        if self._writer is None or not self._writer.is_alive():
+            with self._writer_lock:
+                if self._writer is None or not self._writer.is_alive():
+                    self._writer = threading.Thread(target=self._write_loop, name="sqlite-cache-writer", daemon=True)
+                    self._writer.start()
+
+    def _write_loop(self):
+        conn = self._connection()
+        while True:
+            batch = [self._writes.get()]
+            while len(batch) < 256:
+                try:
+                    batch.append(self._writes.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._apply(conn, batch)
+            except Exception as e:
+                logger.error(f"Error writing to SQLite cache: {e}")
+                conn.rollback()
+                # The answers were never stored; stop serving them from memory
+                with self._pending_lock:
+                    for operation in batch:
+                        if operation[0] == "store":
+                            self._pending.pop(operation[1], None)
+            finally:
+                for _ in batch:
+                    self._writes.task_done()
+
+    def _apply(self, conn: sqlite3.Connection, batch: List[tuple]):
+        stored = []
+        for operation in batch:
+            if operation[0] == "store":
+                _, key, query, answer, sources, now = operation
+                conn.execute(
+                    "INSERT INTO rag_results (query, query_key, answer, sources, created_at, last_access) "
+                    "VALUES (?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT(query_key) DO UPDATE SET query = excluded.query, answer = excluded.answer, "
+                    "sources = excluded.sources, created_at = excluded.created_at, last_access = excluded.last_access",
+                    (query, key, answer, sources, now, now),
+                )
+                stored.append(key)
+            elif operation[0] == "touch":
+                conn.execute("UPDATE rag_results SET last_access = ? WHERE query_key = ?", (operation[2], operation[1]))
+            elif operation[0] == "delete":
+                conn.execute("DELETE FROM rag_results WHERE query_key = ?", (operation[1],))
+        if stored:
+            self._evict(conn)
+        conn.commit()
+        if stored:
+            self._count("writes", len(stored))
+            with self._pending_lock:
+                for key in stored:
+                    self._pending.pop(key, None)
+
+    def _evict(self, conn: sqlite3.Connection):
+        evicted = 0
+        if self.ttl:
+            evicted += conn.execute("DELETE FROM rag_results WHERE created_at < ?", (time.time() - self.ttl,)).rowcount
+        excess = conn.execute("SELECT COUNT(*) FROM rag_results").fetchone()[0] - self.max_entries
+        if excess > 0:
+            evicted += conn.execute(
+                "DELETE FROM rag_results WHERE id IN "
+                "(SELECT id FROM rag_results ORDER BY last_access ASC LIMIT ?)", (excess,)
+            ).rowcount
+        if evicted:
+            self._count("evictions", evicted)
+
+    def flush(self):
+        """Block until every queued write has been committed."""
+        if self.async_writes and self._writer is not None:
+            self._writes.join()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._counters_lock:
+            stats = dict(self._counters)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        stats["pending_writes"] = self._writes.qsize()
+        return stats
 
     def close(self):
-        if self.conn:
-            self.conn.close()
\ No newline at end of file
+        """Flush pending writes and close this thread's connection."""
+        self.flush()
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
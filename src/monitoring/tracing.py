@@ -0,0 +1,152 @@
+import os
+import sys
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+project_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.append(project_dir)
+from config import Config
+
+STAGE_HISTOGRAM = "rag_stage_duration_seconds"
+STAGE_ERRORS = "rag_stage_errors_total"
+DESCRIPTIONS = {
+    STAGE_HISTOGRAM: "Time spent in each pipeline stage.",
+    STAGE_ERRORS: "Pipeline stages that raised.",
+    "rag_cache_lookups_total": "Answer cache lookups by cache layer and result.",
+    "rag_requests_total": "Requests by route and status.",
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+_lock = threading.Lock()
+_histograms: Dict[Tuple[str, Labels], Dict[str, Any]] = {}
+_counters: Dict[Tuple[str, Labels], float] = {}
+_current_trace: contextvars.ContextVar[Optional["Trace"]] = contextvars.ContextVar("trace", default=None)
+
+
+def _labels(labels: Dict[str, Any]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items() if v is not None))
+
+
+class Trace:
+    """Spans recorded while handling one request, for the debug timing breakdown."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float, labels: Dict[str, Any]):
+        with self._lock:
+            self.spans.append(dict(labels, stage=stage, ms=round(seconds * 1000, 3)))
+
+    def breakdown(self) -> Dict[str, Any]:
+        """
+        Total wall time and the time per stage, summed over calls. Stages nest
+        (catalog_sync contains extract and embed), so they need not add up to the total.
+        """
+        stages: Dict[str, Dict[str, float]] = {}
+        with self._lock:
+            for span in self.spans:
+                entry = stages.setdefault(span["stage"], {"ms": 0.0, "calls": 0})
+                entry["ms"] = round(entry["ms"] + span["ms"], 3)
+                entry["calls"] += 1
+        return {"total_ms": round((time.perf_counter() - self.started) * 1000, 3), "stages": stages}
+
+
+def observe(stage: str, seconds: float, **labels):
+    """Record a stage duration in the stage histogram and in the current request trace."""
+    key = (STAGE_HISTOGRAM, _labels(dict(labels, stage=stage)))
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = {"buckets": [0] * len(Config.TRACE_BUCKETS), "sum": 0.0, "count": 0}
+        for i, bound in enumerate(Config.TRACE_BUCKETS):
+            if seconds <= bound:
+                histogram["buckets"][i] += 1
+                break
+        histogram["sum"] += seconds
+        histogram["count"] += 1
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add(stage, seconds, labels)
+
+
+def count(name: str, amount: float = 1, **labels):
+    key = (name, _labels(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+@contextmanager
+def span(stage: str, **labels) -> Iterator[None]:
+    """Time the block as `stage`; exceptions are counted and re-raised."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        count(STAGE_ERRORS, stage=stage)
+        raise
+    finally:
+        observe(stage, time.perf_counter() - start, **labels)
+
+
+@contextmanager
+def trace() -> Iterator[Trace]:
+    """Collect the spans of the enclosed request, including those of threads started with its context."""
+    current = Trace()
+    token = _current_trace.set(current)
+    try:
+        yield current
+    finally:
+        _current_trace.reset(token)
+
+
+def _format_labels(labels: Labels, extra: Labels = ()) -> str:
+    pairs = labels + extra
+    if not pairs:
+        return ""
+    escaped = (v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _header(lines: List[str], name: str, kind: str):
+    lines.append(f"# HELP {name} {DESCRIPTIONS.get(name, name)}")
+    lines.append(f"# TYPE {name} {kind}")
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    with _lock:
+        histograms = {key: {"buckets": list(h["buckets"]), "sum": h["sum"], "count": h["count"]}
+                      for key, h in _histograms.items()}
+        counters = dict(_counters)
+
+    lines: List[str] = []
+    seen = set()
+    for (name, labels), histogram in sorted(histograms.items()):
+        if name not in seen:
+            _header(lines, name, "histogram")
+            seen.add(name)
+        cumulative = 0
+        for bound, hits in zip(Config.TRACE_BUCKETS, histogram["buckets"]):
+            cumulative += hits
+            lines.append(f"{name}_bucket{_format_labels(labels, (('le', repr(float(bound))),))} {cumulative}")
+        lines.append(f"{name}_bucket{_format_labels(labels, (('le', '+Inf'),))} {histogram['count']}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {histogram['sum']}")
+        lines.append(f"{name}_count{_format_labels(labels)} {histogram['count']}")
+    for (name, labels), value in sorted(counters.items()):
+        if name not in seen:
+            _header(lines, name, "counter")
+            seen.add(name)
+        lines.append(f"{name}{_format_labels(labels)} {value:g}")
+    return "\n".join(lines) + "\n"
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
@@ -1,17 +1,34 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
 import os
 import sys
+import json
 import logging
 
 src_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 sys.path.append(src_dir)
-from src.agents.orchestrator_agent import OrchestratorAgent
+from data_sources.sql_executor import ResultCursorError
+from monitoring import tracing
+
+project_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.append(project_dir)
+from config import Config
+from src.startup import StartupError
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 query_bp = Blueprint('query_route', __name__)
-orchestrator = OrchestratorAgent()
+
+def services():
+    return current_app.extensions['rag_services']
+
+def get_orchestrator():
+    """The app's OrchestratorAgent, once warm-up has built it (StartupError otherwise)."""
+    return services().orchestrator()
+
+@query_bp.errorhandler(StartupError)
+def service_unavailable(e):
+    return jsonify({'error': str(e)}), 503
 
 @query_bp.route('/query', methods=['POST'])
 def process_query():
@@ -20,14 +37,143 @@ def process_query():
         return jsonify({'error': 'No query provided'}), 400
 
     query = data['query']
+    orchestrator = get_orchestrator()
+    with tracing.trace() as request_trace:
+        try:
+            print(f"Processing query: {query}")
+            result, query_type, sources = orchestrator.orchestrate_query(query)
+            # return jsonify(result), 200
+            body, status = {'result': result, 'query_type': query_type, 'sources': sources}, 200
+        except Exception as e:
+            body, status = {'error': str(e)}, 500
+    tracing.count('rag_requests_total', route='/query', status=status)
+    if wants_timings(request.headers.get(Config.TIMING_HEADER) if Config.TIMING_HEADER else None):
+        body['timings'] = request_trace.breakdown()
+    return jsonify(body), status
+
+def wants_timings(header_value) -> bool:
+    """Whether the debug timing header asks for the per-request stage breakdown."""
+    return (header_value or "").strip().lower() in ("1", "true", "yes", "on")
+
+def sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+@query_bp.route('/query/stream', methods=['POST'])
+def stream_query():
+    data = request.json
+    if not data or 'query' not in data:
+        return jsonify({'error': 'No query provided'}), 400
+
+    query = data['query']
+    execute = bool(data.get('execute', False))
+    orchestrator = get_orchestrator()
+
+    def events():
+        try:
+            for event, payload in orchestrator.stream_query(query, execute=execute):
+                yield sse_event(event, payload)
+        except Exception as e:
+            logger.error(f"Error streaming query: {str(e)}")
+            yield sse_event('error', {'error': str(e)})
+        yield sse_event('done', {})
+
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@query_bp.route('/query/batch', methods=['POST'])
+def process_batch():
+    data = request.get_json(silent=True) or {}
+    queries = data.get('queries')
+    if not isinstance(queries, list) or not queries or not all(isinstance(q, str) for q in queries):
+        return jsonify({'error': 'No queries provided'}), 400
+    if len(queries) > Config.BATCH_MAX_QUERIES:
+        return jsonify({'error': f'At most {Config.BATCH_MAX_QUERIES} queries per batch'}), 400
+    orchestrator = get_orchestrator()
+
+    def lines():
+        try:
+            for entry in orchestrator.orchestrate_batch(queries):
+                yield json.dumps(entry, default=str) + "\n"
+        except Exception as e:
+            logger.error(f"Error processing batch: {str(e)}")
+            yield json.dumps({'error': str(e)}) + "\n"
+
+    return Response(stream_with_context(lines()), mimetype='application/x-ndjson')
+
+@query_bp.route('/query/execute', methods=['POST'])
+def execute_query():
+    data = request.get_json(silent=True) or {}
+    orchestrator = get_orchestrator()
+    if 'cursor' in data:
+        try:
+            results = orchestrator.resume_sql(data['cursor'])
+            first = [next(results)]
+        except ResultCursorError as e:
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    elif 'query' in data:
+        try:
+            result, query_type, sources = orchestrator.orchestrate_query(data['query'])
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+        first = [{'result': result, 'query_type': query_type, 'sources': sources}]
+        results = orchestrator.execute_sql(result, sources, query_type) if query_type in ('sql', 'csv') else iter(())
+    else:
+        return jsonify({'error': 'No query or cursor provided'}), 400
+
+    def lines():
+        try:
+            for item in first:
+                yield json.dumps(item, default=str) + "\n"
+            for item in results:
+                yield json.dumps(item, default=str) + "\n"
+        except Exception as e:
+            logger.error(f"Error executing query: {str(e)}")
+            yield json.dumps({'error': str(e)}) + "\n"
+
+    return Response(stream_with_context(lines()), mimetype='application/x-ndjson')
+
+@query_bp.route('/catalog/refresh', methods=['POST'])
+def refresh_catalog():
+    force = bool((request.get_json(silent=True) or {}).get('force', False))
+    orchestrator = get_orchestrator()
     try:
-        print(f"Processing query: {query}")
-        result, query_type, sources = orchestrator.orchestrate_query(query)
-        # return jsonify(result), 200
-        return jsonify({'result': result, 'query_type': query_type, 'sources': sources}), 200
+        report = orchestrator.index_lifecycle.run(force=force)
+        return jsonify({'result': report}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@query_bp.route('/index/rebuild', methods=['POST'])
+def rebuild_index():
+    force = bool((request.get_json(silent=True) or {}).get('force', True))
+    job = get_orchestrator().index_lifecycle.rebuild(force=force)
+    return jsonify({'result': job}), 202
+
+@query_bp.route('/index/status', methods=['GET'])
+def index_status():
+    return jsonify({'result': get_orchestrator().index_lifecycle.status()}), 200
+
+@query_bp.route('/index/jobs/<int:job_id>', methods=['GET'])
+def index_job(job_id):
+    job = get_orchestrator().index_lifecycle.job(job_id)
+    if job is None:
+        return jsonify({'error': f'Unknown job {job_id}'}), 404
+    return jsonify({'result': job}), 200
+
+@query_bp.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    return jsonify({'result': get_orchestrator().rag_agent.cache_stats()}), 200
+
+@query_bp.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(tracing.render(), mimetype='text/plain; version=0.0.4')
+
 @query_bp.route('/health', methods=['GET'])
 def health_check():
-    return jsonify({'status': 'healthy'}), 200
\ No newline at end of file
+    return jsonify({'status': 'healthy'}), 200
+
+@query_bp.route('/ready', methods=['GET'])
+def ready_check():
+    readiness = services().readiness()
+    return jsonify(readiness), 200 if readiness['ready'] else 503
\ No newline at end of file
@@ -0,0 +1,139 @@
+import os
+import sys
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from config import Config
+
+src_dir = os.path.abspath(os.path.dirname(__file__))
+sys.path.append(src_dir)
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+class StartupError(Exception):
+    """The agents are not available: warm-up is still running or has failed."""
+
+
+def _build_orchestrator():
+    # Imports langchain, google.generativeai, faiss, sentence_transformers and mysql.connector
+    from src.agents.orchestrator_agent import OrchestratorAgent
+    return OrchestratorAgent()
+
+
+class AppServices:
+    """
+    The agents behind the routes, built after the app is created rather than
+    when its modules are imported.
+
+    warm_up() runs the startup phases in order: build the OrchestratorAgent
+    (importing the heavy dependencies), load the embedding model, load the
+    FAISS indexes and open MySQL connections. Each phase is reported by
+    readiness(); the service is ready once the required phases succeeded.
+    The optional ones only log a warning when they fail, since the index may
+    not have been built yet and MySQL may come up later.
+    """
+
+    REQUIRED_PHASES = ("agents", "embedding_model")
+    PHASES = REQUIRED_PHASES + ("faiss_index", "mysql_pool")
+
+    def __init__(self, build: Optional[Callable[[], Any]] = None):
+        self._build = build or _build_orchestrator
+        self._orchestrator = None
+        self._finished = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._started = False
+        self.phases: Dict[str, Dict[str, Any]] = {name: {"status": "pending"} for name in self.PHASES}
+
+    def start(self, background: bool = True):
+        """Run warm_up() on a background thread, or before returning. Later calls do nothing."""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        if not background:
+            self.warm_up()
+            return
+        self._thread = threading.Thread(target=self.warm_up, name="warm-up", daemon=True)
+        self._thread.start()
+
+    def _run_phase(self, name: str, fn: Callable[[], Optional[str]]) -> bool:
+        with self._lock:
+            self.phases[name] = {"status": "running"}
+        start = time.perf_counter()
+        try:
+            status = fn() or "done"
+            error = None
+        except Exception as e:
+            status, error = "failed", str(e)
+            log = logger.error if name in self.REQUIRED_PHASES else logger.warning
+            log(f"Startup phase '{name}' failed: {e}")
+        phase = {"status": status, "seconds": round(time.perf_counter() - start, 3)}
+        if error:
+            phase["error"] = error
+        with self._lock:
+            self.phases[name] = phase
+        return status != "failed"
+
+    def warm_up(self):
+        try:
+            if not self._run_phase("agents", self._build_agents):
+                return
+            self._run_phase("embedding_model", self._load_embedding_model)
+            self._run_phase("faiss_index", self._load_indexes)
+            self._run_phase("mysql_pool", self._fill_pool)
+            lifecycle = getattr(self._orchestrator, "index_lifecycle", None)
+            if lifecycle is not None:
+                lifecycle.start()
+            logger.info(f"Warm-up finished: {self.readiness()}")
+        finally:
+            self._finished.set()
+
+    def _build_agents(self):
+        self._orchestrator = self._build()
+
+    def _load_embedding_model(self):
+        from data_sources import embedding_models
+        embedding_models.warm_up(freeze=Config.EMBEDDING_PRELOAD_FREEZE)
+
+    def _load_indexes(self) -> Optional[str]:
+        connectors = [getattr(self._orchestrator, "faiss_connector", None),
+                      getattr(self._orchestrator, "column_connector", None)]
+        loaded = 0
+        for connector in filter(None, connectors):
+            if connector.index_exists():
+                connector.load_faiss_index()
+                loaded += 1
+        # Without an index it is built on the first query
+        return None if loaded else "skipped"
+
+    def _fill_pool(self) -> Optional[str]:
+        connector = getattr(self._orchestrator, "mysql_connector", None)
+        if connector is None or not Config.MYSQL_HOST or Config.MYSQL_POOL_PREFILL <= 0:
+            return "skipped"
+        connector.pool.fill(Config.MYSQL_POOL_PREFILL)
+        return None
+
+    @property
+    def ready(self) -> bool:
+        with self._lock:
+            return self._finished.is_set() and all(
+                self.phases[name]["status"] == "done" for name in self.REQUIRED_PHASES)
+
+    def readiness(self) -> Dict[str, Any]:
+        ready = self.ready
+        with self._lock:
+            phases = {name: dict(phase) for name, phase in self.phases.items()}
+        return {"ready": ready, "finished": self._finished.is_set(), "phases": phases}
+
+    def orchestrator(self, timeout: Optional[float] = None):
+        """The OrchestratorAgent, waiting up to `timeout` (default STARTUP_WAIT_TIMEOUT) for warm-up."""
+        if not self._finished.wait(Config.STARTUP_WAIT_TIMEOUT if timeout is None else timeout):
+            raise StartupError("The service is still starting up")
+        if self._orchestrator is None:
+            raise StartupError(f"Startup failed: {self.phases['agents'].get('error')}")
+        return self._orchestrator
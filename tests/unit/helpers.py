@@ -0,0 +1,35 @@
+"""Fakes shared by the tests that build real FAISS indexes."""
+import os
+import zlib
+
+import numpy as np
+
+from src.data_sources import faiss_connector
+from src.data_sources.faiss_connector import FAISSConnector
+
+
+class HashModel:
+    """Deterministic embeddings seeded by the crc32 of each text; counts the texts encoded."""
+
+    def __init__(self):
+        self.encoded = 0
+
+    def encode(self, texts):
+        self.encoded += len(texts)
+        return np.stack([np.random.default_rng(zlib.crc32(t.encode())).random(8) for t in texts]).astype("float32")
+
+
+def register_model(test, name, model=None):
+    """Register `model` (a new HashModel by default) under `name` for the duration of `test`."""
+    model = model if model is not None else HashModel()
+    faiss_connector.embedding_models.register_model(name, model)
+    test.addCleanup(faiss_connector.embedding_models.unload_model, name)
+    return model
+
+
+def make_connector(directory, model_name, index_name="index.faiss", data_name="data.json"):
+    """FAISSConnector over files in `directory`, without the persistent embedding cache."""
+    connector = FAISSConnector(os.path.join(directory, index_name), os.path.join(directory, data_name))
+    connector.embedding_cache_file = None
+    connector.model_name = model_name
+    return connector
@@ -0,0 +1,83 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from config import Config
+from src.agents.rag_agent import RAGAgent
+from src.data_sources.sqlite_connector import SQLiteConnector
+from agents.async_stages import StageTimeoutError
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeAsyncModel:
+    def __init__(self, delay):
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.calls = 0
+
+    async def generate_content_async(self, prompt):
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(self.delay)
+        self.in_flight -= 1
+        return FakeResponse('{"type": null, "query": null}')
+
+
+class TestAsyncPipeline(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.agent.sqlite_connector.close()
+        self.tmp.cleanup()
+
+    def _agent(self, delay):
+        with patch.object(RAGAgent, "_init_gemini", lambda self: FakeAsyncModel(delay)), \
+                patch.object(Config, "SEMANTIC_CACHE", False), patch.object(Config, "QUERY_TEMPLATES", False):
+            self.agent = RAGAgent(faiss_connector=object())
+        self.agent.sqlite_connector = SQLiteConnector(os.path.join(self.tmp.name, "cache.db"), async_writes=False)
+        self.agent.retriever = lambda query: []
+        return self.agent
+
+    @patch.object(Config, "LLM_MAX_CONCURRENCY", 2)
+    def test_llm_calls_are_bounded_and_answers_cached(self):
+        agent = self._agent(delay=0.02)
+
+        async def run():
+            return await asyncio.gather(*(agent.run_rag_pipeline_async(f"question {i}") for i in range(6)))
+
+        results = asyncio.run(run())
+        self.assertEqual(len(results), 6)
+        self.assertEqual(agent.model.max_in_flight, 2)
+        self.assertEqual(agent.cached_answer("question 3")[0], '{"type": null, "query": null}')
+
+    def test_concurrent_duplicates_share_one_llm_call(self):
+        agent = self._agent(delay=0.05)
+
+        async def run():
+            return await asyncio.gather(*(agent.run_rag_pipeline_async(q)
+                                          for q in ["Top customers?", "top customers", "TOP  customers."] * 2))
+
+        results = asyncio.run(run())
+        self.assertEqual(agent.model.calls, 1)
+        self.assertEqual(results, [results[0]] * 6)
+        self.assertEqual(agent.single_flight.stats()["shared"], 5)
+
+    @patch.object(Config, "LLM_STAGE_TIMEOUT", 0.01)
+    def test_slow_llm_raises_stage_timeout(self):
+        agent = self._agent(delay=1)
+        with self.assertRaises(StageTimeoutError) as raised:
+            asyncio.run(agent.rag_function_async("slow question"))
+        self.assertEqual(raised.exception.stage, "llm")
+
+
+if __name__ == "__main__":
+    unittest.main()
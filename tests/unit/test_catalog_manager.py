@@ -0,0 +1,101 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from src.data_sources.catalog_manager import CatalogManager
+from helpers import make_connector, register_model
+
+
+class FakeMySQL:
+    def __init__(self):
+        self.fingerprints = {("db", "users"): "1", ("db", "orders"): "1"}
+        self.extracted = []
+
+    def get_table_fingerprints(self):
+        return dict(self.fingerprints)
+
+    def extract_tables(self, tables):
+        self.extracted.extend(table for _, table in tables)
+        return [{"database": db, "table": table, "schema": [{"Field": f"{table}_id", "Type": "int"}],
+                 "sample_data": []} for db, table in tables]
+
+
+class FakeCSV:
+    csv_directory = "data"
+
+    def get_file_fingerprints(self):
+        return {"sales.csv": "1"}
+
+    def extract_files(self, filenames):
+        return [{"database": self.csv_directory, "table": filename, "schema": ["date"], "sample_data": []}
+                for filename in filenames]
+
+
+class TestCatalogManager(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.faiss = make_connector(self.tmp.name, "fake-catalog-model")
+        self.model = register_model(self, self.faiss.model_name)
+        self.mysql = FakeMySQL()
+        self.catalog = CatalogManager(self.mysql, FakeCSV(), self.faiss,
+                                      state_file=os.path.join(self.tmp.name, "state.json"))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_sync_only_reembeds_changed_entries(self):
+        self.assertEqual(self.catalog.sync()["added"], 3)
+        self.assertEqual(self.model.encoded, 3)
+
+        self.mysql.fingerprints[("db", "orders")] = "2"
+        del self.mysql.fingerprints[("db", "users")]
+        report = self.catalog.sync()
+
+        self.assertEqual(report, {"added": 0, "changed": 1, "removed": 1, "unchanged": 1})
+        self.assertEqual(self.model.encoded, 4)
+        self.assertEqual(self.faiss.index.ntotal, 2)
+        tables = {r["table"] for r in self.faiss.search_faiss("orders", k=5)}
+        self.assertEqual(tables, {"orders", "sales.csv"})
+
+    def test_column_index_follows_table_changes(self):
+        columns = make_connector(self.tmp.name, self.faiss.model_name, "columns.faiss", "columns.json")
+        self.catalog.column_connector = columns
+
+        self.catalog.sync()
+        self.assertEqual(columns.index.ntotal, 3)
+
+        del self.mysql.fingerprints[("db", "users")]
+        self.catalog.sync()
+        self.assertEqual(sorted(r["column"] for r in columns.records.values()), ["date", "orders_id"])
+        self.assertEqual(columns.index.ntotal, 2)
+
+    def test_unreachable_source_keeps_the_catalog(self):
+        self.catalog.sync()
+        with mock.patch.object(self.mysql, "get_table_fingerprints", side_effect=OSError("server down")):
+            with self.assertRaises(OSError):
+                self.catalog.sync()
+        self.assertEqual({r["table"] for r in self.faiss.search_faiss("users", k=5)}, {"users", "orders", "sales.csv"})
+        self.assertEqual(self.catalog.fingerprint("db", "users"), "1")
+        reloaded = CatalogManager(self.mysql, FakeCSV(), self.faiss, state_file=self.catalog.state_file)
+        self.assertEqual(reloaded.fingerprint("db", "users"), "1")
+
+    def test_fingerprints_follow_syncs_in_other_processes(self):
+        self.catalog.sync()
+        other_worker = CatalogManager(self.mysql, FakeCSV(), self.faiss, state_file=self.catalog.state_file)
+        self.assertEqual(other_worker.fingerprint("db", "orders"), "1")
+
+        self.mysql.fingerprints[("db", "orders")] = "2"
+        self.catalog.sync()
+        self.assertEqual(other_worker.fingerprint("db", "orders"), "2")
+
+    def test_unchanged_sync_is_a_no_op(self):
+        self.catalog.sync()
+        self.mysql.extracted.clear()
+        report = self.catalog.sync()
+        self.assertEqual(report["unchanged"], 3)
+        self.assertEqual(self.mysql.extracted, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import unittest
+
+from langchain.schema import Document
+
+from src.agents.context_builder import ContextBuilder, estimate_tokens, render_schema, render_table
+
+USERS = {
+    "database": "shop", "table": "users",
+    "schema": [{"Field": "id", "Type": "int", "Key": "PRI"}, {"Field": "username", "Type": "varchar(50)"},
+               {"Field": "metadata", "Type": "json"}],
+    "sample_data": [{"id": i, "username": "same", "metadata": {"tags": ["x"] * 100}} for i in range(10)],
+}
+SALES = {"database": "data", "table": "sales.csv", "schema": ["date", "quantity"],
+         "sample_data": [["2023-01-01", "5"], ["2023-01-02", "5"]]}
+
+
+def doc(record, score):
+    return Document(page_content=render_table(record),
+                    metadata={"score": score, "schema": record["schema"], "table": record["table"],
+                              "database": record["database"]})
+
+
+class TestContextBuilder(unittest.TestCase):
+    def test_render_table_puts_schema_first_and_compacts_samples(self):
+        text = render_table(USERS, max_value_chars=20, max_values=3)
+        lines = text.splitlines()
+        self.assertEqual(lines[:2], ["MySQL table: shop.users", "Columns: id int PK, username varchar(50), metadata json"])
+        self.assertIn("  id: 0 | 1 | 2", lines)
+        self.assertIn("  username: same", lines)
+        self.assertIn('  metadata: {"tags": ["x", "x...', lines)
+        self.assertTrue(render_table(SALES).startswith("CSV table: sales (file: sales.csv)\nColumns: date, quantity"))
+
+    def test_budget_orders_by_score_then_reduces_and_drops(self):
+        users, sales = doc(USERS, 0.4), doc(SALES, 0.9)
+        budget = estimate_tokens(sales.page_content) + estimate_tokens(render_schema(USERS)) + 1
+        context, report = ContextBuilder(token_budget=budget).build([users, sales])
+
+        self.assertTrue(context.startswith("CSV table: sales"))
+        self.assertTrue(context.endswith("Columns: id int PK, username varchar(50), metadata json"))
+        self.assertEqual((report["tables"], report["tables_reduced"], report["tables_dropped"]), (2, 1, 0))
+        self.assertLessEqual(report["context_tokens"], budget)
+
+        _, report = ContextBuilder(token_budget=5).build([users, sales])
+        self.assertEqual(report["tables_dropped"], 2)
+
+    def test_separators_count_against_budget(self):
+        users, sales = doc(USERS, 0.4), doc(SALES, 0.9)
+        budget = estimate_tokens(sales.page_content) + estimate_tokens(render_schema(USERS))
+        context, report = ContextBuilder(token_budget=budget).build([users, sales])
+        self.assertEqual((report["tables"], report["tables_dropped"]), (1, 1))
+        self.assertEqual(report["context_tokens"], estimate_tokens(context))
+
+    def test_later_smaller_tables_fill_the_remaining_budget(self):
+        big = dict(USERS, schema=[{"Field": f"column_{i}", "Type": "int"} for i in range(40)])
+        budget = estimate_tokens(render_table(SALES)) + 1
+        context, report = ContextBuilder(token_budget=budget).build([doc(big, 0.9), doc(SALES, 0.4)])
+        self.assertTrue(context.startswith("CSV table: sales"))
+        self.assertEqual((report["tables"], report["tables_dropped"]), (1, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from src.data_sources import csv_profiler
+from src.data_sources.csv_profiler import CSVProfileCache, HyperLogLog, profile_csv
+
+
+class TestCSVProfiler(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "sales.csv")
+        with open(self.path, "w") as f:
+            f.write("id,price,day,region,note\n")
+            for i in range(1, 1001):
+                price = "" if i % 100 == 0 else f"{i * 1.5}"
+                f.write(f"{i},{price},2024-01-{i % 28 + 1:02d},r{i % 7},{'x' * 100 if i == 500 else 'ok'}\n")
+            f.write("1001,2.5,someday,r1,ok\n")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_profile_in_chunks(self):
+        profile = profile_csv(self.path, chunk_rows=64, sample_rows=5)
+        columns = profile["columns"]
+        self.assertEqual(profile["row_count"], 1001)
+        self.assertEqual(len(profile["sample_data"]), 5)
+
+        self.assertEqual(columns["id"], {"type": "integer", "nulls": 0, "min": 1, "max": 1001,
+                                         "distinct": columns["id"]["distinct"]})
+        self.assertLess(abs(columns["id"]["distinct"] - 1001), 50)
+        self.assertEqual((columns["price"]["type"], columns["price"]["nulls"]), ("float", 10))
+        self.assertEqual((columns["price"]["min"], columns["price"]["max"]), (1.5, 1498.5))
+        # Widened to text by the last row, bounds become lexicographic
+        self.assertEqual(columns["day"]["type"], "text")
+        self.assertEqual(columns["day"]["max"], "someday")
+        self.assertEqual(columns["region"]["distinct"], 7)
+        self.assertEqual(len(columns["note"]["max"]), csv_profiler.MAX_TEXT_BOUND_CHARS)
+
+    def test_hyperloglog_accuracy(self):
+        sketch = HyperLogLog(12)
+        sketch.add([f"value-{i}" for i in range(50000)])
+        self.assertLess(abs(sketch.count() - 50000) / 50000, 0.05)
+
+    def test_cache_skips_unchanged_files(self):
+        cache = CSVProfileCache(self.tmp.name, cache_file=os.path.join(self.tmp.name, "profiles.json"))
+        self.assertEqual(cache.profiles({"sales.csv": "1"})["sales.csv"]["row_count"], 1001)
+
+        reloaded = CSVProfileCache(self.tmp.name, cache_file=cache.cache_file)
+        with mock.patch.object(csv_profiler, "profile_csv", return_value={"row_count": 0}) as profile:
+            self.assertEqual(reloaded.profiles({"sales.csv": "1"})["sales.csv"]["row_count"], 1001)
+            profile.assert_not_called()
+            reloaded.profiles({"sales.csv": "2"})
+            profile.assert_called_once()
+
+    def test_parallel_profiling_does_not_fork(self):
+        with open(os.path.join(self.tmp.name, "other.csv"), "w") as f:
+            f.write("a\n1\n2\n")
+        cache = CSVProfileCache(self.tmp.name, cache_file="", max_workers=2)
+        with mock.patch.object(csv_profiler.multiprocessing, "get_context",
+                               wraps=csv_profiler.multiprocessing.get_context) as get_context:
+            profiles = cache.profiles({"sales.csv": "1", "other.csv": "1"})
+        self.assertNotEqual(get_context.call_args.args[0], "fork")
+        self.assertEqual((profiles["sales.csv"]["row_count"], profiles["other.csv"]["row_count"]), (1001, 2))
+
+    def test_incremental_lookups_keep_other_profiles(self):
+        with open(os.path.join(self.tmp.name, "other.csv"), "w") as f:
+            f.write("a\n1\n")
+        cache = CSVProfileCache(self.tmp.name, cache_file=os.path.join(self.tmp.name, "profiles.json"), max_workers=1)
+        cache.profiles({"sales.csv": "1", "other.csv": "1"}, prune=True)
+
+        with mock.patch.object(csv_profiler, "profile_csv", return_value={"row_count": 0}) as profile:
+            cache.profiles({"other.csv": "2"})
+            self.assertEqual(cache.profiles({"sales.csv": "1"})["sales.csv"]["row_count"], 1001)
+            profile.assert_called_once()
+
+            reloaded = CSVProfileCache(self.tmp.name, cache_file=cache.cache_file)
+            self.assertEqual(set(reloaded._load()), {"sales.csv", "other.csv"})
+            reloaded.profiles({"sales.csv": "1"}, prune=True)
+            self.assertEqual(set(CSVProfileCache(self.tmp.name, cache_file=cache.cache_file)._load()), {"sales.csv"})
+
+
+if __name__ == "__main__":
+    unittest.main()
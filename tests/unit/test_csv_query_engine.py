@@ -0,0 +1,80 @@
+import os
+import sqlite3
+import tempfile
+import time
+import unittest
+
+from unittest import mock
+
+from src.data_sources import csv_query_engine
+from src.data_sources.csv_query_engine import CSVQueryEngine, csv_table_name
+from data_sources.sql_executor import SQLRejectedError
+
+
+def rows(events):
+    return [row for event in events if "rows" in event for row in event["rows"]]
+
+
+class TestCSVQueryEngine(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "sales.csv")
+        self._write("date,product_id,quantity,price\n2023-01-01,1,5,9.5\n2023-01-02,2,,3\n2023-01-02,1,7,9.5\n")
+        self.engine = CSVQueryEngine(self.tmp.name, encoding="utf-8", max_rows=100, timeout=5, chunk_size=2)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _write(self, text):
+        with open(self.path, "w") as f:
+            f.write(text)
+
+    def test_typed_tables_and_aggregates(self):
+        self.assertEqual(csv_table_name("2023 sales-report.csv"), "t_2023_sales_report")
+        result = rows(self.engine.execute(
+            "SELECT product_id, SUM(quantity) FROM sales WHERE price > 5 GROUP BY product_id"))
+        self.assertEqual(result, [[1, 12]])
+        self.assertEqual(self.engine.tables["sales.csv"]["columns"],
+                         {"date": "TEXT", "product_id": "INTEGER", "quantity": "INTEGER", "price": "REAL"})
+        self.assertEqual(rows(self.engine.execute("SELECT COUNT(*) FROM sales WHERE quantity IS NULL")), [[1]])
+
+    def test_reloads_when_file_changes(self):
+        self.assertEqual(rows(self.engine.execute("SELECT COUNT(*) FROM sales")), [[3]])
+        self._write("date,product_id,quantity,price\n2023-02-01,3,1,1\n")
+        os.utime(self.path, ns=(time.time_ns(), time.time_ns() + 10 ** 9))
+        self.assertEqual(rows(self.engine.execute("SELECT COUNT(*) FROM sales")), [[1]])
+
+    def test_only_reads_are_allowed(self):
+        for sql in ("DELETE FROM sales", "ATTACH DATABASE '/tmp/x.db' AS x", "SELECT 1; DROP TABLE sales"):
+            with self.assertRaises(SQLRejectedError):
+                list(self.engine.execute(sql))
+        self.engine.refresh()
+        self.engine.conn.set_authorizer(self.engine._authorize)
+        with self.assertRaises(sqlite3.DatabaseError):
+            self.engine.conn.execute("DELETE FROM sales")
+        self.engine.conn.set_authorizer(None)
+        self.assertEqual(rows(self.engine.execute("SELECT COUNT(*) FROM sales")), [[3]])
+
+    def test_values_outside_the_sample_types_do_not_fail_the_load(self):
+        with open(os.path.join(self.tmp.name, "ids.csv"), "w") as f:
+            f.write("id,code\n1,7\n99999999999999999999,8\n")
+        with mock.patch.object(csv_query_engine, "TYPE_SAMPLE_ROWS", 2):
+            self._write("date,product_id,quantity,price\n2023-01-01,1,5,9.5\n2023-01-02,2,1,3\n"
+                        "2023-01-03,18446744073709551616,n/a,4\n")
+            result = rows(self.engine.execute("SELECT product_id, quantity FROM sales ORDER BY date"))
+        self.assertEqual(result, [[1, 5], [2, 1], [1.8446744073709552e19, "n/a"]])
+        self.assertEqual(self.engine.tables["sales.csv"]["columns"]["product_id"], "INTEGER")
+        self.assertEqual(self.engine.tables["ids.csv"]["columns"], {"id": "REAL", "code": "INTEGER"})
+        self.assertEqual(self.engine.tables["ids.csv"]["rows"], 2)
+
+    def test_a_failing_file_keeps_its_previous_table(self):
+        self.assertEqual(rows(self.engine.execute("SELECT COUNT(*) FROM sales")), [[3]])
+        self._write("date,product_id,quantity,price\n2023-02-01,3,1,1\n")
+        os.utime(self.path, ns=(time.time_ns(), time.time_ns() + 10 ** 9))
+        with mock.patch.object(csv_query_engine, "_convert", side_effect=OverflowError("too big")):
+            self.assertEqual(rows(self.engine.execute("SELECT COUNT(*) FROM sales")), [[3]])
+        self.assertEqual(rows(self.engine.execute("SELECT COUNT(*) FROM sales")), [[1]])
+
+
+if __name__ == "__main__":
+    unittest.main()
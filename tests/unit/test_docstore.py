@@ -0,0 +1,57 @@
+import os
+import tempfile
+import time
+import unittest
+
+from src.data_sources.docstore import JSONDocStore, MmapDocStore, open_docstore
+
+
+class TestDocStores(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.records = {i * 7919: {"table": f"t{i}", "schema": ["id"]} for i in range(1000)}
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _roundtrip(self, kind):
+        path = os.path.join(self.tmp.name, f"docs.{kind}")
+        open_docstore(path, kind).write(self.records)
+        store = open_docstore(path, kind)
+
+        self.assertEqual(store.get_many([7919 * 5, 42, 0]), [{"table": "t5", "schema": ["id"]}, None, self.records[0]])
+        self.assertEqual(store.load_all(), self.records)
+        self.assertEqual(len(store), 1000)
+        return path, store
+
+    def test_json_roundtrip(self):
+        self._roundtrip("json")
+
+    def test_mmap_roundtrip(self):
+        _, store = self._roundtrip("mmap")
+        self.assertIsInstance(store, MmapDocStore)
+
+    def test_reloads_when_file_changes(self):
+        for kind in ("json", "mmap"):
+            path, store = self._roundtrip(kind)
+            time.sleep(0.01)
+            open_docstore(path, kind).write({1: {"table": "new"}})
+            self.assertEqual(store.get_many([1, 0]), [{"table": "new"}, None])
+
+    def test_missing_file_is_empty(self):
+        for cls in (JSONDocStore, MmapDocStore):
+            store = cls(os.path.join(self.tmp.name, "missing"))
+            self.assertEqual(store.get_many([1]), [None])
+
+    def test_immutable_store_outlives_its_file(self):
+        for kind in ("json", "mmap"):
+            path = os.path.join(self.tmp.name, f"generation.{kind}")
+            open_docstore(path, kind).write(self.records)
+            store = open_docstore(path, kind, immutable=True)
+            self.assertEqual(len(store), 1000)
+            os.remove(path)
+            self.assertEqual(store.get_many([7919]), [self.records[7919]])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from src.data_sources.embedding_cache import EmbeddingCache
+
+
+class TestEmbeddingCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "embeddings.db")
+        self.calls = []
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _encode(self, texts):
+        self.calls.append(list(texts))
+        return np.array([[len(t), 1.0, 0.5] for t in texts], dtype="float32")
+
+    def test_only_misses_are_encoded_in_batches(self):
+        cache = EmbeddingCache(self.path, batch_size=2)
+        first = cache.encode("m", ["a", "bb", "ccc"], self._encode)
+        self.assertEqual(self.calls, [["a", "bb"], ["ccc"]])
+
+        self.calls.clear()
+        second = cache.encode("m", ["a", " bb ", "dddd"], self._encode)
+        self.assertEqual(self.calls, [["dddd"]])
+        np.testing.assert_allclose(second[:2], first[:2])
+        self.assertEqual(cache.last_report["hits"], 2)
+        self.assertAlmostEqual(cache.last_report["hit_rate"], 2 / 3, places=3)
+
+    def test_persists_across_instances_and_models(self):
+        EmbeddingCache(self.path).encode("m", ["a"], self._encode)
+        cache = EmbeddingCache(self.path)
+        cache.encode("m", ["a"], self._encode)
+        cache.encode("other", ["a"], self._encode)
+        self.assertEqual(len(self.calls), 2)
+
+    def test_lru_eviction(self):
+        cache = EmbeddingCache(self.path, max_entries=2, dtype="float32")
+        cache.encode("m", ["a", "b"], self._encode)
+        cache.encode("m", ["a"], self._encode)
+        cache.encode("m", ["c"], self._encode)
+        self.calls.clear()
+        cache.encode("m", ["a", "b"], self._encode)
+        self.assertEqual(self.calls, [["b"]])
+
+
+if __name__ == "__main__":
+    unittest.main()
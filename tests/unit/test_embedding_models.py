@@ -0,0 +1,46 @@
+import threading
+import unittest
+from unittest.mock import patch
+
+from src.data_sources import faiss_connector
+
+embedding_models = faiss_connector.embedding_models
+
+
+class FakeSentenceTransformer:
+    loads = 0
+
+    def __init__(self, name):
+        FakeSentenceTransformer.loads += 1
+        self.name = name
+
+    def encode(self, texts, batch_size=32):
+        return [[float(len(t)), 1.0] for t in texts]
+
+
+class TestEmbeddingModels(unittest.TestCase):
+    def tearDown(self):
+        embedding_models.unload_model("shared-model")
+
+    @patch("sentence_transformers.SentenceTransformer", FakeSentenceTransformer)
+    def test_model_is_loaded_once_across_connectors_and_threads(self):
+        FakeSentenceTransformer.loads = 0
+        connectors = [faiss_connector.FAISSConnector() for _ in range(2)]
+        for connector in connectors:
+            connector.model_name = "shared-model"
+
+        threads = [threading.Thread(target=connectors[i % 2]._encode, args=(["x"],)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(FakeSentenceTransformer.loads, 1)
+        self.assertIs(connectors[0]._load_model(), connectors[1]._load_model())
+        vectors = embedding_models.encode(["abc"], "shared-model")
+        self.assertEqual(vectors.dtype.name, "float32")
+        self.assertEqual(vectors.tolist(), [[3.0, 1.0]])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import unittest
+
+import faiss
+import numpy as np
+
+from src.data_sources import faiss_index_factory
+
+
+class TestFaissIndexFactory(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.vectors = rng.standard_normal((2000, 32)).astype("float32")
+        faiss.normalize_L2(self.vectors)
+        self.ids = np.arange(2000, dtype="int64") * 11
+
+    def test_auto_selection_by_catalog_size(self):
+        self.assertEqual(faiss_index_factory.choose_index_type(100), "flat")
+        self.assertEqual(faiss_index_factory.choose_index_type(50000), "ivf_flat")
+        self.assertEqual(faiss_index_factory.choose_index_type(500000), "ivf_flat")
+        self.assertEqual(faiss_index_factory.choose_index_type(5000000), "ivf_pq")
+
+    def test_auto_selection_supports_incremental_updates(self):
+        for num_vectors in (100, 20000, 50000, 200000, 5000000):
+            self.assertNotEqual(faiss_index_factory.choose_index_type(num_vectors), "hnsw")
+
+    def test_every_index_type_returns_stable_ids(self):
+        for index_type in ("flat", "hnsw", "ivf_flat"):
+            index = faiss_index_factory.build_index(self.vectors, self.ids, index_type)
+            self.assertEqual(faiss_index_factory.index_type_of(index), index_type)
+            _, found = index.search(self.vectors[:3], 1)
+            self.assertEqual(found[:, 0].tolist(), self.ids[:3].tolist())
+
+    def test_ivf_pq_returns_stable_ids_and_removes(self):
+        index = faiss_index_factory.build_index(self.vectors, self.ids, "ivf_pq")
+        self.assertEqual(faiss_index_factory.index_type_of(index), "ivf_pq")
+        self.assertTrue(faiss_index_factory.supports_remove(index))
+        faiss_index_factory.set_search_params(index, nprobe=64)
+        _, found = index.search(self.vectors[:20], 5)
+        # Product quantization is lossy: the exact vector should still rank in the top 5
+        hits = sum(self.ids[i] in found[i] for i in range(20))
+        self.assertGreaterEqual(hits, 18)
+
+        index.remove_ids(self.ids[:1])
+        self.assertEqual(index.ntotal, 1999)
+        _, found = index.search(self.vectors[:1], 5)
+        self.assertNotIn(self.ids[0], found[0])
+
+    def test_search_params_are_applied(self):
+        index = faiss_index_factory.build_index(self.vectors, self.ids, "ivf_flat")
+        faiss_index_factory.set_search_params(index, nprobe=7)
+        self.assertEqual(faiss.extract_index_ivf(index).nprobe, 7)
+
+        index = faiss_index_factory.build_index(self.vectors, self.ids, "hnsw")
+        faiss_index_factory.set_search_params(index, ef_search=99)
+        self.assertEqual(faiss.downcast_index(index.index).hnsw.efSearch, 99)
+        self.assertFalse(faiss_index_factory.supports_remove(index))
+
+
+if __name__ == "__main__":
+    unittest.main()
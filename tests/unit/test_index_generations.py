@@ -0,0 +1,96 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from config import Config
+from src.data_sources import faiss_connector
+from src.data_sources.faiss_connector import entry_id
+from data_sources import index_generations
+from helpers import make_connector, register_model
+
+
+def table(name):
+    return {"database": "db", "table": name, "schema": [f"{name}_id"], "sample_data": []}
+
+
+class TestSharedIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        register_model(self, "fake-shared-model")
+        patcher = mock.patch.object(Config, "FAISS_SHARED_INDEX", True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def connector(self):
+        return make_connector(self.tmp.name, "fake-shared-model")
+
+    def search(self, connector, name):
+        vectors = connector.encode_queries([str(table(name))])
+        return [hit["table"] for hit in connector.search_vectors(vectors, k=3)[0]]
+
+    def test_workers_remap_published_generations(self):
+        writer, worker = self.connector(), self.connector()
+        writer.store_in_faiss([table("users"), table("orders")])
+        self.assertEqual(index_generations.current(writer.index_file), 1)
+        self.assertTrue(os.path.islink(writer.data_file))
+
+        self.assertIn("users", self.search(worker, "users"))
+        self.assertTrue(worker._view.mapped)
+        self.assertEqual(worker.generation, 1)
+
+        writer.upsert({entry_id("db", "invoices"): table("invoices")})
+        writer.save()
+        writer.remove([entry_id("db", "users")])
+        writer.save()
+
+        self.assertEqual(index_generations.current(writer.index_file), 3)
+        self.assertEqual(index_generations.generations(writer.index_file), [2, 3])
+        results = self.search(worker, "invoices")
+        self.assertEqual(worker.generation, 3)
+        self.assertEqual(set(results), {"orders", "invoices"})
+        self.assertEqual(worker.get_records([entry_id("db", "users")]), [None])
+        # The writer maps the generation it published instead of keeping its private copy
+        self.assertTrue(writer._view.mapped)
+        self.assertIsNone(writer.records)
+
+    def test_unpublished_generation_is_ignored(self):
+        writer, worker = self.connector(), self.connector()
+        writer.store_in_faiss([table("users")])
+        self.search(worker, "users")
+        staged = index_generations.claim(writer.index_file)
+        self.assertEqual(staged, 2)
+        self.assertEqual(self.search(worker, "users"), ["users"])
+        self.assertEqual(worker.generation, 1)
+
+    def test_warns_when_faiss_cannot_map_in_place(self):
+        self.connector().store_in_faiss([table("users")])
+        with mock.patch.object(faiss_connector, "MMAP_IN_PLACE", False), \
+                self.assertLogs(faiss_connector.logger, "WARNING") as logs:
+            self.connector().load_faiss_index()
+        self.assertIn("IO_FLAG_MMAP_IFC", logs.output[0])
+
+    def test_delete_removes_every_generation(self):
+        writer = self.connector()
+        writer.store_in_faiss([table("users")])
+        writer.upsert({entry_id("db", "orders"): table("orders")})
+        writer.save()
+        index_generations.claim(writer.index_file)
+        writer.delete_faiss_index()
+        self.assertEqual(os.listdir(self.tmp.name), [])
+
+    def test_concurrent_publishers_use_their_own_temporary_links(self):
+        writer = self.connector()
+        writer.store_in_faiss([table("users")])
+        stale_link = f"{writer.index_file}.link.tmp"
+        os.symlink("elsewhere", stale_link)
+        with mock.patch.object(index_generations.os, "replace", side_effect=OSError("busy")):
+            with self.assertRaises(OSError):
+                index_generations.publish(writer.index_file, writer.data_file, 1)
+        # A failed swap cleans up its own link and leaves other processes' links alone
+        self.assertEqual([name for name in os.listdir(self.tmp.name) if ".link." in name], ["index.faiss.link.tmp"])
+
+
+if __name__ == "__main__":
+    unittest.main()
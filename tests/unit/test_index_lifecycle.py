@@ -0,0 +1,157 @@
+import os
+import tempfile
+import threading
+import types
+import unittest
+from unittest import mock
+
+from config import Config
+from src import create_app
+from src.startup import AppServices
+from src.data_sources.catalog_manager import CatalogManager
+from src.data_sources.faiss_connector import FAISSConnector
+from data_sources.index_lifecycle import IndexLifecycleManager
+from helpers import HashModel, make_connector, register_model
+
+
+class GatedModel(HashModel):
+    """Hash embeddings; encoding on a rebuild job's thread blocks while `gate` is cleared."""
+
+    def __init__(self):
+        super().__init__()
+        self.gate = threading.Event()
+        self.gate.set()
+        self.waiting = threading.Event()
+
+    def encode(self, texts):
+        if threading.current_thread().name.startswith("index-rebuild") and not self.gate.is_set():
+            self.waiting.set()
+            self.gate.wait(5)
+        return super().encode(texts)
+
+
+class FakeMySQL:
+    def __init__(self):
+        self.tables = ["users", "orders"]
+
+    def get_table_fingerprints(self):
+        return {("db", table): "1" for table in self.tables}
+
+    def extract_tables(self, tables):
+        return [{"database": db, "table": table, "schema": [f"{table}_id"], "sample_data": []}
+                for db, table in tables]
+
+
+class FakeCSV:
+    csv_directory = "data"
+
+    def get_file_fingerprints(self):
+        return {}
+
+
+class TestIndexLifecycle(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.model = register_model(self, "fake-lifecycle-model", GatedModel())
+        patcher = mock.patch.object(Config, "FAISS_MODEL_NAME", "fake-lifecycle-model")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.faiss = make_connector(self.tmp.name, "fake-lifecycle-model")
+        self.mysql = FakeMySQL()
+        self.catalog = CatalogManager(self.mysql, FakeCSV(), self.faiss,
+                                      state_file=os.path.join(self.tmp.name, "state.json"))
+        self.catalog.sync()
+        self.lifecycle = IndexLifecycleManager(self.catalog.sync, {"tables": self.faiss},
+                                               lock_file=os.path.join(self.tmp.name, "rebuild.lock"))
+
+    def tables(self):
+        return {r["table"] for r in self.faiss.search_faiss("users", k=5)}
+
+    def wait(self, job_id):
+        for _ in range(500):
+            job = self.lifecycle.job(job_id)
+            if job["status"] not in ("queued", "running"):
+                return job
+            threading.Event().wait(0.01)
+        self.fail(f"job {job_id} did not finish")
+
+    def test_searches_use_the_published_generation_during_a_rebuild(self):
+        self.assertEqual(self.faiss.generation, 1)
+        self.mysql.tables = ["users", "orders", "invoices"]
+        self.model.gate.clear()
+        job = self.lifecycle.rebuild()
+        self.assertTrue(self.model.waiting.wait(5))
+
+        self.assertEqual(self.lifecycle.rebuild()["id"], job["id"])
+        running = self.lifecycle.job(job["id"])
+        self.assertEqual((running["status"], running["phase"]), ("running", "tables"))
+        self.assertEqual(self.tables(), {"users", "orders"})
+        self.assertEqual(self.faiss.generation, 1)
+        self.model.gate.set()
+
+        finished = self.wait(job["id"])
+        self.assertEqual(finished["status"], "done")
+        self.assertEqual(finished["report"]["added"], 3)
+        self.assertEqual(finished["generations"], {"tables": {"active": 2, "published": 2}})
+        self.assertEqual(self.tables(), {"users", "orders", "invoices"})
+
+    def test_failed_validation_keeps_the_published_generation(self):
+        self.mysql.tables = ["users"]
+        with mock.patch.object(FAISSConnector, "_validate_generation", side_effect=ValueError("torn")):
+            job = self.wait(self.lifecycle.rebuild()["id"])
+        self.assertEqual((job["status"], job["error"]), ("failed", "torn"))
+        self.assertEqual(self.tables(), {"users", "orders"})
+        self.assertEqual(self.lifecycle.generations(), {"tables": {"active": 1, "published": 1}})
+        self.assertFalse(os.path.exists(self.faiss.index_file + ".v2"))
+
+        # The next incremental sync starts again from the published generation, not the discarded one
+        self.assertEqual(self.catalog.sync()["removed"], 1)
+        self.assertEqual(self.tables(), {"users"})
+
+    def test_lock_file_errors_fail_the_job(self):
+        self.lifecycle.lock_file = os.path.join(self.tmp.name, "missing", "rebuild.lock")
+        job = self.wait(self.lifecycle.rebuild()["id"])
+        self.assertEqual(job["status"], "failed")
+        self.assertIsNone(self.lifecycle.status()["active_job"])
+
+        self.lifecycle.lock_file = os.path.join(self.tmp.name, "rebuild.lock")
+        retry = self.lifecycle.rebuild()
+        self.assertNotEqual(retry["id"], job["id"])
+        self.assertEqual(self.wait(retry["id"])["status"], "done")
+
+    def test_foreground_sync_waits_for_the_process_lock(self):
+        other_process = self.lifecycle._acquire_process_lock()
+        self.mysql.tables = ["users"]
+        reports = []
+        sync = threading.Thread(target=lambda: reports.append(self.lifecycle.run()))
+        sync.start()
+        sync.join(0.2)
+        self.assertEqual(reports, [])
+        other_process.close()
+        sync.join(5)
+        self.assertEqual(reports[0]["removed"], 1)
+
+    def test_admin_routes(self):
+        services = AppServices(build=lambda: types.SimpleNamespace(index_lifecycle=self.lifecycle))
+        services.start(background=False)
+        client = create_app(services).test_client()
+
+        response = client.post("/index/rebuild", json={"force": True})
+        self.assertEqual(response.status_code, 202)
+        job_id = response.json["result"]["id"]
+        self.wait(job_id)
+        self.assertEqual(client.get(f"/index/jobs/{job_id}").json["result"]["status"], "done")
+        self.assertEqual(client.get("/index/jobs/999").status_code, 404)
+        status = client.get("/index/status").json["result"]
+        self.assertIsNone(status["active_job"])
+        self.assertEqual(status["generations"]["tables"]["active"], 2)
+
+        self.mysql.tables = ["users"]
+        response = client.post("/catalog/refresh", json={})
+        self.assertEqual(response.json["result"]["removed"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
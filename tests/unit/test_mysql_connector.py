@@ -0,0 +1,113 @@
+import unittest
+from contextlib import contextmanager
+
+from mysql.connector import OperationalError
+
+from src.data_sources.mysql_connector import MySQLConnector, SYSTEM_DATABASES
+
+
+TABLES = [
+    ("shop", "orders", 120, 16384, "2024-01-01", "2024-02-01"),
+    ("shop", "customers", 40, 8192, "2024-01-01", None),
+]
+COLUMNS = [
+    ("shop", "orders", "id", "int", "NO", "PRI"),
+    ("shop", "orders", "customer_id", "int", "YES", "MUL"),
+    ("shop", "orders", "total", "decimal(10,2)", "YES", ""),
+    ("shop", "customers", "id", "int", "NO", "PRI"),
+    ("shop", "ghost", "id", "int", "NO", ""),  # column of a table missing from TABLES
+]
+KEYS = [
+    ("shop", "orders", "id", "PRIMARY", None, None, None),
+    ("shop", "orders", "customer_id", "fk_orders_customer", "shop", "customers", "id"),
+    ("shop", "customers", "id", "PRIMARY", None, None, None),
+]
+
+
+class FakeCursor:
+    def __init__(self, queries):
+        self.queries = queries
+        self.rows = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def execute(self, query, params=None):
+        self.queries.append((query, params))
+        if "information_schema.TABLES" in query:
+            self.rows = TABLES
+        elif "information_schema.COLUMNS" in query:
+            self.rows = COLUMNS
+        else:
+            self.rows = KEYS
+
+    def fetchall(self):
+        return self.rows
+
+
+class FakeConnection:
+    def __init__(self, queries):
+        self.queries = queries
+
+    def cursor(self, dictionary=False):
+        return FakeCursor(self.queries)
+
+
+class TestBulkMetadata(unittest.TestCase):
+    def setUp(self):
+        self.queries = []
+        self.connector = MySQLConnector()
+
+        @contextmanager
+        def connection(database=None):
+            yield FakeConnection(self.queries)
+
+        self.connector.connection = connection
+
+    def test_merges_keys_into_column_records(self):
+        metadata = self.connector.get_bulk_metadata()
+
+        self.assertEqual(set(metadata), {("shop", "orders"), ("shop", "customers")})
+        self.assertEqual(metadata[("shop", "orders")]["schema"], [
+            {"Field": "id", "Type": "int", "Key": "PRI"},
+            {"Field": "customer_id", "Type": "int", "Key": "MUL", "References": "shop.customers.id"},
+            {"Field": "total", "Type": "decimal(10,2)"},
+        ])
+        self.assertEqual(metadata[("shop", "customers")]["schema"], [{"Field": "id", "Type": "int", "Key": "PRI"}])
+        self.assertEqual(metadata[("shop", "orders")]["stats"], {
+            "rows": 120, "data_length": 16384, "create_time": "2024-01-01", "update_time": "2024-02-01",
+        })
+
+    def test_filters_by_database(self):
+        self.connector.get_bulk_metadata()
+        self.assertEqual(len(self.queries), 3)
+        self.assertTrue(all("NOT IN" in query and params == tuple(SYSTEM_DATABASES) for query, params in self.queries))
+
+        self.queries.clear()
+        self.connector.get_bulk_metadata(["shop"])
+        self.assertTrue(all("TABLE_SCHEMA IN (%s)" in query and params == ("shop",) for query, params in self.queries))
+
+        self.queries.clear()
+        self.assertEqual(self.connector.get_bulk_metadata([]), {})
+        self.assertEqual(self.queries, [])
+
+
+class TestTableFingerprints(unittest.TestCase):
+    def test_errors_are_raised_not_read_as_no_tables(self):
+        connector = MySQLConnector()
+
+        @contextmanager
+        def connection(database=None):
+            raise OperationalError("Can't connect to MySQL server")
+            yield
+
+        connector.connection = connection
+        with self.assertRaises(OperationalError):
+            connector.get_table_fingerprints()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,134 @@
+import threading
+import time
+import unittest
+
+from src.data_sources.mysql_pool import MySQLConnectionPool, PoolTimeoutError
+
+
+class FakeConnection:
+    def __init__(self, database=None):
+        self.database = database
+        self.closed = False
+        self.alive = True
+        self.rollbacks = 0
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def is_connected(self):
+        return self.alive
+
+    def close(self):
+        self.closed = True
+
+
+class TestMySQLConnectionPool(unittest.TestCase):
+    def setUp(self):
+        self.created = []
+
+    def _connect(self, database=None):
+        connection = FakeConnection(database)
+        self.created.append(connection)
+        return connection
+
+    def test_connections_are_reused_across_databases(self):
+        pool = MySQLConnectionPool(self._connect, max_size=2)
+        with pool.connection("a") as first:
+            pass
+        with pool.connection("b") as second:
+            self.assertIs(first, second)
+            self.assertEqual(second.database, "b")
+        self.assertEqual(len(self.created), 1)
+        self.assertEqual(pool.metrics()["checkouts"], 2)
+
+    def test_fill_opens_idle_connections_up_to_max_size(self):
+        pool = MySQLConnectionPool(self._connect, max_size=3)
+        self.assertEqual(pool.fill(5), 3)
+        self.assertEqual(pool.fill(5), 0)
+        with pool.connection() as connection:
+            self.assertIn(connection, self.created)
+        metrics = pool.metrics()
+        self.assertEqual((metrics["created"], metrics["idle"], metrics["size"]), (3, 3, 3))
+
+    def test_checkout_blocks_then_times_out_when_exhausted(self):
+        pool = MySQLConnectionPool(self._connect, max_size=1, checkout_timeout=0.05)
+        with pool.connection():
+            with self.assertRaises(PoolTimeoutError):
+                with pool.connection():
+                    pass
+        metrics = pool.metrics()
+        self.assertEqual(metrics["timeouts"], 1)
+        self.assertEqual(metrics["waits"], 1)
+        self.assertEqual(metrics["in_use"], 0)
+
+    def test_waiter_gets_released_connection(self):
+        pool = MySQLConnectionPool(self._connect, max_size=1, checkout_timeout=2)
+        got = []
+
+        def worker():
+            with pool.connection() as connection:
+                got.append(connection)
+
+        with pool.connection() as held:
+            thread = threading.Thread(target=worker)
+            thread.start()
+            time.sleep(0.05)
+        thread.join()
+        self.assertIs(got[0], held)
+
+    def test_idle_eviction_and_lifetime_recycling(self):
+        pool = MySQLConnectionPool(self._connect, idle_timeout=0.01)
+        with pool.connection() as first:
+            pass
+        time.sleep(0.02)
+        with pool.connection() as second:
+            self.assertIsNot(first, second)
+        self.assertTrue(first.closed)
+
+        pool = MySQLConnectionPool(self._connect, max_lifetime=0)
+        with pool.connection() as connection:
+            pass
+        self.assertTrue(connection.closed)
+        self.assertEqual(pool.metrics()["size"], 0)
+
+    def test_unhealthy_connection_is_replaced(self):
+        pool = MySQLConnectionPool(self._connect, health_check_interval=0)
+        with pool.connection() as first:
+            pass
+        first.alive = False
+        with pool.connection() as second:
+            self.assertIsNot(first, second)
+        self.assertEqual(pool.metrics()["health_check_failures"], 1)
+
+    def test_checkin_rolls_back_and_no_database_gets_a_fresh_connection(self):
+        pool = MySQLConnectionPool(self._connect, max_size=1)
+        with pool.connection("a") as first:
+            pass
+        self.assertEqual(first.rollbacks, 1)
+        with pool.connection() as second:
+            self.assertIsNot(first, second)
+            self.assertIsNone(second.database)
+        self.assertTrue(first.closed)
+        self.assertEqual(pool.metrics()["size"], 1)
+
+    def test_failed_rollback_discards_connection(self):
+        def broken_rollback():
+            raise ConnectionError()
+
+        pool = MySQLConnectionPool(self._connect)
+        with pool.connection() as connection:
+            connection.rollback = broken_rollback
+        self.assertTrue(connection.closed)
+        self.assertEqual(pool.metrics()["size"], 0)
+
+    def test_discard_on_connection_errors(self):
+        pool = MySQLConnectionPool(self._connect, discard_on=(ConnectionError,))
+        with self.assertRaises(ConnectionError):
+            with pool.connection() as connection:
+                raise ConnectionError()
+        self.assertTrue(connection.closed)
+        self.assertEqual(pool.metrics()["size"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
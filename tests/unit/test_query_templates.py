@@ -0,0 +1,108 @@
+import json
+import os
+import tempfile
+import unittest
+
+from src.data_sources.query_templates import QueryTemplateCache, extract_literals, parse_sql_answer
+
+SOURCES = [{"database": "shop", "table": "transactions"}]
+
+
+def sql_answer(sql, answer_type="sql"):
+    return "```json\n" + json.dumps({"type": answer_type, "query": sql}) + "\n```"
+
+
+class TestQueryTemplates(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.fingerprints = {("shop", "transactions"): "v1"}
+        self.cache = QueryTemplateCache(os.path.join(self.tmp.name, "cache.db"),
+                                        fingerprint_fn=lambda db, table: self.fingerprints.get((db, table)))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def lookup(self, question):
+        answer, sources = self.cache.lookup(question)
+        return parse_sql_answer(answer)[1] if answer else None, sources
+
+    def test_extract_literals(self):
+        self.assertEqual(extract_literals("show me user id for FZwdkpHZ"),
+                         ("show me user id for <str>", [("str", "FZwdkpHZ")]))
+        self.assertEqual(extract_literals("Orders above 250 for 'Jane Doe'?"),
+                         ("orders above <num> for <str>", [("num", "250"), ("str", "Jane Doe")]))
+
+    def test_substitutes_and_escapes_new_literal(self):
+        learned = self.cache.learn("show me user id for FZwdkpHZ",
+                                   sql_answer("SELECT user_id FROM transactions WHERE username = 'FZwdkpHZ'"), SOURCES)
+        self.assertTrue(learned)
+
+        sql, sources = self.lookup("Show me user id for Ab12'; DROP TABLE x")
+        self.assertIsNone(sql)
+        sql, _ = self.lookup("show me user id for \"O'Brien\"")
+        self.assertEqual(sql, "SELECT user_id FROM transactions WHERE username = 'O''Brien'")
+
+        sql, sources = self.lookup("show me user id for QxY9z")
+        self.assertEqual(sql, "SELECT user_id FROM transactions WHERE username = 'QxY9z'")
+        self.assertEqual(sources, SOURCES)
+        self.assertEqual(self.cache.stats()["hits"], 2)
+
+    def test_quoted_literal_is_escaped(self):
+        self.cache.learn("orders for 'Jane'",
+                         sql_answer("SELECT * FROM orders WHERE name = 'Jane' ORDER BY id"), SOURCES)
+        sql, _ = self.lookup("orders for 'O'Brien\\'")
+        self.assertIsNone(sql)
+        sql, _ = self.lookup("orders for \"O'Brien\"")
+        self.assertEqual(sql, "SELECT * FROM orders WHERE name = 'O''Brien' ORDER BY id")
+
+    def test_escapes_per_dialect(self):
+        self.cache.learn("orders for 'Jane'", sql_answer("SELECT * FROM orders WHERE name = 'Jane'"), SOURCES)
+        self.cache.learn("csv orders for 'Jane'", sql_answer("SELECT * FROM orders_csv WHERE name = 'Jane'", "csv"), SOURCES)
+
+        self.assertEqual(self.lookup("orders for 'a\\b'")[0], "SELECT * FROM orders WHERE name = 'a\\\\b'")
+        answer, _ = self.cache.lookup("csv orders for 'a\\b'")
+        self.assertEqual(parse_sql_answer(answer), ("csv", "SELECT * FROM orders_csv WHERE name = 'a\\b'"))
+
+    def test_double_quoted_literal_is_not_a_slot(self):
+        # Under ANSI_QUOTES (and in SQLite) "Jane" may be an identifier, so it is never templated
+        self.assertFalse(self.cache.learn("orders for 'Jane'",
+                                          sql_answer('SELECT * FROM orders WHERE name = "Jane"'), SOURCES))
+
+    def test_rejects_slots_outside_where_clause_of_template(self):
+        # The literal sits in WHERE, but keywords inside another string fool a check of the plain SQL
+        self.assertFalse(self.cache.learn(
+            "orders for 'Jane'",
+            sql_answer("SELECT * FROM orders WHERE note = 'x' ORDER BY id LIMIT 1 UNION SELECT * FROM o WHERE n = 'Jane'"),
+            SOURCES))
+        self.assertTrue(self.cache.learn(
+            "orders for 'Jane'", sql_answer("SELECT * FROM orders WHERE note = 'group by' AND name = 'Jane'"), SOURCES))
+        self.assertEqual(self.lookup("orders for 'Bob'")[0],
+                         "SELECT * FROM orders WHERE note = 'group by' AND name = 'Bob'")
+
+    def test_rejects_literals_outside_where_clause(self):
+        self.assertFalse(self.cache.learn("top 10 users", sql_answer("SELECT * FROM users LIMIT 10"), SOURCES))
+        self.assertFalse(self.cache.learn("total sales", sql_answer("SELECT SUM(x) FROM sales"), SOURCES))
+        self.assertEqual(self.cache.stats()["templates"], 0)
+
+    def test_template_dropped_when_table_changes(self):
+        self.cache.learn("amount for order 42",
+                         sql_answer("SELECT amount FROM transactions WHERE order_id = 42"), SOURCES)
+        self.assertEqual(self.lookup("amount for order 7")[0],
+                         "SELECT amount FROM transactions WHERE order_id = 7")
+        self.fingerprints[("shop", "transactions")] = "v2"
+        self.assertEqual(self.lookup("amount for order 7"), (None, None))
+        self.assertEqual(self.cache.stats()["templates"], 0)
+
+    def test_csv_template_under_a_dotted_directory_is_kept(self):
+        sources = [{"database": "./data", "table": "sales.csv"}]
+        self.fingerprints[("./data", "sales.csv")] = "v1"
+        self.assertTrue(self.cache.learn("quantity for product 42", sql_answer(
+            "SELECT quantity FROM sales WHERE product_id = 42", "csv"), sources))
+
+        self.assertEqual(self.lookup("quantity for product 7"),
+                         ("SELECT quantity FROM sales WHERE product_id = 7", sources))
+        self.assertEqual(self.cache.stats()["templates"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import unittest
+from unittest.mock import patch
+
+from src.agents.rag_agent import RAGAgent
+from src.data_sources.column_catalog import column_records, project_record
+
+USERS = {
+    "database": "shop", "table": "users",
+    "schema": [{"Field": "id", "Type": "int", "Key": "PRI"}, {"Field": "username", "Type": "varchar(50)"},
+               {"Field": "bio", "Type": "text"}],
+    "sample_data": [{"id": 1, "username": "FZwdkpHZ", "bio": "x" * 500}],
+}
+SALES = {"database": "data", "table": "sales.csv", "schema": ["date", "product_id", "quantity"],
+         "sample_data": [["2023-01-01", "1", "5"]]}
+
+
+class FakeConnector:
+    def __init__(self, records, hits=None):
+        self.records = records
+        self.hits = hits or []
+
+    def index_exists(self):
+        return True
+
+    def search_faiss(self, query, k=5):
+        return self.hits[:k]
+
+    def get_records(self, ids):
+        return [self.records.get(i) for i in ids]
+
+
+class TestColumnRetrieval(unittest.TestCase):
+    def test_column_records_link_back_to_table(self):
+        columns = list(column_records(USERS).values())
+        self.assertEqual([c["column"] for c in columns], ["id", "username", "bio"])
+        self.assertEqual(len({c["table_id"] for c in columns}), 1)
+        self.assertEqual(columns[1]["sample_values"], ["FZwdkpHZ"])
+        self.assertEqual(list(column_records(SALES).values())[2]["sample_values"], ["5"])
+
+    def test_project_record_keeps_matching_and_key_columns(self):
+        projected = project_record(USERS, ["username"])
+        self.assertEqual([c["Field"] for c in projected["schema"]], ["id", "username"])
+        self.assertEqual(projected["sample_data"], [{"id": 1, "username": "FZwdkpHZ"}])
+        self.assertEqual(project_record(SALES, ["quantity"])["sample_data"], [["5"]])
+
+    @patch.object(RAGAgent, "_init_gemini", lambda self: None)
+    def test_retriever_aggregates_column_hits_per_table(self):
+        users_cols = column_records(USERS)
+        sales_cols = column_records(SALES)
+        users_id = next(iter(users_cols.values()))["table_id"]
+        sales_id = next(iter(sales_cols.values()))["table_id"]
+        hits = [dict(c, score=s) for c, s in [
+            (list(sales_cols.values())[2], 0.7),
+            (list(users_cols.values())[1], 0.6),
+            (list(users_cols.values())[0], 0.5),
+        ]]
+        agent = RAGAgent(faiss_connector=FakeConnector({users_id: USERS, sales_id: SALES}),
+                         column_connector=FakeConnector({}, hits))
+
+        docs = agent.retriever("show me user id for FZwdkpHZ")
+
+        self.assertEqual([d.metadata["table"] for d in docs], ["users", "sales.csv"])
+        self.assertAlmostEqual(docs[0].metadata["score"], 1.1)
+        self.assertEqual([c["Field"] for c in docs[0].metadata["schema"]], ["id", "username"])
+        self.assertNotIn("bio", docs[0].page_content)
+
+
+if __name__ == "__main__":
+    unittest.main()
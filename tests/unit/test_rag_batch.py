@@ -0,0 +1,101 @@
+import os
+import tempfile
+import threading
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import numpy as np
+
+from config import Config
+from src.agents.rag_agent import RAGAgent
+from src.data_sources.sqlite_connector import SQLiteConnector
+from helpers import make_connector, register_model
+
+
+class CountingConnector:
+    def __init__(self):
+        self.encode_calls = []
+        self.search_calls = []
+
+    def encode_queries(self, queries):
+        self.encode_calls.append(list(queries))
+        return np.ones((len(queries), 4), dtype="float32")
+
+    def search_vectors(self, vectors, k=5):
+        self.search_calls.append(len(vectors))
+        return [[{"database": "shop", "table": "users", "schema": ["id"], "sample_data": [], "score": 0.5}]
+                for _ in range(len(vectors))]
+
+
+class FakeModel:
+    def __init__(self):
+        self.prompts = []
+        self.lock = threading.Lock()
+
+    def generate_content(self, prompt):
+        with self.lock:
+            self.prompts.append(prompt)
+        return SimpleNamespace(text='{"type": "sql", "query": "SELECT id FROM users"}')
+
+
+class TestRAGBatch(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_batch_uses_one_encode_and_one_search_for_misses(self):
+        connector = CountingConnector()
+        with patch.object(RAGAgent, "_init_gemini", lambda self: FakeModel()), \
+                patch.object(Config, "SEMANTIC_CACHE", False), patch.object(Config, "QUERY_TEMPLATES", False):
+            agent = RAGAgent(faiss_connector=connector)
+        agent.sqlite_connector = SQLiteConnector(os.path.join(self.tmp.name, "cache.db"), async_writes=False)
+        agent.sqlite_connector.store_result("cached question", "cached answer", [])
+
+        queries = ["list users", "List users?", "count users", "cached question"]
+        items = list(agent.run_batch(queries, max_concurrency=2))
+        agent.sqlite_connector.close()
+
+        self.assertEqual(items[0], {"index": 3, "answer": "cached answer", "sources": []})
+        self.assertEqual(sorted(item["index"] for item in items), [0, 1, 2, 3])
+        self.assertEqual(connector.encode_calls, [["list users", "count users"]])
+        self.assertEqual(connector.search_calls, [2])
+        self.assertEqual(len(agent.model.prompts), 2)
+
+    def test_batch_joins_questions_already_in_flight(self):
+        with patch.object(RAGAgent, "_init_gemini", lambda self: FakeModel()), \
+                patch.object(Config, "SEMANTIC_CACHE", False), patch.object(Config, "QUERY_TEMPLATES", False):
+            agent = RAGAgent(faiss_connector=CountingConnector())
+        agent.sqlite_connector = SQLiteConnector(os.path.join(self.tmp.name, "cache.db"), async_writes=False)
+        self.addCleanup(agent.sqlite_connector.close)
+
+        # Another request is answering "list users" right now
+        leader, flight = agent.single_flight.begin("list users")
+        self.assertTrue(leader)
+        items = []
+        batch = threading.Thread(target=lambda: items.extend(agent.run_batch(["List users", "count users"])))
+        batch.start()
+        while not items:
+            batch.join(0.01)
+        agent.single_flight.finish("list users", flight, ("shared answer", []))
+        batch.join(5)
+
+        self.assertEqual(len(agent.model.prompts), 1)
+        self.assertIn({"index": 0, "answer": "shared answer", "sources": []}, items)
+        self.assertEqual(agent.single_flight.stats()["in_flight"], 0)
+
+    def test_search_vectors_matches_single_searches(self):
+        register_model(self, "hash-model")
+        connector = make_connector(self.tmp.name, "hash-model")
+        connector.store_in_faiss([{"database": "db", "table": f"t{i}", "schema": [], "sample_data": []}
+                                  for i in range(20)])
+
+        queries = ["orders", "users", "sales"]
+        batch = connector.search_faiss_batch(queries, k=3)
+        self.assertEqual(batch, [connector.search_faiss(q, k=3) for q in queries])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+import os
+import tempfile
+import threading
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from config import Config
+from src.agents.rag_agent import RAGAgent
+from src.data_sources.sqlite_connector import SQLiteConnector
+
+
+class FakeStream:
+    def __init__(self, texts):
+        self.texts = texts
+        self.usage_metadata = SimpleNamespace(prompt_token_count=42)
+
+    def __iter__(self):
+        return iter(SimpleNamespace(text=t) for t in self.texts)
+
+
+class FakeStreamingModel:
+    def __init__(self):
+        self.calls = 0
+        self.called = threading.Event()
+        self.release = threading.Event()
+        self.release.set()
+
+    def generate_content(self, prompt, stream=False):
+        self.calls += 1
+        self.called.set()
+        self.release.wait(5)
+        return FakeStream(['{"type": "sql", ', '"query": "SELECT 1"}'])
+
+
+class TestRAGStream(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        with patch.object(RAGAgent, "_init_gemini", lambda self: FakeStreamingModel()), \
+                patch.object(Config, "SEMANTIC_CACHE", False), patch.object(Config, "QUERY_TEMPLATES", False):
+            self.agent = RAGAgent(faiss_connector=object())
+        self.agent.sqlite_connector = SQLiteConnector(os.path.join(self.tmp.name, "cache.db"), async_writes=False)
+        self.agent.retriever = lambda query: []
+
+    def tearDown(self):
+        self.agent.sqlite_connector.close()
+        self.tmp.cleanup()
+
+    def test_streams_sources_tokens_then_answer_and_replays_from_cache(self):
+        events = list(self.agent.rag_stream("what is one"))
+        self.assertEqual([e for e, _ in events], ["sources", "token", "token", "answer"])
+        self.assertEqual(events[-1][1], {"text": '{"type": "sql", "query": "SELECT 1"}', "cached": False})
+        self.assertEqual(self.agent.context_builder.stats()["reported_prompt_tokens"], 42)
+
+        cached = list(self.agent.rag_stream("What is one?"))
+        self.assertEqual([e for e, _ in cached], ["sources", "answer"])
+        self.assertTrue(cached[-1][1]["cached"])
+        self.assertEqual(self.agent.model.calls, 1)
+
+    def test_concurrent_duplicate_replays_the_streamed_answer(self):
+        model = self.agent.model
+        model.release.clear()
+        leader_events = []
+        leader = threading.Thread(target=lambda: leader_events.extend(self.agent.rag_stream("what is two")))
+        leader.start()
+        model.called.wait(5)
+
+        follower_events = []
+        follower = threading.Thread(target=lambda: follower_events.extend(self.agent.rag_stream("What is two?")))
+        follower.start()
+        while self.agent.single_flight.stats()["shared"] < 1:
+            follower.join(0.01)
+        model.release.set()
+        leader.join(5)
+        follower.join(5)
+
+        self.assertEqual(model.calls, 1)
+        self.assertEqual([e for e, _ in leader_events], ["sources", "token", "token", "answer"])
+        self.assertEqual(follower_events, [("sources", []), ("answer", {"text": leader_events[-1][1]["text"],
+                                                                      "cached": True})])
+        self.assertEqual(self.agent.single_flight.stats()["in_flight"], 0)
+
+    def test_abandoned_stream_releases_waiters(self):
+        stream = self.agent.rag_stream("what is three")
+        next(stream)
+        stream.close()
+        self.assertEqual(self.agent.single_flight.stats()["in_flight"], 0)
+        self.assertEqual([e for e, _ in self.agent.rag_stream("what is three")], ["sources", "token", "token", "answer"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+import threading
+import unittest
+from contextlib import contextmanager
+
+from src.data_sources.sample_harvester import SampleHarvester
+
+
+class FakeCursor:
+    def __init__(self, connector, connection):
+        self.connector = connector
+        self.connection = connection
+        self.rows = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def execute(self, query):
+        self.connector.queries.append(query)
+        table = query.rsplit("`.`", 1)[1].split("`")[0]
+        if table == "slow":
+            self.connection.table = table
+            if self.connection.killed.wait(5):
+                raise RuntimeError("Query execution was interrupted")
+        if table == "locked":
+            raise RuntimeError("Lock wait timeout exceeded")
+        self.rows = [{"id": i, "payload": "x" * 1000} for i in range(10)]
+
+    def fetchall(self):
+        return self.rows
+
+
+class FakeConnection:
+    def __init__(self, connector):
+        self.connector = connector
+        self.table = None
+        self.killed = threading.Event()
+
+    def cursor(self, dictionary=False):
+        return FakeCursor(self.connector, self)
+
+
+class FakeConnector:
+    def __init__(self):
+        self.queries = []
+        self.cancelled = []
+
+    @contextmanager
+    def connection(self, database=None):
+        yield FakeConnection(self)
+
+    def cancel(self, connection):
+        self.cancelled.append(connection)
+        connection.killed.set()
+
+
+SCHEMA = [{"Field": "id", "Type": "int"}, {"Field": "payload", "Type": "json"}, {"Field": "raw", "Type": "longblob"}]
+
+
+class TestSampleHarvester(unittest.TestCase):
+    def setUp(self):
+        self.connector = FakeConnector()
+        self.harvester = SampleHarvester(self.connector, max_concurrency=4, table_timeout=0.1,
+                                         max_value_bytes=16, max_table_bytes=100)
+
+    def test_projection_skips_binary_and_truncates_text(self):
+        query = self.harvester.build_query("db", "t", SCHEMA)
+        self.assertIn("`id`, LEFT(`payload`, 16) AS `payload`", query)
+        self.assertNotIn("raw", query)
+        self.assertIn("MAX_EXECUTION_TIME(100)", query)
+        self.assertIsNone(self.harvester.build_query("db", "t", [{"Field": "raw", "Type": "blob"}]))
+
+    def test_harvest_skips_slow_and_failing_tables(self):
+        tables = [("db", "ok", SCHEMA), ("db", "slow", SCHEMA), ("db", "locked", SCHEMA)]
+        samples, report = self.harvester.harvest(tables)
+
+        self.assertEqual(list(samples), [("db", "ok")])
+        self.assertEqual((report["tables"], report["sampled"]), (3, 1))
+        reasons = {s["table"]: s["reason"] for s in report["skipped"]}
+        self.assertEqual(reasons, {"slow": "timeout", "locked": reasons["locked"]})
+        self.assertIn("Lock wait", reasons["locked"])
+        # The timed-out query was killed and its connection kept out of the pool
+        self.assertEqual([c.table for c in self.connector.cancelled], ["slow"])
+
+    def test_byte_budget_limits_rows_and_values(self):
+        samples, _ = self.harvester.harvest([("db", "ok", SCHEMA)])
+        rows = samples[("db", "ok")]
+        self.assertLess(len(rows), 10)
+        self.assertEqual(rows[0]["payload"], "x" * 16 + "...")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from src.data_sources import semantic_cache
+
+embedding_models = semantic_cache.embedding_models
+
+VOCABULARY = ["show", "me", "the", "user", "id", "for", "x", "total", "sales"]
+
+
+class BagOfWordsModel:
+    def encode(self, texts, batch_size=32):
+        vectors = np.zeros((len(texts), len(VOCABULARY)), dtype="float32")
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                if word in VOCABULARY:
+                    vectors[row, VOCABULARY.index(word)] += 1
+        return vectors
+
+
+class TestSemanticCache(unittest.TestCase):
+    def setUp(self):
+        embedding_models.register_model("bow-model", BagOfWordsModel())
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "cache.db")
+        self.fingerprints = {("shop", "users"): "v1"}
+        self.cache = self._cache()
+
+    def tearDown(self):
+        embedding_models.unload_model("bow-model")
+        self.tmp.cleanup()
+
+    def _cache(self):
+        return semantic_cache.SemanticCache(self.path, threshold=0.9, model_name="bow-model",
+                                            fingerprint_fn=lambda db, table: self.fingerprints.get((db, table)))
+
+    def test_paraphrase_hits_and_unrelated_question_misses(self):
+        sources = [{"database": "shop", "table": "users"}]
+        self.cache.store("show me user id for X", "answer", sources)
+
+        self.assertEqual(self.cache.lookup("Show me the user id for X"), ("answer", sources))
+        self.assertEqual(self.cache.lookup("total sales"), (None, None))
+        self.assertEqual(self._cache().lookup("show me the user id for x")[0], "answer")
+
+    def test_literal_variants_do_not_share_answers(self):
+        # Only the literals differ, and they are out of the model's vocabulary: the
+        # questions embed identically, so the literal check alone must tell them apart
+        top_10 = '{"type": "sql", "query": "SELECT * FROM users LIMIT 10"}'
+        self.cache.store("show me the user id for 10", top_10, [])
+        self.assertEqual(self.cache.lookup("show me the user id for 20"), (None, None))
+        self.assertEqual(self.cache.lookup("show me user id for 10")[0], top_10)
+
+        john = '{"type": "sql", "query": "SELECT id FROM users WHERE name = \'john\'"}'
+        self.cache.store("show me user id for john", john, [])
+        self.assertEqual(self.cache.lookup("show me user id for mary"), (None, None))
+        self.assertEqual(self.cache.lookup("show me the user id for john")[0], john)
+
+    def test_answer_is_invalidated_when_source_table_changes(self):
+        self.cache.store("show me user id for X", "answer", [{"database": "shop", "table": "users"}])
+        self.fingerprints[("shop", "users")] = "v2"
+
+        self.assertEqual(self.cache.purge_stale(), 1)
+        self.assertEqual(self.cache.lookup("show me user id for X"), (None, None))
+        self.assertEqual(self.cache.stats()["entries"], 0)
+
+    def test_csv_sources_under_a_dotted_directory_stay_current(self):
+        sources = [{"database": "./data", "table": "sales.csv"}]
+        self.fingerprints[("./data", "sales.csv")] = "v1"
+        self.cache.store("show me user id for X", "answer", sources)
+
+        self.assertEqual(self.cache.lookup("show me user id for X"), ("answer", sources))
+        self.assertEqual(self.cache.stats()["invalidated"], 0)
+        self.fingerprints[("./data", "sales.csv")] = "v2"
+        self.assertEqual(self.cache.lookup("show me user id for X"), (None, None))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+import asyncio
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from src.agents.single_flight import SingleFlight
+
+
+class TestSingleFlight(unittest.TestCase):
+    def test_concurrent_duplicates_share_one_call(self):
+        flight = SingleFlight()
+        calls = []
+        started = threading.Event()
+        release = threading.Event()
+
+        def compute():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return "answer"
+
+        results = []
+        leader = threading.Thread(target=lambda: results.append(flight.do("q", compute)))
+        leader.start()
+        started.wait(5)
+        followers = [threading.Thread(target=lambda: results.append(flight.do("q", compute))) for _ in range(5)]
+        for thread in followers:
+            thread.start()
+        while flight.stats()["shared"] < 5:
+            time.sleep(0.01)
+        release.set()
+        for thread in [leader] + followers:
+            thread.join(5)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ["answer"] * 6)
+        self.assertEqual(flight.stats()["in_flight"], 0)
+        self.assertEqual(flight.do("q", lambda: "fresh"), "fresh")
+
+    def test_errors_propagate_and_are_not_cached(self):
+        flight = SingleFlight()
+        with self.assertRaises(ValueError):
+            flight.do("q", lambda: (_ for _ in ()).throw(ValueError("boom")))
+        self.assertEqual(flight.do("q", lambda: 1), 1)
+
+    def test_async_callers_share_one_call_with_threads(self):
+        flight = SingleFlight()
+        calls = []
+        thread_results = []
+
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.1)
+            return "answer"
+
+        async def run():
+            leader = asyncio.ensure_future(flight.do_async("q", compute))
+            await asyncio.sleep(0.01)
+            # A thread and a follower that gives up both join the in-flight call
+            thread = threading.Thread(target=lambda: thread_results.append(flight.do("q", lambda: "thread")))
+            thread.start()
+            quitter = asyncio.ensure_future(flight.do_async("q", compute))
+            await asyncio.sleep(0.01)
+            quitter.cancel()
+            results = await asyncio.gather(leader, flight.do_async("q", compute))
+            await asyncio.get_running_loop().run_in_executor(None, thread.join, 5)
+            return results
+
+        self.assertEqual(asyncio.run(run()), ["answer", "answer"])
+        self.assertEqual(thread_results, ["answer"])
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(flight.stats()["shared"], 3)
+
+    def test_lease_serializes_processes(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "leases.db")
+            first, second = SingleFlight(path, poll_interval=0.01), SingleFlight(path, poll_interval=0.01)
+            order = []
+            holding = threading.Event()
+
+            def slow():
+                holding.set()
+                time.sleep(0.2)
+                order.append("first")
+
+            thread = threading.Thread(target=first.do, args=("q", slow))
+            thread.start()
+            holding.wait(5)
+            second.do("q", lambda: order.append("second"))
+            thread.join(5)
+
+            self.assertEqual(order, ["first", "second"])
+            self.assertEqual(second.stats()["lease_waits"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
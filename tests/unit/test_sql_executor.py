@@ -0,0 +1,153 @@
+import re
+import unittest
+from contextlib import contextmanager
+from decimal import Decimal
+
+from src.data_sources.mysql_pool import MySQLConnectionPool
+from src.data_sources.sql_executor import (ResultCursorError, SQLExecutor, SQLRejectedError, check_read_only,
+                                           decode_cursor)
+
+ROWS = [(i, f"user{i}", Decimal("1.50")) for i in range(25)]
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.rows = []
+        self.description = None
+
+    def execute(self, query):
+        self.connection.statements.append(query)
+        match = re.search(r"LIMIT (\d+) OFFSET (\d+)$", query)
+        if query.startswith("SET"):
+            return
+        limit, offset = (int(match.group(1)), int(match.group(2))) if match else (len(ROWS), 0)
+        self.rows = list(ROWS[offset:offset + limit])
+        self.description = [("id",), ("username",), ("balance",)]
+
+    def fetchmany(self, size):
+        chunk, self.rows = self.rows[:size], self.rows[size:]
+        return chunk
+
+    def fetchall(self):
+        rows, self.rows = self.rows, []
+        return rows
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+class FakeConnection:
+    def __init__(self):
+        self.statements = []
+        self.closed = False
+        self.readonly = None
+
+    def cursor(self, buffered=None):
+        return FakeCursor(self)
+
+    def rollback(self):
+        pass
+
+    def start_transaction(self, readonly=False):
+        self.readonly = readonly
+
+    def is_connected(self):
+        return True
+
+    def close(self):
+        self.closed = True
+
+
+class FakeMySQLConnector:
+    def __init__(self):
+        self.connections = []
+        self.pool = MySQLConnectionPool(self._connect, max_size=2)
+
+    def _connect(self, database=None):
+        self.connections.append(FakeConnection())
+        return self.connections[-1]
+
+    @contextmanager
+    def connection(self, database=None):
+        with self.pool.connection(database) as connection:
+            yield connection
+
+
+class TestSQLExecutor(unittest.TestCase):
+    def setUp(self):
+        self.mysql = FakeMySQLConnector()
+        self.executor = SQLExecutor(self.mysql, chunk_size=4, max_rows=10, max_bytes=10 ** 6, timeout=5)
+
+    def test_rejects_writes_and_multiple_statements(self):
+        self.assertEqual(check_read_only("SELECT 1;"), "SELECT 1")
+        self.assertEqual(check_read_only("SELECT ';' AS x"), "SELECT ';' AS x")
+        for sql in ("DELETE FROM users", "SELECT 1; DROP TABLE users", "SELECT * FROM t FOR UPDATE", ""):
+            with self.assertRaises(SQLRejectedError):
+                check_read_only(sql)
+
+    def test_comments_are_stripped_before_checking(self):
+        self.assertEqual(check_read_only("-- list users\nSELECT * FROM users # all of them"), "SELECT * FROM users")
+        self.assertEqual(check_read_only("/* report */ SELECT /*+ MAX_EXECUTION_TIME(5) */ 1 -- ;"),
+                         "SELECT /*+ MAX_EXECUTION_TIME(5) */ 1")
+        self.assertEqual(check_read_only("SELECT 1--1"), "SELECT 1--1")
+        for sql in ("/* SELECT */ DELETE FROM users", "SELECT 1 /* ; */; DROP TABLE users",
+                    "SELECT 1 /*!; DROP TABLE users */; UPDATE t SET x = 1"):
+            with self.assertRaises(SQLRejectedError):
+                check_read_only(sql)
+
+    def test_page_query_stays_within_own_limit(self):
+        self.assertEqual(self.executor.page_query("SELECT id FROM users ORDER BY id LIMIT 15", 10),
+                         "SELECT id FROM users ORDER BY id LIMIT 5 OFFSET 10")
+        self.assertEqual(self.executor.page_query("SELECT id FROM users ORDER BY id LIMIT 5, 100", 10),
+                         "SELECT id FROM users ORDER BY id LIMIT 11 OFFSET 15")
+
+    def test_streams_chunks_and_pages_with_signed_cursor(self):
+        events = list(self.executor.execute("SELECT id, username, balance FROM users ORDER BY id", "shop"))
+        self.assertEqual(events[0], {"columns": ["id", "username", "balance"]})
+        chunks = [e["rows"] for e in events if "rows" in e]
+        self.assertEqual([len(c) for c in chunks], [4, 4, 2])
+        self.assertEqual(chunks[0][0], [0, "user0", 1.5])
+        summary = events[-1]["summary"]
+        self.assertEqual((summary["row_count"], summary["truncated"]), (10, None))
+        self.assertTrue(self.mysql.connections[0].readonly)
+
+        pages = [summary]
+        while pages[-1]["next_cursor"]:
+            pages.append(list(self.executor.resume(pages[-1]["next_cursor"]))[-1]["summary"])
+        self.assertEqual([p["row_count"] for p in pages], [10, 10, 5])
+        self.assertEqual(len(self.mysql.connections), 1)  # drained connections go back to the pool
+
+        body, signature = summary["next_cursor"].split(".")
+        with self.assertRaises(ResultCursorError):
+            decode_cursor(body + "." + signature[::-1])
+
+    def test_unordered_select_is_truncated_without_cursor(self):
+        # The ORDER BY of a window function does not order the result
+        events = list(self.executor.execute("SELECT id, ROW_NUMBER() OVER (ORDER BY id) FROM users", "shop"))
+        summary = events[-1]["summary"]
+        self.assertEqual((summary["row_count"], summary["truncated"], summary["next_cursor"]), (10, "rows", None))
+        self.assertTrue(self.mysql.connections[0].statements[-2].endswith("LIMIT 11 OFFSET 0"))
+        self.assertFalse(self.mysql.connections[0].closed)
+
+    def test_byte_limit_and_abandoned_stream_discard_connection(self):
+        executor = SQLExecutor(self.mysql, chunk_size=4, max_rows=10, max_bytes=30, timeout=5)
+        summary = list(executor.execute("SHOW TABLES"))[-1]["summary"]
+        self.assertEqual(summary["truncated"], "bytes")
+        self.assertIsNone(summary["next_cursor"])
+        self.assertTrue(self.mysql.connections[0].closed)
+
+        stream = self.executor.execute("SELECT * FROM users")
+        next(stream)
+        stream.close()
+        self.assertTrue(self.mysql.connections[1].closed)
+
+
+if __name__ == "__main__":
+    unittest.main()
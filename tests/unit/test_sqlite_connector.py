@@ -0,0 +1,99 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+
+from src.data_sources.sqlite_connector import SQLiteConnector, normalize_query
+
+
+class TestSQLiteConnector(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "cache.db")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_normalized_key(self):
+        self.assertEqual(normalize_query("  Show me   user id for X? "), "show me user id for x")
+
+    def test_normalized_key_keeps_literal_case(self):
+        self.assertEqual(normalize_query("Orders for 'McDonald'"), "orders for 'McDonald'")
+        self.assertNotEqual(normalize_query("Status = 'ACTIVE'"), normalize_query("status = 'active'"))
+        self.assertNotEqual(normalize_query("User FZwdkpHZ"), normalize_query("user fzwdkphz"))
+        self.assertEqual(normalize_query("COUNT rows in `Orders`"), "count rows in `Orders`")
+
+    def test_store_and_lookup_deduplicates(self):
+        cache = SQLiteConnector(self.path)
+        cache.store_result("Show me sales", "a1", [{"table": "sales"}])
+        self.assertEqual(cache.get_result("show me sales?"), ("a1", [{"table": "sales"}]))
+        cache.store_result("show me  sales", "a2", [])
+        cache.flush()
+
+        self.assertEqual(cache.get_result("SHOW ME SALES"), ("a2", []))
+        count = sqlite3.connect(self.path).execute("SELECT COUNT(*) FROM rag_results").fetchone()[0]
+        self.assertEqual(count, 1)
+        self.assertEqual(cache.stats()["hits"], 2)
+
+    def test_failed_write_drops_pending_answer(self):
+        cache = SQLiteConnector(self.path)
+
+        def failing_apply(conn, batch):
+            raise sqlite3.OperationalError("disk I/O error")
+
+        cache._apply = failing_apply
+        cache.store_result("q", "a", [])
+        cache.flush()
+        self.assertEqual(cache._pending, {})
+        self.assertEqual(cache.get_result("q"), (None, None))
+
+    def test_ttl_expiry(self):
+        cache = SQLiteConnector(self.path, ttl=0.05, async_writes=False)
+        cache.store_result("q", "a", [])
+        time.sleep(0.1)
+        self.assertEqual(cache.get_result("q"), (None, None))
+        self.assertEqual(cache.stats()["expired"], 1)
+
+    def test_lru_eviction(self):
+        cache = SQLiteConnector(self.path, max_entries=2, async_writes=False)
+        cache.store_result("q1", "a1", [])
+        cache.store_result("q2", "a2", [])
+        cache.get_result("q1")
+        cache.store_result("q3", "a3", [])
+        self.assertEqual(cache.get_result("q2"), (None, None))
+        self.assertEqual(cache.get_result("q1")[0], "a1")
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_connections_are_per_thread(self):
+        cache = SQLiteConnector(self.path)
+        connections = []
+
+        def worker():
+            connections.append(cache.conn)
+            cache.get_result("q")
+
+        threads = [threading.Thread(target=worker) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len({id(c) for c in connections}), 3)
+        self.assertEqual(cache.conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+
+    def test_migrates_legacy_table(self):
+        legacy = sqlite3.connect(self.path)
+        legacy.execute("CREATE TABLE rag_results (id INTEGER PRIMARY KEY, query TEXT, answer TEXT, sources TEXT)")
+        legacy.executemany("INSERT INTO rag_results (query, answer, sources) VALUES (?, ?, ?)",
+                           [("q", "old", "[]"), ("Q", "new", "[]")])
+        legacy.commit()
+        legacy.close()
+
+        connector = SQLiteConnector(self.path)
+        self.assertEqual(connector.get_result("q"), ("new", []))
+        connector.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+import unittest
+from unittest import mock
+
+from config import Config
+from src import create_app
+from src.startup import AppServices
+from data_sources import embedding_models
+
+PROJECT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+HEAVY_MODULES = ["faiss", "sentence_transformers", "torch", "transformers", "langchain",
+                 "google.generativeai", "mysql.connector", "numpy"]
+# Cold import of the app factory and routes; it was ~1s when the routes built the agents at import
+IMPORT_TIME_BUDGET = float(os.environ.get("IMPORT_TIME_BUDGET", "0.5"))
+
+
+class FakeOrchestrator:
+    class rag_agent:
+        @staticmethod
+        def cache_stats():
+            return {"answers": {}}
+
+
+class TestStartup(unittest.TestCase):
+    def setUp(self):
+        embedding_models.register_model("fake-startup-model", object())
+        patcher = mock.patch.object(Config, "FAISS_MODEL_NAME", "fake-startup-model")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(embedding_models.unload_model, "fake-startup-model")
+
+    def test_import_time_budget(self):
+        script = (
+            "import json, sys, time\n"
+            "start = time.perf_counter()\n"
+            "import src.routes.query_route\n"
+            "from src import create_app\n"
+            "elapsed = time.perf_counter() - start\n"
+            f"print(json.dumps([elapsed, [m for m in {HEAVY_MODULES!r} if m in sys.modules]]))\n"
+        )
+        output = subprocess.run([sys.executable, "-c", script], cwd=PROJECT_DIR, capture_output=True,
+                                text=True, check=True).stdout
+        elapsed, heavy = json.loads(output.strip().splitlines()[-1])
+        self.assertEqual(heavy, [])
+        self.assertLess(elapsed, IMPORT_TIME_BUDGET)
+
+    def test_ready_after_background_warm_up(self):
+        release = threading.Event()
+
+        def build():
+            release.wait(5)
+            return FakeOrchestrator()
+
+        app = create_app(AppServices(build=build))
+        client = app.test_client()
+        self.assertEqual(client.get("/health").status_code, 200)
+        response = client.get("/ready")
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json["phases"]["agents"]["status"], "running")
+        with mock.patch.object(Config, "STARTUP_WAIT_TIMEOUT", 0.01):
+            self.assertEqual(client.get("/cache/stats").status_code, 503)
+
+        release.set()
+        self.assertEqual(client.get("/cache/stats").status_code, 200)
+        readiness = client.get("/ready").json
+        self.assertTrue(readiness["ready"])
+        self.assertEqual(readiness["phases"]["embedding_model"]["status"], "done")
+        self.assertEqual(readiness["phases"]["faiss_index"]["status"], "skipped")
+
+    def test_failed_build_is_reported(self):
+        def build():
+            raise RuntimeError("no Gemini key")
+
+        services = AppServices(build=build)
+        services.start(background=False)
+        client = create_app(services).test_client()
+        response = client.get("/ready")
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json["phases"]["agents"]["error"], "no Gemini key")
+        self.assertEqual(response.json["phases"]["mysql_pool"]["status"], "pending")
+        self.assertIn("no Gemini key", client.post("/query", json={"query": "x"}).json["error"])
+
+
+if __name__ == "__main__":
+    unittest.main()
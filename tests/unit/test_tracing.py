@@ -0,0 +1,54 @@
+import asyncio
+import unittest
+
+from src.data_sources.csv_query_engine import CSVQueryEngine  # noqa: F401 (puts src/ on sys.path)
+from agents import async_stages
+from monitoring import tracing
+
+
+class TestTracing(unittest.TestCase):
+    def setUp(self):
+        tracing.reset()
+
+    def tearDown(self):
+        tracing.reset()
+
+    def test_histogram_and_counters_render_as_prometheus_text(self):
+        tracing.observe("llm", 0.003)
+        tracing.observe("llm", 0.2)
+        tracing.observe("llm", 120.0)
+        with self.assertRaises(ValueError):
+            with tracing.span("post_process"):
+                raise ValueError("bad answer")
+        tracing.count("rag_cache_lookups_total", layer="answers", result="hit")
+
+        text = tracing.render()
+        self.assertIn("# TYPE rag_stage_duration_seconds histogram", text)
+        self.assertIn('rag_stage_duration_seconds_bucket{stage="llm",le="0.001"} 0', text)
+        self.assertIn('rag_stage_duration_seconds_bucket{stage="llm",le="0.005"} 1', text)
+        self.assertIn('rag_stage_duration_seconds_bucket{stage="llm",le="60.0"} 2', text)
+        self.assertIn('rag_stage_duration_seconds_bucket{stage="llm",le="+Inf"} 3', text)
+        self.assertIn('rag_stage_duration_seconds_count{stage="llm"} 3', text)
+        self.assertIn('rag_stage_errors_total{stage="post_process"} 1', text)
+        self.assertIn('rag_cache_lookups_total{layer="answers",result="hit"} 1', text)
+
+    def test_trace_follows_the_request_into_pipeline_threads(self):
+        def retrieval():
+            with tracing.span("faiss_search"):
+                pass
+
+        async def request():
+            with tracing.trace() as request_trace:
+                await async_stages.in_thread("retrieval", None, retrieval)
+                with tracing.span("llm"):
+                    await asyncio.sleep(0.01)
+            return request_trace.breakdown()
+
+        breakdown = asyncio.run(request())
+        self.assertEqual(set(breakdown["stages"]), {"faiss_search", "llm"})
+        self.assertGreaterEqual(breakdown["stages"]["llm"]["ms"], 10)
+        self.assertGreaterEqual(breakdown["total_ms"], breakdown["stages"]["llm"]["ms"])
+
+
+if __name__ == "__main__":
+    unittest.main()